@@ -0,0 +1 @@
+# package init
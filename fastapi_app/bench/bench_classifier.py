@@ -0,0 +1,64 @@
+"""Microbenchmark: indexed emotion classifier vs. the original substring loop.
+
+Run from fastapi_app/:  python -m bench.bench_classifier
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import timeit
+
+from data.breathing_map import MOOD_BREATHING_MAP
+from services.emotion_index import CLASSIFIER
+
+SAMPLES = [
+    "stressed",
+    "can't sleep",
+    "I had a long day at work and I'm so tired, everything feels heavy",
+    "not stressed, just really exhausted and kind of down tonight",
+    "My boss yelled at me and I'm furious, I can't calm down",
+    "I need to focus for my exam tomorrow but I keep getting distracted",
+    "honestly I feel fine, pretty relaxed after the walk",
+    " ".join(["I keep thinking about everything that happened today"] * 20)
+    + " and now I'm anxious",
+]
+
+
+def legacy_classify(text: str):
+    """The loop conversation_to_breathing used before the index."""
+    text = text.lower()
+    chosen = MOOD_BREATHING_MAP[0]
+    for item in MOOD_BREATHING_MAP:
+        key = item["emotion"].split("/")[0].strip().lower()
+        if key in text:
+            chosen = item
+            break
+    return chosen
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("-n", "--number", type=int, default=2000)
+    args = ap.parse_args()
+
+    results = []
+    for text in SAMPLES:
+        legacy = min(timeit.repeat(lambda: legacy_classify(text), number=args.number, repeat=5))
+        indexed = min(timeit.repeat(lambda: CLASSIFIER.classify(text), number=args.number, repeat=5))
+        match = CLASSIFIER.classify(text)
+        results.append(
+            {
+                "text": text[:48],
+                "chars": len(text),
+                "legacy_us": round(legacy / args.number * 1e6, 2),
+                "indexed_us": round(indexed / args.number * 1e6, 2),
+                "legacy": legacy_classify(text)["emotion"],
+                "indexed": match.item["emotion"],
+                "confidence": match.confidence,
+            }
+        )
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
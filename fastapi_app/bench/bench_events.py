@@ -0,0 +1,74 @@
+"""Microbenchmark: per-event cost of telemetry ingest and batch flushes.
+
+Run from fastapi_app/:  python -m bench.bench_events
+
+`ingest` is what POST /api/events does per request on the event loop:
+decode a beacon body of `--batch` events, validate it and append the rows
+to the buffer. `flush` writes `--flush-events` rows plus their rollups to
+a temporary SQLite WAL file, as the background flusher does in a thread.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from services.fastjson import loads
+from services.telemetry import EventLog, parse_events
+
+
+def _body(batch: int) -> bytes:
+    events = []
+    for i in range(batch):
+        kind = "start" if i == 0 else "complete" if i == batch - 1 else "phase"
+        events.append(
+            {"t": kind, "r": "k2x9f3", "v": "box", "at": 1760000000000 + i, "n": "inhale", "d": 4}
+        )
+    return json.dumps({"p": "box", "e": events}).encode()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--batch", type=int, default=20, help="events per beacon")
+    ap.add_argument("--requests", type=int, default=20_000)
+    ap.add_argument("--flush-events", type=int, default=500)
+    ap.add_argument("--flushes", type=int, default=50)
+    args = ap.parse_args()
+
+    body = _body(args.batch)
+    with tempfile.TemporaryDirectory() as tmp:
+        log = EventLog(Path(tmp) / "telemetry.db", max_buffer=10**9)
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            rows, _ = parse_events(loads(body), 1760000000000, "2025-10-09")
+            log.add(rows)
+        ingest = time.perf_counter() - start
+        events = args.requests * args.batch
+
+        rows = (rows * (args.flush_events // len(rows) + 1))[: args.flush_events]
+        start = time.perf_counter()
+        for _ in range(args.flushes):
+            log.write(rows)
+        flush = time.perf_counter() - start
+        written = args.flushes * len(rows)
+        size = sum(f.stat().st_size for f in Path(tmp).glob("telemetry.db*"))
+
+    print(
+        json.dumps(
+            {
+                "body_bytes": len(body),
+                "ingest_us_per_event": round(ingest / events * 1e6, 3),
+                "ingest_us_per_request": round(ingest / args.requests * 1e6, 2),
+                "flush_ms_per_batch": round(flush / args.flushes * 1000, 2),
+                "flush_us_per_event": round(flush / written * 1e6, 3),
+                "db_bytes_per_event": round(size / written, 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
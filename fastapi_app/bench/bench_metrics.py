@@ -0,0 +1,98 @@
+"""Microbenchmark: per-request cost of MetricsMiddleware and the LLM timers.
+
+Run from fastapi_app/:  python -m bench.bench_metrics
+
+Drives a minimal ASGI app directly (no sockets, no FastAPI routing) with
+and without the middleware so the difference is the instrumentation alone.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+from services.metrics import Histogram, MetricsMiddleware, UpstreamTimer
+
+
+class _Route:
+    path = "/api/config"
+
+
+async def _app(scope, receive, send) -> None:
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message) -> None:
+    pass
+
+
+async def _drive(app, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        scope = {"type": "http", "method": "GET", "path": "/api/config"}
+        await app(scope, _receive, _send)
+    return time.perf_counter() - start
+
+
+async def _timers(n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        t = UpstreamTimer("bench")
+        await t("connection.connect_tcp.started", {})
+        await t("connection.connect_tcp.complete", {})
+        t.headers_received()
+        t.finish()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-n", "--number", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    async def run():
+        wrapped = MetricsMiddleware(_app)
+        bare = min([await _drive(_app, args.number) for _ in range(args.repeat)])
+        inst = min([await _drive(wrapped, args.number) for _ in range(args.repeat)])
+        timers = min([await _timers(args.number) for _ in range(args.repeat)])
+        return bare, inst, timers
+
+    bare, inst, timers = asyncio.run(run())
+    h = Histogram("bench_observe", "observe() cost")
+    observe = min(
+        _time(lambda: h.observe(0.003, "GET", "/x", "200"), args.number)
+        for _ in range(args.repeat)
+    )
+    us = 1e6 / args.number
+    print(
+        json.dumps(
+            {
+                "requests": args.number,
+                "bare_us": round(bare * us, 3),
+                "instrumented_us": round(inst * us, 3),
+                "middleware_overhead_us": round((inst - bare) * us, 3),
+                "upstream_timer_us": round(timers * us, 3),
+                "histogram_observe_us": round(observe * us, 3),
+            },
+            indent=2,
+        )
+    )
+
+
+def _time(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Critical-path load time of a page with and without preload hints.
+
+Run from fastapi_app/:  python -m bench.bench_pageload --path /box --rtt-ms 100 --kbps 1600
+
+Serves the app with uvicorn on a local port behind a TCP proxy that adds
+`--rtt-ms` of round-trip latency (including the connection handshake) and
+caps downstream bandwidth at `--kbps`. `--server-ms` delays page responses,
+standing in for a slow backend. A client limited to 6 connections, like a
+browser over HTTP/1.1, loads the page and every critical asset (the page's
+preload set: stylesheets, scripts, background poster) and reports the time
+until the last one has arrived:
+
+- `parse`: assets start once the HTML has downloaded and been scanned
+- `link`: assets start when the `Link` header arrives with the page headers
+- `early_hints`: assets start together with the page request, the upper
+  bound of a `103 Early Hints` response sent during `--server-ms`
+  (uvicorn cannot send 103s, so this mode is simulated)
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import time
+from contextlib import AsyncExitStack
+from typing import Dict, List
+
+import httpx
+
+from bench.bench_speculative import _free_port, _serve
+
+LINK_URL = re.compile(r"<([^>]+)>")
+TAG_URL = re.compile(r'<(?:link[^>]+href|script[^>]+src|video[^>]+poster)="([^"]+)"')
+
+
+async def _pipe(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float, bps: float
+) -> None:
+    """Forward bytes `delay` seconds late, paced to `bps` bytes/s if set."""
+    queue: "asyncio.Queue[tuple]" = asyncio.Queue()
+
+    async def read() -> None:
+        while True:
+            data = await reader.read(16384)
+            await queue.put((time.perf_counter() + delay, data))
+            if not data:
+                return
+
+    async def write() -> None:
+        free_at = 0.0
+        while True:
+            due, data = await queue.get()
+            if not data:
+                break
+            now = time.perf_counter()
+            if bps:
+                # Serialisation: a link only carries bps bytes per second
+                free_at = max(free_at, now) + len(data) / bps
+                due = max(due, free_at)
+            if due > now:
+                await asyncio.sleep(due - now)
+            writer.write(data)
+            await writer.drain()
+        writer.close()
+
+    reading = asyncio.create_task(read())
+    try:
+        await write()
+    finally:
+        reading.cancel()
+
+
+async def _proxy(target_port: int, rtt: float, bps: float, stack: AsyncExitStack) -> str:
+    async def handle(client_r: asyncio.StreamReader, client_w: asyncio.StreamWriter) -> None:
+        await asyncio.sleep(rtt)  # TCP handshake
+        server_r, server_w = await asyncio.open_connection("127.0.0.1", target_port)
+        await asyncio.gather(
+            _pipe(client_r, server_w, rtt / 2, 0.0),
+            _pipe(server_r, client_w, rtt / 2, bps),
+            return_exceptions=True,
+        )
+
+    port = _free_port()
+    server = await asyncio.start_server(handle, "127.0.0.1", port)
+    stack.push_async_callback(server.wait_closed)
+    stack.callback(server.close)
+    return f"http://127.0.0.1:{port}"
+
+
+def _slow_pages(app, paths, seconds: float):
+    async def wrapped(scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in paths:
+            await asyncio.sleep(seconds)
+        await app(scope, receive, send)
+
+    return wrapped
+
+
+async def _fetch_all(c: httpx.AsyncClient, urls: List[str]) -> None:
+    async def one(url: str) -> None:
+        r = await c.get(url)
+        r.raise_for_status()
+
+    await asyncio.gather(*(one(u) for u in urls))
+
+
+async def _load(base: str, path: str, mode: str, critical: List[str]) -> float:
+    # A fresh client per load: cold connections and no cache, like a first visit
+    limits = httpx.Limits(max_connections=6, max_keepalive_connections=6)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60.0) as c:
+        start = time.perf_counter()
+        if mode == "early_hints":
+            await asyncio.gather(c.get(path), _fetch_all(c, critical))
+            return time.perf_counter() - start
+        async with c.stream("GET", path) as r:
+            r.raise_for_status()
+            assets = None
+            if mode == "link":
+                urls = LINK_URL.findall(r.headers.get("link", ""))
+                assets = asyncio.create_task(_fetch_all(c, urls))
+            html = (await r.aread()).decode()
+        if assets is None:
+            urls = [u for u in TAG_URL.findall(html) if u in critical]
+            assets = asyncio.create_task(_fetch_all(c, urls))
+        await assets
+        return time.perf_counter() - start
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    os.environ.update(
+        CONFIG_STORE_PATH=":memory:",
+        TELEMETRY_PATH=":memory:",
+        RATE_LIMIT_PER_MINUTE="0",
+    )
+    import main as app_main
+
+    results: Dict[str, Dict[str, float]] = {}
+    async with AsyncExitStack() as stack:
+        app = _slow_pages(app_main.app, set(app_main.PAGE_ROUTES), args.server_ms / 1000)
+        origin = await _serve(app, stack)
+        base = await _proxy(
+            int(origin.rsplit(":", 1)[1]), args.rtt_ms / 1000, args.kbps * 1000 / 8, stack
+        )
+        async with httpx.AsyncClient(base_url=origin) as c:
+            r = await c.get(args.path)
+            r.raise_for_status()
+        critical = LINK_URL.findall(r.headers.get("link", ""))
+        if not critical:
+            raise SystemExit(f"{args.path} sends no preload links")
+        for mode in ("parse", "link", "early_hints"):
+            samples = [
+                await _load(base, args.path, mode, critical) for _ in range(args.loads)
+            ]
+            results[mode] = {
+                "assets": len(critical),
+                "critical_p50_ms": round(statistics.median(samples) * 1000, 1),
+                "critical_max_ms": round(max(samples) * 1000, 1),
+            }
+    return results
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--path", default="/box")
+    ap.add_argument("--loads", type=int, default=5)
+    ap.add_argument("--rtt-ms", type=float, default=100.0)
+    ap.add_argument("--kbps", type=float, default=1600.0, help="downstream bandwidth, 0 = unlimited")
+    ap.add_argument("--server-ms", type=float, default=150.0, help="page response delay")
+    args = ap.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Latency of upstream LLM calls spread over several endpoints.
+
+Run from fastapi_app/:  python -m bench.bench_routing --concurrency 16 --requests 400
+
+Serves stub upstreams with uvicorn on local ports in this process:
+
+- `near`: 150 ms to first byte, 16 slots (weight 2)
+- `far`: 450 ms to first byte, 8 slots (weight 1)
+- `flaky`: 150 ms, 8 slots (weight 1), 30% of requests fail with 503
+- `local`: 40 ms, 2 slots (weight 0.25), `fast` tier only, serves
+  gpt-4o-mini as `local-small`
+
+Slots bound how many requests an endpoint generates at once; the rest
+queue. `--concurrency` workers call `LLMService.chat` and
+`conversation_to_breathing` (every `--fast-share`th call) directly, with
+the cache off, once per routing strategy (`p2c`, then `weighted`: a
+weighted random pick). Reports p50/p95 per operation, offline fallbacks
+and how many attempts each endpoint got.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any, Dict, List
+
+from bench.bench_speculative import _serve
+from bench.stub_upstream import StubSettings, build_stub_app
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+ENDPOINTS = {
+    "near": (dict(latency_ms=150, max_concurrency=16), dict(weight=2)),
+    "far": (dict(latency_ms=450, max_concurrency=8), {}),
+    "flaky": (dict(latency_ms=150, max_concurrency=8, error_rate=0.3), {}),
+    "local": (
+        dict(latency_ms=40, max_concurrency=2),
+        dict(weight=0.25, tiers=["fast"], models={"gpt-4o-mini": "local-small"}),
+    ),
+}
+
+
+def _ms(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+
+async def _run(
+    service: Any, requests: int, concurrency: int, fast_share: int
+) -> Dict[str, Any]:
+    from schemas import ChatMessage, ChatRequest
+
+    samples: Dict[str, List[float]] = {"chat": [], "chatbot": []}
+    fallbacks = {"chat": 0, "chatbot": 0}
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        for i in counter:
+            start = time.perf_counter()
+            if i % fast_share == 0:
+                op = "chatbot"
+                res = await service.conversation_to_breathing([f"so stressed today {i}"])
+                fell_back = "result" not in res
+            else:
+                op = "chat"
+                req = ChatRequest(messages=[ChatMessage(role="user", content=f"hello {i}")])
+                fell_back = (await service.chat(req)).model == "coach-local"
+            samples[op].append(time.perf_counter() - start)
+            fallbacks[op] += fell_back
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {
+        op: {
+            "p50_ms": round(statistics.median(v) * 1000, 1),
+            "p95_ms": _ms(v, 0.95),
+            "fallbacks": fallbacks[op],
+        }
+        for op, v in samples.items()
+        if v
+    }
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    os.environ.update(OPENAI_API_KEY="stub", CLASSIFIER_SKIP_LLM_CONFIDENCE="")
+    from services.llm_service import LLMService
+    from services.resilience import CircuitBreaker
+    from services.routing import Upstream, UpstreamRouter
+
+    results: Dict[str, Any] = {}
+    async with AsyncExitStack() as stack:
+        urls = {}
+        for name, (stub, _) in ENDPOINTS.items():
+            settings = StubSettings(tokens_per_sec=args.tokens_per_sec, seed=1, **stub)
+            urls[name] = await _serve(build_stub_app(settings), stack) + "/v1"
+        for strategy in ("p2c", "weighted"):
+            upstreams = [
+                Upstream(name, urls[name], **opts) for name, (_, opts) in ENDPOINTS.items()
+            ]
+            router = UpstreamRouter(upstreams, strategy=strategy)
+            # A breaker per run, so one strategy's failures do not leak into the next
+            service = LLMService(
+                base_dir=BASE_DIR, router=router, breaker=CircuitBreaker(name=strategy)
+            )
+            try:
+                ops = await _run(service, args.requests, args.concurrency, args.fast_share)
+            finally:
+                await service.aclose()
+            results[strategy] = {
+                **ops,
+                "attempts": {u.name: u.picks for u in upstreams},
+                "failed_attempts": {u.name: u.failures for u in upstreams},
+            }
+    return results
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--fast-share", type=int, default=3, help="every Nth call is a classification")
+    ap.add_argument("--tokens-per-sec", type=float, default=400.0, help="stub token rate")
+    args = ap.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
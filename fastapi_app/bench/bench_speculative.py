@@ -0,0 +1,150 @@
+"""Perceived chat latency with and without speculative drafts.
+
+Run from fastapi_app/:  python -m bench.bench_speculative --latency-ms 600
+
+Serves the app and the stub upstream with uvicorn on local ports in this
+process (OPENAI_API_KEY=stub, LLM_BASE_URL set accordingly). For `--turns`
+sequential turns per mode it reports the median and p95 time until the
+user sees text and until the final answer:
+
+- `stream`: POST /api/chat/stream, first `token` / `done`
+- `stream_speculative`: the same with `speculative`, first `draft` / `done`
+- `poll`: POST /api/chat
+- `poll_speculative`: POST /api/chat with `speculative` (the draft), then
+  GET /api/chat/revisions/{id} (the revision)
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import time
+from contextlib import AsyncExitStack
+from typing import Dict, List, Tuple
+
+import httpx
+import uvicorn
+
+from bench.stub_upstream import StubSettings, build_stub_app
+
+OPENERS = ["stressed", "can't sleep", "so tired today", "I'm ready, suggest a plan", "need to focus"]
+
+
+async def _stream(c: httpx.AsyncClient, body: Dict) -> Tuple[float, float]:
+    start = time.perf_counter()
+    first = None
+    async with c.stream("POST", "/api/chat/stream", json=body) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if first is None and line in ("event: draft", "event: token"):
+                first = time.perf_counter() - start
+            if line == "event: done":
+                break
+    return first or 0.0, time.perf_counter() - start
+
+
+async def _poll(c: httpx.AsyncClient, body: Dict) -> Tuple[float, float]:
+    start = time.perf_counter()
+    r = await c.post("/api/chat", json=body)
+    r.raise_for_status()
+    first = time.perf_counter() - start
+    rid = r.json().get("revision_id")
+    while rid:
+        r = await c.get(f"/api/chat/revisions/{rid}", params={"wait": 10})
+        if r.status_code != 202:
+            r.raise_for_status()
+            break
+    return first, time.perf_counter() - start
+
+
+def _summary(samples: List[Tuple[float, float]]) -> Dict[str, float]:
+    def ms(values: List[float], q: float) -> float:
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+    first = [s[0] for s in samples]
+    final = [s[1] for s in samples]
+    return {
+        "first_text_p50_ms": round(statistics.median(first) * 1000, 1),
+        "first_text_p95_ms": ms(first, 0.95),
+        "final_p50_ms": round(statistics.median(final) * 1000, 1),
+        "final_p95_ms": ms(final, 0.95),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _serve(app, stack: AsyncExitStack) -> str:
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    task = asyncio.create_task(server.serve())
+
+    async def stop() -> None:
+        server.should_exit = True
+        await task
+
+    stack.push_async_callback(stop)
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    stub = build_stub_app(
+        StubSettings(latency_ms=args.latency_ms, tokens_per_sec=args.tokens_per_sec, seed=1)
+    )
+    results: Dict[str, Dict[str, float]] = {}
+    async with AsyncExitStack() as stack:
+        # Real sockets: httpx's ASGI transport buffers whole responses, which
+        # would hide when the first SSE event arrives
+        upstream = await _serve(stub, stack)
+        os.environ.update(
+            OPENAI_API_KEY="stub",
+            LLM_BASE_URL=upstream + "/v1",
+            CONFIG_STORE_PATH=":memory:",
+            TELEMETRY_PATH=":memory:",
+            RATE_LIMIT_PER_MINUTE="0",
+        )
+        import main as app_main
+
+        client = httpx.AsyncClient(base_url=await _serve(app_main.app, stack), timeout=60.0)
+        stack.push_async_callback(client.aclose)
+
+        modes = {
+            "stream": (_stream, False),
+            "stream_speculative": (_stream, True),
+            "poll": (_poll, False),
+            "poll_speculative": (_poll, True),
+        }
+        for name, (run, speculative) in modes.items():
+            samples = []
+            for i in range(args.turns):
+                body = {
+                    "messages": [{"role": "user", "content": OPENERS[i % len(OPENERS)]}],
+                    "speculative": speculative,
+                }
+                samples.append(await run(client, body))
+            results[name] = _summary(samples)
+    return results
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--turns", type=int, default=20)
+    ap.add_argument("--latency-ms", type=float, default=600.0, help="stub time to first byte")
+    ap.add_argument("--tokens-per-sec", type=float, default=40.0, help="stub token rate")
+    args = ap.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
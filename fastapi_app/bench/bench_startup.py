@@ -0,0 +1,122 @@
+"""Cold-start benchmark: time to first /healthz and to first rendered page.
+
+Run from fastapi_app/:  python -m bench.bench_startup [--runs 5] [--path /]
+
+Each run spawns a fresh `uvicorn main:app` and polls /healthz until it
+answers; the clock starts at spawn, so interpreter start, imports and the
+lifespan are all included. Then one page and one /api/chat call (offline
+coach, no API key) are timed as the first user-visible requests. Runs
+alternate between the default eager startup and LAZY_STARTUP=1 and the
+medians are printed as JSON.
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(
+    port: int, method: str, path: str, body: Optional[bytes] = None
+) -> Tuple[int, float]:
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status, time.perf_counter() - start
+    finally:
+        conn.close()
+
+
+def run_once(lazy: bool, path: str, timeout: float) -> Dict[str, float]:
+    port = _free_port()
+    env = dict(os.environ)
+    env.update(
+        LAZY_STARTUP="1" if lazy else "0",
+        OPENAI_API_KEY="",
+        CONFIG_STORE_PATH=":memory:",
+        CHATBOT_CACHE_BACKEND="memory",
+    )
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BASE_DIR,
+        env=env,
+    )
+    try:
+        while True:
+            if proc.poll() is not None:
+                sys.exit(f"uvicorn exited with {proc.returncode}")
+            if time.perf_counter() - start > timeout:
+                sys.exit("server did not become healthy in time")
+            try:
+                status, _ = _request(port, "GET", "/healthz")
+            except OSError:
+                time.sleep(0.005)
+                continue
+            if status == 200:
+                break
+        healthz = time.perf_counter() - start
+        _, page = _request(port, "GET", path)
+        page_ready = time.perf_counter() - start
+        _, chat = _request(
+            port,
+            "POST",
+            "/api/chat",
+            json.dumps({"messages": [{"role": "user", "content": "I feel stressed"}]}).encode(),
+        )
+        return {
+            "healthz_ms": healthz * 1000,
+            "first_page_ms": page * 1000,
+            "page_ready_ms": page_ready * 1000,
+            "first_chat_ms": chat * 1000,
+        }
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--path", default="/")
+    ap.add_argument("--timeout", type=float, default=30.0)
+    args = ap.parse_args()
+
+    samples: Dict[str, Dict[str, list]] = {"eager": {}, "lazy": {}}
+    for _ in range(args.runs):
+        for mode in ("eager", "lazy"):
+            for key, value in run_once(mode == "lazy", args.path, args.timeout).items():
+                samples[mode].setdefault(key, []).append(value)
+    print(
+        json.dumps(
+            {
+                mode: {key: round(statistics.median(v), 1) for key, v in values.items()}
+                for mode, values in samples.items()
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
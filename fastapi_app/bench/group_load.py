@@ -0,0 +1,227 @@
+"""Group-session load test: how many room sockets one worker keeps in step.
+
+Run from fastapi_app/:  python -m bench.group_load --levels 500,1000,2000,4000
+
+Spawns one `uvicorn main:app` worker, opens a room with a fast two-phase
+pattern (default 0.5 s + 0.5 s, i.e. two frames per second) and, for each
+level, holds that many WebSocket participants for `--duration` seconds.
+Client and server share a clock, so `slack_ms` is how long before its
+phase boundary each frame arrived: while it stays positive every
+participant can start the phase on time. Also reports frames missed, slow
+consumers closed by the server, the worker's CPU and RSS and the client's
+own CPU. The worker runs with `--ws-per-message-deflate false` unless
+`--deflate` is given. Pass `--url` to test an already running server
+(CPU/RSS then need `--server-pid`).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _raise_fd_limit() -> int:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def _proc_stats(pid: Optional[int]) -> Dict[str, float]:
+    if pid is None:
+        return {}
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return {}
+    rss = next((int(line.split()[1]) for line in status.splitlines() if line.startswith("VmRSS:")), 0)
+    ticks = os.sysconf("SC_CLK_TCK")
+    return {"cpu_s": (int(fields[11]) + int(fields[12])) / ticks, "rss_kb": rss}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Participant:
+    def __init__(self) -> None:
+        self.frames = 0
+        self.slack: List[float] = []
+        self.closed_code: Optional[int] = None
+        self.measuring = False
+
+    async def run(self, url: str, ready: asyncio.Event) -> None:
+        try:
+            async with websockets.connect(url, max_queue=None, ping_interval=None) as ws:
+                ready.set()
+                async for text in ws:
+                    msg = json.loads(text)
+                    if msg["t"] != "phase" or not self.measuring:
+                        continue
+                    self.frames += 1
+                    self.slack.append(msg["at"] - time.time() * 1000)
+        except websockets.ConnectionClosed as e:
+            self.closed_code = e.rcvd.code if e.rcvd else None
+        finally:
+            ready.set()
+
+
+async def run_level(
+    ws_url: str, n: int, duration: float, frames_per_second: float, pid: Optional[int]
+) -> Dict[str, float]:
+    people = [Participant() for _ in range(n)]
+    tasks = []
+    start = time.perf_counter()
+    for batch in range(0, n, 200):
+        events = []
+        for p in people[batch : batch + 200]:
+            ready = asyncio.Event()
+            events.append(ready)
+            tasks.append(asyncio.create_task(p.run(ws_url, ready)))
+        await asyncio.gather(*(e.wait() for e in events))
+    connect_s = time.perf_counter() - start
+    await asyncio.sleep(1.0)
+
+    before = _proc_stats(pid)
+    client_cpu = time.process_time()
+    for p in people:
+        p.measuring = True
+    await asyncio.sleep(duration)
+    for p in people:
+        p.measuring = False
+    after = _proc_stats(pid)
+    client_cpu = time.process_time() - client_cpu
+
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    slack = [s for p in people for s in p.slack]
+    expected = n * duration * frames_per_second
+    received = sum(p.frames for p in people)
+    out = {
+        "sockets": n,
+        "connect_s": round(connect_s, 2),
+        "frames": received,
+        "missed_pct": round(max(0.0, 1 - received / expected) * 100, 2) if expected else 0.0,
+        "slack_p50_ms": round(_percentile(slack, 0.5), 1),
+        "slack_p01_ms": round(_percentile(slack, 0.01), 1),
+        "slack_min_ms": round(min(slack), 1) if slack else 0.0,
+        "closed": sum(1 for p in people if p.closed_code is not None),
+        # This process; on a small box the client saturates before the server
+        "client_cpu_pct": round(client_cpu / duration * 100, 1),
+    }
+    if before and after:
+        out["server_cpu_pct"] = round((after["cpu_s"] - before["cpu_s"]) / duration * 100, 1)
+        out["server_rss_kb"] = after["rss_kb"]
+    return out
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    proc = None
+    pid = args.server_pid
+    base = args.url
+    if base is None:
+        port = _free_port()
+        env = dict(os.environ, CONFIG_STORE_PATH=":memory:", LAZY_STARTUP="1")
+        env.setdefault("GROUP_MAX_PARTICIPANTS", str(max(args.levels) + 100))
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+             "--log-level", "warning", "--backlog", "4096",
+             "--ws-per-message-deflate", "true" if args.deflate else "false"],
+            cwd=BASE_DIR,
+            env=env,
+        )
+        pid = proc.pid
+        base = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base) as client:
+            for _ in range(200):
+                try:
+                    if (await client.get("/healthz")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.05)
+            r = await client.post(
+                "/api/rooms",
+                json={"variant": "two", "pattern": {"inhale": args.phase, "exhale": args.phase}},
+            )
+            r.raise_for_status()
+            room = r.json()
+            metrics_before = (await client.get("/metrics")).text
+        ws_url = base.replace("http", "ws", 1) + room["ws_path"]
+        results = []
+        for n in args.levels:
+            results.append(await run_level(ws_url, n, args.duration, 1 / args.phase, pid))
+            print(json.dumps(results[-1]), file=sys.stderr)
+        async with httpx.AsyncClient(base_url=base) as client:
+            metrics_after = (await client.get("/metrics")).text
+        print(
+            json.dumps(
+                {
+                    "phase_seconds": args.phase,
+                    "duration": args.duration,
+                    "levels": results,
+                    "slow_consumers_closed": _metric(metrics_after, "group_slow_consumers_total")
+                    - _metric(metrics_before, "group_slow_consumers_total"),
+                },
+                indent=2,
+            )
+        )
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+def _metric(text: str, name: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[1])
+    return 0.0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--levels", default="250,500,1000,2000")
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--phase", type=float, default=0.5, help="seconds per phase")
+    ap.add_argument(
+        "--deflate", action="store_true",
+        help="let the spawned worker negotiate permessage-deflate (uvicorn's default)",
+    )
+    ap.add_argument("--url", help="existing server, e.g. http://127.0.0.1:8000")
+    ap.add_argument("--server-pid", type=int)
+    args = ap.parse_args()
+    args.levels = [int(x) for x in args.levels.split(",")]
+    limit = _raise_fd_limit()
+    if max(args.levels) * 2 + 64 > limit:
+        sys.exit(f"open file limit {limit} is too low for {max(args.levels)} sockets")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
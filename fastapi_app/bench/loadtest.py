@@ -0,0 +1,280 @@
+"""Reproducible load test for the app's hot paths.
+
+Run from fastapi_app/:
+
+    # in-process app + in-process stub upstream (no network, no ports)
+    python -m bench.loadtest --out bench_results.json
+
+    # against a running server (start it with LLM_BASE_URL pointing at
+    # `python -m bench.stub_upstream` and OPENAI_API_KEY=stub)
+    python -m bench.loadtest --url http://127.0.0.1:8000 --server-pid 1234
+
+Each scenario runs `--concurrency` virtual users for `--duration` seconds;
+every user has its own X-Session-Id. The report is JSON with p50/p95/p99
+latency (ms), RPS, error counts and memory per scenario. `--baseline FILE`
+compares against a previous report and exits 1 when a scenario's p95 grows
+or its RPS drops by more than `--tolerance`; `--save-baseline FILE` stores
+the current run.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import sys
+import time
+import uuid
+from contextlib import AsyncExitStack
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from bench.stub_upstream import StubSettings, build_stub_app
+
+PAGES = ["/", "/select", "/box", "/circle", "/chat", "/focus", "/deep-focus"]
+OPENERS = ["stressed", "can't sleep", "so tired today", "I'm angry at work", "need to focus"]
+
+Op = Callable[[httpx.AsyncClient, random.Random], Awaitable[httpx.Response]]
+
+
+async def op_page(c: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+    return await c.get(rng.choice(PAGES))
+
+
+async def op_config_read(c: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+    return await c.get("/api/config")
+
+
+async def op_config_write(c: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+    variant = rng.choice(["box", "three", "two"])
+    if variant == "box":
+        body = {k: rng.randint(2, 6) for k in ("inhale", "hold1", "exhale", "hold2")}
+    elif variant == "three":
+        body = {k: rng.randint(2, 8) for k in ("inhale", "hold", "exhale")}
+    else:
+        body = {k: rng.randint(2, 6) for k in ("inhale", "exhale")}
+    return await c.post(f"/api/patterns/{variant}", json=body)
+
+
+async def op_chat(c: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+    turns = rng.randint(1, 4)
+    messages = [{"role": "user", "content": rng.choice(OPENERS)} for _ in range(turns)]
+    return await c.post("/api/chat", json={"messages": messages})
+
+
+async def op_chatbot(c: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+    return await c.post("/api/chatbot", json={"messages": [rng.choice(OPENERS)]})
+
+
+# name -> weighted operations
+SCENARIOS: Dict[str, List[Tuple[Op, int]]] = {
+    "pages": [(op_page, 1)],
+    "config_read": [(op_config_read, 1)],
+    "config_write": [(op_config_write, 1)],
+    "chat": [(op_chat, 1)],
+    "chatbot": [(op_chatbot, 1)],
+    # Rough shape of real traffic: mostly page loads and config reads
+    "mixed": [
+        (op_page, 40),
+        (op_config_read, 35),
+        (op_config_write, 10),
+        (op_chat, 10),
+        (op_chatbot, 5),
+    ],
+}
+
+
+def _rss_kb(pid: Optional[int] = None) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _percentile(sorted_vals: List[float], pct: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    # Nearest-rank
+    k = max(0, math.ceil(pct / 100.0 * len(sorted_vals)) - 1)
+    return sorted_vals[min(k, len(sorted_vals) - 1)]
+
+
+async def run_scenario(
+    name: str,
+    make_client: Callable[[str], httpx.AsyncClient],
+    concurrency: int,
+    duration: float,
+    seed: int,
+    server_pid: Optional[int],
+) -> Dict[str, Any]:
+    ops = SCENARIOS[name]
+    population = [op for op, _ in ops]
+    weights = [w for _, w in ops]
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    rss_before = _rss_kb(server_pid)
+    deadline = time.perf_counter() + duration
+
+    async def user(idx: int) -> None:
+        rng = random.Random(seed * 1000 + idx)
+        async with make_client(uuid.UUID(int=rng.getrandbits(128)).hex) as c:
+            while time.perf_counter() < deadline:
+                op = rng.choices(population, weights)[0]
+                t0 = time.perf_counter()
+                try:
+                    r = await op(c, rng)
+                    ok = r.status_code < 400
+                    key = str(r.status_code)
+                except Exception as e:  # noqa: BLE001
+                    ok, key = False, type(e).__name__
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+                if not ok:
+                    errors[key] = errors.get(key, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    rss_after = _rss_kb(server_pid)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+        "rss_kb_before": rss_before,
+        "rss_kb_after": rss_after,
+        "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if not server_pid else None,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    problems = []
+    for name, cur in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        if base["p95_ms"] and cur["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            problems.append(f"{name}: p95 {base['p95_ms']} -> {cur['p95_ms']} ms")
+        if base["rps"] and cur["rps"] < base["rps"] * (1 - tolerance):
+            problems.append(f"{name}: rps {base['rps']} -> {cur['rps']}")
+    return problems
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    async with AsyncExitStack() as stack:
+        if args.url:
+            base_url = args.url.rstrip("/")
+            transport: Optional[httpx.AsyncBaseTransport] = None
+        else:
+            # In-process: the app talks to the stub through an ASGI transport
+            os.environ.setdefault("CONFIG_STORE_PATH", ":memory:")
+            os.environ.setdefault("CHATBOT_CACHE_BACKEND", "memory")
+            # Every virtual user shares 127.0.0.1; rate-limit per session instead
+            os.environ.setdefault("RATE_LIMIT_KEY", "session")
+            import main as app_main
+            from services.llm_service import LLMService, get_llm_service
+
+            stub = build_stub_app(
+                StubSettings(
+                    latency_ms=args.latency_ms,
+                    tokens_per_sec=args.tokens_per_sec,
+                    error_rate=args.error_rate,
+                    slow_rate=args.slow_rate,
+                    slow_ms=args.slow_ms,
+                    seed=args.seed,
+                )
+            )
+            upstream = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub))
+            stack.push_async_callback(upstream.aclose)
+            await stack.enter_async_context(app_main.app.router.lifespan_context(app_main.app))
+            state = app_main.app.state
+            if state.llm_service is None:
+                state.llm_service = state.llm_factory()
+            service = state.llm_service
+            stubbed = LLMService(
+                base_dir=app_main.BASE_DIR,
+                client=upstream,
+                base_url="http://stub/v1",
+                cache=service.cache,
+            )
+            stubbed.api_key = "stub"
+            app_main.app.dependency_overrides[get_llm_service] = lambda: stubbed
+            stack.callback(app_main.app.dependency_overrides.clear)
+            base_url = "http://app"
+            transport = httpx.ASGITransport(app=app_main.app)
+
+        def make_client(session: str) -> httpx.AsyncClient:
+            return httpx.AsyncClient(
+                base_url=base_url,
+                transport=transport,
+                headers={"X-Session-Id": session},
+                timeout=60.0,
+            )
+
+        report: Dict[str, Any] = {
+            "mode": "http" if args.url else "in-process",
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "python": sys.version.split()[0],
+            "scenarios": {},
+        }
+        for name in args.scenarios:
+            report["scenarios"][name] = await run_scenario(
+                name, make_client, args.concurrency, args.duration, args.seed, args.server_pid
+            )
+            print(f"{name:13} {json.dumps(report['scenarios'][name])}", file=sys.stderr)
+        return report
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--url", help="benchmark a running server instead of in-process")
+    ap.add_argument("--server-pid", type=int, help="report RSS of this server process")
+    ap.add_argument("-s", "--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    ap.add_argument("-c", "--concurrency", type=int, default=16)
+    ap.add_argument("-d", "--duration", type=float, default=5.0, help="seconds per scenario")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--latency-ms", type=float, default=100.0, help="in-process stub TTFB")
+    ap.add_argument("--tokens-per-sec", type=float, default=200.0, help="in-process stub rate")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="in-process stub errors")
+    ap.add_argument("--slow-rate", type=float, default=0.0, help="in-process stub stragglers")
+    ap.add_argument("--slow-ms", type=float, default=0.0, help="extra straggler delay")
+    ap.add_argument("--out", help="write the JSON report here (default: stdout)")
+    ap.add_argument("--baseline", help="compare against this earlier report")
+    ap.add_argument("--save-baseline", help="also write the report to this path")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed regression (0.2 = 20%%)")
+    args = ap.parse_args()
+
+    report = asyncio.run(main_async(args))
+    problems: List[str] = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        report["regressions"] = problems
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text)
+    for p in problems:
+        print(f"REGRESSION {p}", file=sys.stderr)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Local stand-in for an OpenAI-compatible `/v1/chat/completions` endpoint.
+
+Run from fastapi_app/:
+    python -m bench.stub_upstream --port 9001 --latency-ms 300 --tokens-per-sec 40
+    python -m bench.stub_upstream --error-rate 0.1 --slow-rate 0.05 --slow-ms 5000
+
+then start the app with `LLM_BASE_URL=http://127.0.0.1:9001/v1 OPENAI_API_KEY=stub`.
+`build_stub_app` is also used in-process by bench/loadtest.py.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+DEFAULT_REPLY = (
+    "That sounds like a lot to carry today. Let's slow things down together "
+    "with a few easy breaths.\n"
+    'PLAN_JSON: {"emotion":"Anxious / Stressed","pattern":"Box breathing",'
+    '"type":"4 point","timing":{"inhale":4,"hold":4,"exhale":4,"hold_after_exhale":4}}\n'
+    "I'll set that up now."
+)
+
+
+class StubSettings:
+    def __init__(
+        self,
+        latency_ms: float = 200.0,
+        jitter_ms: float = 50.0,
+        tokens_per_sec: float = 50.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        slow_rate: float = 0.0,
+        slow_ms: float = 0.0,
+        reply: str = DEFAULT_REPLY,
+        seed: Optional[int] = None,
+        max_concurrency: int = 0,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.reply = reply
+        # Requests generating at once (0 = unlimited); the rest queue, as on
+        # an inference box with a fixed number of slots
+        self.max_concurrency = max_concurrency
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+
+    def first_byte_delay(self) -> float:
+        jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        # Occasional stragglers model a degraded upstream's long tail
+        slow = self.slow_ms if self.rng.random() < self.slow_rate else 0.0
+        return max(0.0, self.latency_ms + jitter + slow) / 1000.0
+
+
+def _tokens(text: str) -> list:
+    # Roughly one token per word including its trailing space
+    out, cur = [], ""
+    for ch in text:
+        cur += ch
+        if ch in " \n":
+            out.append(cur)
+            cur = ""
+    if cur:
+        out.append(cur)
+    return out
+
+
+def build_stub_app(settings: Optional[StubSettings] = None) -> Starlette:
+    settings = settings or StubSettings()
+    slots = asyncio.Semaphore(settings.max_concurrency) if settings.max_concurrency > 0 else None
+
+    async def completions(request: Request) -> Response:
+        if slots is None:
+            return await complete(request)
+        async with slots:
+            # Non-streamed replies finish generating inside complete()
+            return await complete(request)
+
+    async def complete(request: Request) -> Response:
+        body: Dict[str, Any] = await request.json()
+        settings.requests += 1
+        await asyncio.sleep(settings.first_byte_delay())
+        if settings.rng.random() < settings.error_rate:
+            settings.errors += 1
+            return JSONResponse(
+                {"error": {"message": "injected failure"}}, status_code=settings.error_status
+            )
+        model = body.get("model", "stub")
+        tokens = _tokens(settings.reply)
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+        per_token = 1.0 / settings.tokens_per_sec if settings.tokens_per_sec > 0 else 0.0
+
+        if not body.get("stream"):
+            await asyncio.sleep(per_token * len(tokens))
+            return JSONResponse(
+                {
+                    "id": f"stub-{settings.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": settings.reply},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": usage,
+                }
+            )
+
+        async def events() -> AsyncIterator[bytes]:
+            for tok in tokens:
+                chunk = {"model": model, "choices": [{"index": 0, "delta": {"content": tok}}]}
+                yield f"data: {json.dumps(chunk)}\n\n".encode()
+                if per_token:
+                    await asyncio.sleep(per_token)
+            yield f"data: {json.dumps({'model': model, 'choices': [], 'usage': usage})}\n\n".encode()
+            yield b"data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def stats(request: Request) -> Response:
+        return JSONResponse({"requests": settings.requests, "errors": settings.errors})
+
+    app = Starlette(
+        routes=[
+            Route("/v1/chat/completions", completions, methods=["POST"]),
+            Route("/stats", stats),
+        ]
+    )
+    app.state.settings = settings
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=9001)
+    ap.add_argument("--latency-ms", type=float, default=200.0, help="time to first byte")
+    ap.add_argument("--jitter-ms", type=float, default=50.0)
+    ap.add_argument("--tokens-per-sec", type=float, default=50.0)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="0..1")
+    ap.add_argument("--error-status", type=int, default=503)
+    ap.add_argument("--slow-rate", type=float, default=0.0, help="0..1 share of stragglers")
+    ap.add_argument("--slow-ms", type=float, default=0.0, help="extra delay for stragglers")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--max-concurrency", type=int, default=0, help="generation slots, 0 = unlimited")
+    args = ap.parse_args()
+    settings = StubSettings(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        seed=args.seed,
+        max_concurrency=args.max_concurrency,
+    )
+    uvicorn.run(build_stub_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -63,3 +63,52 @@ MOOD_BREATHING_MAP = [
         "effect": "Promotes relaxation and sleep readiness",
     },
 ]
+
+# Weighted keywords/synonyms per emotion for the offline classifier
+# (services/emotion_index.py). Phrases are matched on word boundaries.
+EMOTION_KEYWORDS = {
+    "Anxious / Stressed": {
+        "anxious": 2, "anxiety": 2, "stressed": 2, "stress": 2, "stressful": 2,
+        "worried": 1.5, "worry": 1.5, "worrying": 1.5, "nervous": 1.5,
+        "overwhelmed": 1.5, "tense": 1, "on edge": 1.5, "pressure": 1,
+        "deadline": 0.5, "deadlines": 0.5,
+    },
+    "Calm / Relaxed": {
+        "calm": 2, "relaxed": 2, "relax": 1.5, "peaceful": 1.5, "chill": 1,
+        "content": 1, "okay": 0.5, "fine": 0.5, "good": 0.5,
+    },
+    "Low energy / Fatigue": {
+        "low energy": 2, "tired": 2, "exhausted": 2, "fatigue": 2,
+        "fatigued": 2, "drained": 1.5, "worn out": 1.5, "sluggish": 1.5,
+        "lethargic": 1.5, "burnt out": 1.5, "burned out": 1.5,
+    },
+    "Focus / Attention": {
+        "focus": 2, "focused": 1.5, "concentrate": 2, "concentration": 2,
+        "distracted": 1.5, "attention": 1.5, "study": 1, "studying": 1,
+        "productive": 1, "exam": 1,
+    },
+    "Angry / Frustrated": {
+        "angry": 2, "anger": 2, "frustrated": 2, "frustrating": 1.5,
+        "frustration": 2, "mad": 1.5, "furious": 2, "annoyed": 1.5,
+        "irritated": 1.5, "pissed": 1.5, "rage": 2,
+    },
+    "Fear / Panic": {
+        "fear": 2, "afraid": 2, "scared": 2, "panic": 2, "panicking": 2,
+        "panic attack": 2.5, "terrified": 2, "frightened": 2,
+        "can't breathe": 2,
+    },
+    "Sad / Depressed": {
+        "sad": 2, "depressed": 2, "depression": 2, "down": 1, "lonely": 1.5,
+        "unhappy": 1.5, "cry": 1.5, "crying": 1.5, "hopeless": 2, "upset": 1,
+        "grief": 2, "heartbroken": 2,
+    },
+    "Energized / Excited": {
+        "energized": 2, "excited": 2, "energetic": 1.5, "pumped": 1.5,
+        "hyped": 1.5, "thrilled": 1.5, "buzzing": 1,
+    },
+    "Sleepy / Drowsy": {
+        "sleepy": 2, "drowsy": 2, "sleep": 1.5, "insomnia": 2,
+        "can't sleep": 2.5, "cannot sleep": 2.5, "bed": 0.5, "bedtime": 1,
+        "yawning": 1.5, "wind down": 1.5,
+    },
+}
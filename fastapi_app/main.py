@@ -1,56 +1,162 @@
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 import os
 
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse
 from dotenv import load_dotenv
+from routers import audio as audio_router
 from routers import chat as chat_router
 from routers import config as config_router
+from routers import events as events_router
+from routers import groups as groups_router
+from services.admission import AdmissionMiddleware
+from services.assets import AssetManifest, AssetStaticFiles
+from services.cache import build_response_cache
+from services.config_store import ConfigStore
+from services.conversations import ConversationStore
+from services.group_sessions import GroupHub
+from services.lazy import lazy_startup
+from services.llm_service import LLMService
+from services.metrics import REGISTRY, MetricsMiddleware, gauge_lines
+from services.pages import PageCache
+from services.preload import EarlyHintsMiddleware, template_preloads
+from services.session_audio import SessionAudioCache, warm_specs
+from services.telemetry import EventLog
+from services.prompts import get_prompt_registry
+from services.speculative import RevisionStore
 
 BASE_DIR = Path(__file__).parent
 load_dotenv(dotenv_path=BASE_DIR / ".env")
 
-app = FastAPI(title="Box Breathing (FastAPI)")
 
-app.mount("/static", StaticFiles(directory=BASE_DIR / "static"), name="static")
-templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+def build_llm_service() -> LLMService:
+    # One service and one keep-alive pool for the whole process; the service
+    # opens the pool (and imports httpx) on first use of `service.client`
+    return LLMService(base_dir=BASE_DIR, cache=build_response_cache(BASE_DIR))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.config_store = ConfigStore.from_env(BASE_DIR)
+    app.state.conversations = ConversationStore.from_env()
+    app.state.revisions = RevisionStore.from_env()
+    app.state.group_hub = GroupHub.from_env()
+    app.state.events = EventLog.from_env(BASE_DIR)
+    app.state.events.start()
+    app.state.session_audio = SessionAudioCache.from_env(BASE_DIR)
+    warm_audio = None
+    # LAZY_STARTUP=1 (scale-to-zero): the first LLM request builds the
+    # service and the first page view renders, so /healthz answers sooner
+    app.state.llm_factory = build_llm_service
+    app.state.llm_service = None
+    if not lazy_startup():
+        service = app.state.llm_service = build_llm_service()
+        service.client  # open the keep-alive pool before the first request
+        pages.warm(PAGE_TEMPLATES)
+        # Popular guided sessions render in the background, one at a time
+        warm_audio = asyncio.ensure_future(app.state.session_audio.warm(warm_specs()))
+    try:
+        yield
+    finally:
+        if warm_audio is not None:
+            warm_audio.cancel()
+        await app.state.session_audio.aclose()
+        app.state.group_hub.close()
+        await app.state.revisions.aclose()
+        await app.state.events.aclose()
+        app.state.config_store.close()
+        service = app.state.llm_service
+        if service is not None:
+            await service.aclose()
+            if service.cache is not None:
+                service.cache.close()
+
+
+app = FastAPI(title="Box Breathing (FastAPI)", lifespan=lifespan)
+app.add_middleware(AdmissionMiddleware.from_env)
+app.add_middleware(MetricsMiddleware)
+
+app.mount("/static", AssetStaticFiles(directory=BASE_DIR / "static"), name="static")
+# Build hashed assets with `python -m tools.build_assets`
+assets = AssetManifest(BASE_DIR / "static")
+
+
+def load_templates():
+    from fastapi.templating import Jinja2Templates
+
+    templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+    templates.env.globals["asset_url"] = assets.url
+    templates.env.globals["media_for"] = assets.media_for
+    return templates
+
+
+# Page paths -> templates; the routes below serve these
+PAGE_ROUTES = {
+    "/": "home.html",
+    "/select": "select_value.html",
+    "/box": "box.html",
+    "/circle": "circle.html",
+    "/chat": "chat.html",
+    "/focus": "focus.html",
+    "/deep-focus": "deep_focus.html",
+}
+PAGE_TEMPLATES = list(PAGE_ROUTES.values())
+
+
+def page_preloads(templates, name):
+    return template_preloads(templates.env, name, assets.url, assets.media_for)
+
+
+pages = PageCache(
+    load_templates,
+    watch=[
+        BASE_DIR / "templates",
+        BASE_DIR / "static" / "dist" / "manifest.json",
+        BASE_DIR / "static" / "dist" / "media.json",
+        BASE_DIR / "static" / "dist" / "audio.json",
+    ],
+    on_reload=assets.load,
+    routes=PAGE_ROUTES,
+    preloads=page_preloads,
+)
+app.add_middleware(EarlyHintsMiddleware, hints=pages.early_hints)
 
 
 @app.get("/", response_class=HTMLResponse)
-def index(request: Request):
-    return templates.TemplateResponse("home.html", {"request": request})
+async def index(request: Request):
+    return await pages.response(request, "home.html")
 
 
 @app.get("/select", response_class=HTMLResponse)
-def select_values(request: Request):
-    return templates.TemplateResponse("select_value.html", {"request": request})
+async def select_values(request: Request):
+    return await pages.response(request, "select_value.html")
 
 
 @app.get("/box", response_class=HTMLResponse)
-def box_page(request: Request):
-    return templates.TemplateResponse("box.html", {"request": request})
+async def box_page(request: Request):
+    return await pages.response(request, "box.html")
 
 
 @app.get("/circle", response_class=HTMLResponse)
-def circle_page(request: Request):
-    return templates.TemplateResponse("circle.html", {"request": request})
+async def circle_page(request: Request):
+    return await pages.response(request, "circle.html")
 
 
 @app.get("/chat", response_class=HTMLResponse)
-def chat_page(request: Request):
-    return templates.TemplateResponse("chat.html", {"request": request})
+async def chat_page(request: Request):
+    return await pages.response(request, "chat.html")
 
 
 @app.get("/focus", response_class=HTMLResponse)
-def focus_page(request: Request):
-    return templates.TemplateResponse("focus.html", {"request": request})
+async def focus_page(request: Request):
+    return await pages.response(request, "focus.html")
 
 
 @app.get("/deep-focus", response_class=HTMLResponse)
-def deep_focus_page(request: Request):
-    return templates.TemplateResponse("deep_focus.html", {"request": request})
+async def deep_focus_page(request: Request):
+    return await pages.response(request, "deep_focus.html")
 
 
 @app.get("/healthz")
@@ -58,6 +164,56 @@ def healthz():
     return {"ok": True}
 
 
+@app.get("/api/audio")
+def audio_manifest():
+    """Cue sprite offsets and ambient loops built by `python -m tools.build_audio`."""
+    return JSONResponse(
+        assets.audio_manifest(), headers={"Cache-Control": "public, max-age=300"}
+    )
+
+
+def _cache_metrics():
+    service = getattr(app.state, "llm_service", None)
+    if service is None or service.cache is None:
+        return []
+    stats = service.cache.stats()
+    lines = []
+    for key in ("hits", "misses", "coalesced"):
+        lines += gauge_lines(
+            f"chatbot_cache_{key}", f"/api/chatbot cache {key} since start", stats[key]
+        )
+    lines += gauge_lines("chatbot_cache_entries", "/api/chatbot cache entries", stats["entries"])
+    lines += gauge_lines("chatbot_cache_bytes", "/api/chatbot cache size", stats["bytes"])
+    return lines
+
+
+def _prompt_metrics():
+    lines = [
+        "# HELP llm_prompt_info Loaded system prompt versions",
+        "# TYPE llm_prompt_info gauge",
+    ]
+    for name, version in get_prompt_registry(BASE_DIR).versions().items():
+        lines.append(f'llm_prompt_info{{prompt="{name}",version="{version}"}} 1')
+    return lines
+
+
+REGISTRY.add_collector(_cache_metrics)
+REGISTRY.add_collector(_prompt_metrics)
+
+
+# Sync, so collectors that query SQLite (the sqlite chatbot cache) run in the threadpool
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 # Mount API routers
 app.include_router(config_router.router, prefix="/api", tags=["config"])
 app.include_router(chat_router.router, prefix="/api", tags=["chat"])
+app.include_router(groups_router.router, prefix="/api", tags=["groups"])
+app.include_router(events_router.router, prefix="/api", tags=["events"])
+app.include_router(audio_router.router, prefix="/api", tags=["audio"])
+# Formerly the standalone chat_bot.py app; same body, same answer
+app.add_api_route(
+    "/chatbot", chat_router.chatbot, methods=["POST"], include_in_schema=False
+)
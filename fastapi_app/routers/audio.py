@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import FileResponse, Response
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from routers.groups import PATTERN_MODELS
+from schemas import Pattern, RoomPhase, SessionAudioInfo, SessionAudioRequest
+from services.admission import client_address, trust_forwarded_from_env
+from services.assets import IMMUTABLE, range_response
+from services.config_store import ConfigStore, get_config_store, get_session_id
+from services.group_sessions import phase_plan
+from services.session_audio import (
+    RenderSpec,
+    SessionAudioBusy,
+    SessionAudioCache,
+    SessionAudioUnavailable,
+    get_session_audio,
+)
+
+router = APIRouter()
+
+# Uncached renders are capped per client IP (see SessionAudioCache.get);
+# sessions are free to mint, so they would not bound anything
+TRUST_FORWARDED = trust_forwarded_from_env()
+
+
+@router.post("/session-audio", response_model=SessionAudioInfo)
+async def render_session_audio(
+    req: SessionAudioRequest,
+    request: Request,
+    session: str = Depends(get_session_id),
+    store: ConfigStore = Depends(get_config_store),
+    cache: SessionAudioCache = Depends(get_session_audio),
+):
+    """Render (or find) the guided-session track for a pattern and cycle count.
+
+    503 when the server cannot render (no ffmpeg); clients then keep
+    scheduling the cues themselves.
+    """
+    if req.variant is None:
+        _, cfg = await run_in_threadpool(store.get, session)
+        variant = cfg.variant or "box"
+        pattern = {"box": cfg.pattern, "three": cfg.pattern_three, "two": cfg.pattern_two}[variant]
+        if pattern is None:
+            variant, pattern = "box", Pattern()
+    else:
+        variant = req.variant
+        try:
+            pattern = PATTERN_MODELS[variant].model_validate(req.pattern or {})
+        except ValidationError as e:
+            raise RequestValidationError(e.errors(include_url=False))
+    try:
+        spec = RenderSpec.build(phase_plan(variant, pattern), req.cycles, req.ambient, req.format)
+        track = await cache.get(spec, client=client_address(request, TRUST_FORWARDED))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SessionAudioBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except SessionAudioUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except (RuntimeError, OSError):
+        raise HTTPException(status_code=503, detail="session audio rendering failed")
+    try:
+        size = (await asyncio.to_thread(track.path.stat)).st_size
+    except FileNotFoundError:
+        # Evicted by a concurrent render between finding it and now
+        raise HTTPException(
+            status_code=503, detail="session audio evicted, retry", headers={"Retry-After": "1"}
+        )
+    return SessionAudioInfo(
+        key=track.key,
+        url=f"/api/session-audio/{track.name}",
+        type=track.media_type,
+        phases=[RoomPhase(name=name, seconds=seconds) for name, seconds in spec.phases],
+        cycles=spec.cycles,
+        cycle_seconds=spec.cycle_seconds,
+        seconds=spec.seconds,
+        bytes=size,
+    )
+
+
+@router.get("/session-audio/{name}")
+def session_audio_file(
+    name: str, request: Request, cache: SessionAudioCache = Depends(get_session_audio)
+) -> Response:
+    """A rendered track; content-addressed, so cacheable forever, with byte ranges."""
+    path = cache.lookup(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="unknown or evicted track")
+    stat_result = path.stat()
+    response = FileResponse(
+        path,
+        stat_result=stat_result,
+        headers={"Cache-Control": IMMUTABLE, "Accept-Ranges": "bytes"},
+        media_type=cache.media_type(name),
+    )
+    if "range" in request.headers:
+        return range_response(str(path), stat_result, request.headers, response)
+    return response
+
+
+@router.get("/session-audio")
+def session_audio_stats(cache: SessionAudioCache = Depends(get_session_audio)):
+    return cache.stats()
@@ -1,31 +1,324 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, Body
+import asyncio
+import os
+import sqlite3
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional, Tuple
 
-from schemas import ChatRequest
-from services.llm_service import LLMService
-from pathlib import Path
+from fastapi import APIRouter, HTTPException, Body, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from routers.config import apply_pattern, config_payload, save_config
+from schemas import BreathingPlan, ChatRequest, ChatResponse, ChatbotBatchRequest, Config
+from services.config_store import (
+    ConfigStore,
+    VersionConflict,
+    get_config_store,
+    get_session_id,
+)
+from services.conversations import Conversation, ConversationStore, get_conversation_store
+from services.fastjson import FastJSONResponse, dumps
+from services.lazy import LazyModule
+from services.llm_service import LLMService, get_llm_service
+from services.metrics import CHAT_SPECULATIVE
+from services.plan_parser import extract_plan_json, validate_plan
+from services.speculative import RevisionStore, get_revision_store
+
+if TYPE_CHECKING:
+    import httpx
+else:
+    httpx = LazyModule("httpx")
 
 router = APIRouter()
 
+BATCH_MAX_CONCURRENCY = int(os.getenv("CHATBOT_BATCH_MAX_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("CHATBOT_BATCH_MAX_ITEMS", "10000"))
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+
+def http_error(e: Exception) -> HTTPException:
+    # Unavailable upstreams already fall back to the offline coach; what is
+    # left here is a final upstream answer (e.g. 401) or a bug on our side
+    if isinstance(e, httpx.HTTPError):
+        return HTTPException(status_code=502, detail=f"upstream error: {e}")
+    return HTTPException(status_code=500, detail=str(e))
+
+
+def open_conversation(
+    store: ConversationStore, req: ChatRequest
+) -> Tuple[Conversation, ChatRequest]:
+    try:
+        return store.open(req)
+    except KeyError:
+        # Expired, evicted or held by another worker: resend the full history
+        raise HTTPException(status_code=404, detail="unknown conversation_id")
+
+
+def parse_plan(reply: str) -> Optional[BreathingPlan]:
+    raw = extract_plan_json(reply)
+    if raw is None:
+        return None
+    try:
+        return validate_plan(raw)
+    except ValueError:
+        return None
+
+
+async def resolve_plan(
+    reply: str, req: ChatRequest, session: str, store: ConfigStore
+) -> Tuple[Optional[BreathingPlan], Optional[Dict[str, Any]]]:
+    """Validate the reply's PLAN_JSON and, if asked, apply it to the session.
+
+    Returns `(plan, config)`; an invalid plan is dropped rather than failing
+    the turn, and `config` is only set when the plan was applied. The turn
+    is already committed, so a failed config write leaves `config` None too.
+    """
+    plan = parse_plan(reply)
+    if plan is None or not req.apply_plan:
+        return plan, None
+
+    def apply(cfg: Config) -> None:
+        apply_pattern(cfg, plan.variant, plan.pattern)
+
+    # SQLite write; keep it off the event loop like the config write routes
+    try:
+        _, cfg, _, _ = await run_in_threadpool(save_config, store, session, apply)
+    except (VersionConflict, sqlite3.Error):
+        return plan, None
+    return plan, config_payload(cfg)
+
+
+def _speculate(
+    req: ChatRequest, service: LLMService, revisions: Optional[RevisionStore] = None
+) -> bool:
+    """Whether this turn sends a local draft ahead of the upstream answer."""
+    if not req.speculative or not service.online:
+        return False
+    if not service.can_speculate() or (revisions is not None and revisions.full()):
+        CHAT_SPECULATIVE.inc("skipped")
+        return False
+    return True
+
+
+def _with_cookies(sub: Response, resp: Response) -> Response:
+    # Returning a Response skips FastAPI's merge of the session cookie
+    resp.headers.raw.extend(sub.headers.raw)
+    return resp
 
-@router.post("/chat")
-async def chat(req: ChatRequest):
+
+@router.post("/chat", response_class=FastJSONResponse)
+async def chat(
+    req: ChatRequest,
+    response: Response,
+    service: LLMService = Depends(get_llm_service),
+    conversations: ConversationStore = Depends(get_conversation_store),
+    session: str = Depends(get_session_id),
+    store: ConfigStore = Depends(get_config_store),
+    revisions: RevisionStore = Depends(get_revision_store),
+):
+    conv, full = open_conversation(conversations, req)
+    if _speculate(req, service, revisions):
+        reply = service.draft_reply(full)
+        draft = conversations.commit(conv, req.messages, reply)
+
+        async def revise() -> ChatResponse:
+            res = await service.chat(full)
+            # A later turn may already have been answered on top of the draft
+            if conv.messages and conv.messages[-1] is draft:
+                draft.content = res.reply
+            res.conversation_id = conv.id
+            res.plan, res.config = await resolve_plan(res.reply, req, session, store)
+            return res
+
+        CHAT_SPECULATIVE.inc("draft")
+        res = ChatResponse(
+            reply=reply,
+            model="coach-local",
+            conversation_id=conv.id,
+            plan=parse_plan(reply),
+            draft=True,
+            revision_id=revisions.start(revise()),
+        )
+        return _with_cookies(response, FastJSONResponse(res.model_dump(mode="json")))
     try:
-        base_dir = Path(__file__).resolve().parent.parent
-        service = LLMService(base_dir=base_dir)
-        res = await service.chat(req)
-        return res.model_dump()
+        res = await service.chat(full)
     except Exception as e:  # noqa: BLE001
-        raise HTTPException(status_code=500, detail=str(e))
+        raise http_error(e)
+    conversations.commit(conv, req.messages, res.reply)
+    res.conversation_id = conv.id
+    res.plan, res.config = await resolve_plan(res.reply, req, session, store)
+    return _with_cookies(response, FastJSONResponse(res.model_dump(mode="json")))
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    req: ChatRequest,
+    response: Response,
+    service: LLMService = Depends(get_llm_service),
+    conversations: ConversationStore = Depends(get_conversation_store),
+    session: str = Depends(get_session_id),
+    store: ConfigStore = Depends(get_config_store),
+):
+    """Server-Sent Events variant of /chat: `token`, `plan`, `done`, `error`.
+
+    `done` carries the validated plan and, with `apply_plan`, the new config.
+    With `speculative`, a `draft` event (`{reply, model, plan,
+    conversation_id}`) comes first and the upstream tokens that follow
+    replace it; closing the stream before `done` keeps the draft.
+    """
+    conv, full = open_conversation(conversations, req)
+    speculative = _speculate(req, service)
+
+    async def events() -> AsyncIterator[str]:
+        draft: Optional[str] = None
+        committed = False
+        try:
+            if speculative:
+                draft = service.draft_reply(full)
+                plan = parse_plan(draft)
+                CHAT_SPECULATIVE.inc("draft")
+                yield sse_event(
+                    "draft",
+                    {
+                        "reply": draft,
+                        "model": "coach-local",
+                        "plan": plan.model_dump(mode="json") if plan else None,
+                        "conversation_id": conv.id,
+                    },
+                )
+            async for event, data in service.chat_stream(full):
+                if event == "done":
+                    conversations.commit(conv, req.messages, data["reply"])
+                    committed = True
+                    if draft is not None:
+                        CHAT_SPECULATIVE.inc("revised")
+                    plan, config = await resolve_plan(data["reply"], req, session, store)
+                    data = {
+                        **data,
+                        "conversation_id": conv.id,
+                        "plan": plan.model_dump(mode="json") if plan else None,
+                        "config": config,
+                    }
+                yield sse_event(event, data)
+        except Exception as e:  # noqa: BLE001
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            if draft is not None and not committed:
+                # The client accepted the draft (closed the stream) or the
+                # upstream failed after it: the draft is this turn's answer
+                conversations.commit(conv, req.messages, draft)
+                CHAT_SPECULATIVE.inc("kept")
+
+    return _with_cookies(
+        response,
+        StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        ),
+    )
+
+
+@router.get("/chat/revisions/{revision_id}", response_class=FastJSONResponse)
+async def chat_revision(
+    revision_id: str,
+    wait: float = Query(10.0, ge=0, le=30),
+    revisions: RevisionStore = Depends(get_revision_store),
+):
+    """Upstream answer for a speculative `/chat` draft.
+
+    Waits up to `wait` seconds: 200 with the revised ChatResponse (already
+    committed to the conversation, plan applied with `apply_plan`), or 202
+    `{revision_id, status: "pending"}` to poll again. 404 once cancelled or
+    expired.
+    """
+    task = revisions.get(revision_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="unknown revision_id")
+    if not task.done() and wait > 0:
+        await asyncio.wait({task}, timeout=wait)
+    if not task.done():
+        return FastJSONResponse(
+            {"revision_id": revision_id, "status": "pending"}, status_code=202
+        )
+    if task.cancelled():
+        raise HTTPException(status_code=404, detail="unknown revision_id")
+    if task.exception() is not None:
+        raise http_error(task.exception())
+    return FastJSONResponse(task.result().model_dump(mode="json"))
+
+
+@router.delete("/chat/revisions/{revision_id}", status_code=204)
+async def cancel_revision(
+    revision_id: str, revisions: RevisionStore = Depends(get_revision_store)
+):
+    """Keep the draft: cancels its upstream call. 409 if it already finished."""
+    task = revisions.get(revision_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="unknown revision_id")
+    if task.done():
+        raise HTTPException(status_code=409, detail="revision already complete")
+    revisions.cancel(revision_id)
+    return Response(status_code=204)
 
 
 @router.post("/chatbot")
-async def chatbot(messages: list[str] = Body(..., embed=True)):
+async def chatbot(
+    messages: list[str] = Body(..., embed=True),
+    service: LLMService = Depends(get_llm_service),
+):
     try:
-        base_dir = Path(__file__).resolve().parent.parent
-        service = LLMService(base_dir=base_dir)
         res = await service.conversation_to_breathing(messages)
         return res
     except Exception as e:  # noqa: BLE001
-        raise HTTPException(status_code=500, detail=str(e))
+        raise http_error(e)
+
+
+@router.post("/chatbot/batch")
+async def chatbot_batch(
+    req: ChatbotBatchRequest, service: LLMService = Depends(get_llm_service)
+):
+    """Classify many conversations; streams NDJSON lines in completion order.
+
+    Each line is `{"index", "ok": true, "result"}` or `{"index", "ok": false,
+    "error"}`; one failed item never fails the batch.
+    """
+    if len(req.conversations) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"at most {BATCH_MAX_ITEMS} conversations per batch"
+        )
+    concurrency = min(req.concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+
+    async def lines() -> AsyncIterator[bytes]:
+        async for i, res in service.iter_breathing(
+            req.conversations, concurrency=concurrency, offline=req.offline
+        ):
+            if isinstance(res, Exception):
+                row = {"index": i, "ok": False, "error": str(res) or type(res).__name__}
+            else:
+                row = {"index": i, "ok": True, "result": res}
+            yield dumps(row) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/chatbot/cache")
+def chatbot_cache_stats(service: LLMService = Depends(get_llm_service)):
+    if service.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **service.cache.stats()}
+
+
+@router.get("/llm/upstreams")
+def llm_upstreams(service: LLMService = Depends(get_llm_service)):
+    """Per-endpoint routing stats: picks, in-flight, latency EWMA, error rate."""
+    return {
+        "online": service.online,
+        "strategy": service.router.strategy,
+        "models": {"chat": service.model_default, "fast": service.fast_model},
+        "upstreams": service.router.stats(),
+    }
@@ -1,107 +1,317 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from schemas import Config, Pattern, ConfigUpdate
+from services.config_store import (
+    ConfigStore,
+    VersionConflict,
+    get_config_store,
+    get_session_id,
+)
 
 router = APIRouter()
 
-
-CONFIG = Config()
+# Seconds between store checks while watching, to pick up other workers' writes
+WATCH_POLL_SECONDS = 1.0
+WATCH_HEARTBEAT_SECONDS = 15.0
 
 
-@router.get("/config")
-def get_config():
+def config_payload(cfg: Config) -> Dict[str, Any]:
     return {
-        "box_scale": CONFIG.box_scale,
-        "cycle_seconds": CONFIG.effective_cycle_seconds,
-        "pattern": CONFIG.pattern.model_dump() if CONFIG.pattern else None,
+        "box_scale": cfg.box_scale,
+        "cycle_seconds": cfg.effective_cycle_seconds,
+        "pattern": cfg.pattern.model_dump() if cfg.pattern else None,
         "pattern_three": (
-            CONFIG.pattern_three.model_dump() if CONFIG.pattern_three else None
+            cfg.pattern_three.model_dump() if cfg.pattern_three else None
         ),
         "pattern_two": (
-            CONFIG.pattern_two.model_dump() if CONFIG.pattern_two else None
+            cfg.pattern_two.model_dump() if cfg.pattern_two else None
         ),
-        "variant": CONFIG.variant,
+        "variant": cfg.variant,
     }
 
 
+class RenderedConfigs:
+    """Pre-serialized /api/config bodies keyed by session, rebuilt per version."""
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, Tuple[int, bytes, str]]" = OrderedDict()
+
+    def get(self, session: str, version: int, cfg: Config) -> Tuple[bytes, str]:
+        with self._lock:
+            item = self._items.get(session)
+            if item is not None and item[0] == version:
+                self._items.move_to_end(session)
+                return item[1], item[2]
+        return self.put(session, version, cfg)
+
+    def put(self, session: str, version: int, cfg: Config) -> Tuple[bytes, str]:
+        body = json.dumps(config_payload(cfg), separators=(",", ":")).encode()
+        tag = hashlib.blake2s(f"{session}:{version}".encode(), digest_size=6).hexdigest()
+        etag = f'"cfg-{version}-{tag}"'
+        with self._lock:
+            self._items[session] = (version, body, etag)
+            self._items.move_to_end(session)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return body, etag
+
+
+class ConfigChanges:
+    """Wakes /config/watch streams in this process when a session is updated."""
+
+    def __init__(self) -> None:
+        self._waiters: Dict[str, "set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]"] = {}
+        self._lock = threading.Lock()
+
+    def notify(self, session: str) -> None:
+        with self._lock:
+            waiters = list(self._waiters.get(session, ()))
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    async def wait(self, session: str, timeout: float) -> None:
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.setdefault(session, set()).add(entry)
+        try:
+            await asyncio.wait_for(entry[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(session)
+                if waiters is not None:
+                    waiters.discard(entry)
+                    if not waiters:
+                        del self._waiters[session]
+
+
+RENDERED = RenderedConfigs()
+CHANGES = ConfigChanges()
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    return any(
+        t.strip().removeprefix("W/") in (etag, "*") for t in header.split(",")
+    )
+
+
+def _respond(sub: Response, resp: Response) -> Response:
+    # Returning a Response skips FastAPI's merge of the dependency's cookies
+    resp.headers.raw.extend(sub.headers.raw)
+    return resp
+
+
+def save_config(store: ConfigStore, session: str, apply) -> Tuple[int, Config, bytes, str]:
+    """Apply `apply(cfg)` atomically and publish the new version to readers."""
+    version, cfg = store.update(session, apply)
+    body, etag = RENDERED.put(session, version, cfg)
+    CHANGES.notify(session)
+    return version, cfg, body, etag
+
+
+def apply_pattern(cfg: Config, variant: str, p: Any) -> None:
+    """Make `p` the active pattern for `variant` ("box", "three" or "two")."""
+    cfg.pattern = p if variant == "box" else None
+    cfg.pattern_three = p if variant == "three" else None
+    cfg.pattern_two = p if variant == "two" else None
+    cfg.variant = variant
+    cfg.cycle_seconds = None
+
+
+def _commit(store: ConfigStore, session: str, apply, sub: Response) -> Response:
+    try:
+        _, _, body, etag = save_config(store, session, apply)
+    except VersionConflict:
+        # Other writers kept winning the compare-and-swap; the client may retry
+        raise HTTPException(status_code=409, detail="config changed concurrently, retry")
+    return _respond(
+        sub,
+        Response(
+            content=body,
+            media_type="application/json",
+            headers={"ETag": etag, "Cache-Control": "no-cache"},
+        ),
+    )
+
+
+@router.get("/config")
+def get_config(
+    request: Request,
+    response: Response,
+    session: str = Depends(get_session_id),
+    store: ConfigStore = Depends(get_config_store),
+):
+    version, cfg = store.get(session)
+    body, etag = RENDERED.get(session, version, cfg)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return _respond(response, Response(status_code=304, headers=headers))
+    return _respond(
+        response, Response(content=body, media_type="application/json", headers=headers)
+    )
+
+
+@router.get("/config/watch")
+async def watch_config(
+    request: Request,
+    response: Response,
+    version: Optional[int] = None,
+    session: str = Depends(get_session_id),
+    store: ConfigStore = Depends(get_config_store),
+):
+    """Server-Sent Events stream of `config` events, one per new version.
+
+    The current config is sent first unless `version` already matches it.
+    On reconnect the browser's Last-Event-ID takes precedence over `version`.
+    """
+    last_id = request.headers.get("last-event-id")
+    if last_id and last_id.isdigit():
+        version = int(last_id)
+
+    async def events() -> AsyncIterator[bytes]:
+        seen = version
+        idle = 0.0
+        while not await request.is_disconnected():
+            # Blocks on SQLite (and on the store lock during writes)
+            current, cfg = await run_in_threadpool(store.get, session)
+            if current != seen:
+                seen = current
+                idle = 0.0
+                body, _ = RENDERED.get(session, current, cfg)
+                yield b"event: config\nid: %d\ndata: %s\n\n" % (current, body)
+            elif idle >= WATCH_HEARTBEAT_SECONDS:
+                idle = 0.0
+                yield b": keep-alive\n\n"
+            await CHANGES.wait(session, WATCH_POLL_SECONDS)
+            idle += WATCH_POLL_SECONDS
+
+    return _respond(
+        response,
+        StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        ),
+    )
+
+
 @router.post("/config")
-def update_config(update: ConfigUpdate):
-    global CONFIG
-    if update.box_scale is not None:
-        CONFIG.box_scale = update.box_scale
-
-    if update.pattern is not None:
-        if update.pattern.total_seconds <= 0:
-            raise HTTPException(status_code=400, detail="pattern total must be > 0")
-        CONFIG.pattern = update.pattern
-        CONFIG.pattern_three = None
-        CONFIG.pattern_two = None
-        CONFIG.variant = "box"
-        CONFIG.cycle_seconds = None
-    elif update.cycle_seconds is not None:
-        CONFIG.cycle_seconds = update.cycle_seconds
-        CONFIG.pattern = None
-        CONFIG.pattern_three = None
-        CONFIG.pattern_two = None
-        CONFIG.variant = None
-
-    return get_config()
+def update_config(
+    update: ConfigUpdate,
+    response: Response,
+    session: str = Depends(get_session_id),
+    store: ConfigStore = Depends(get_config_store),
+):
+    if update.pattern is not None and update.pattern.total_seconds <= 0:
+        raise HTTPException(status_code=400, detail="pattern total must be > 0")
+
+    def apply(cfg: Config) -> None:
+        if update.box_scale is not None:
+            cfg.box_scale = update.box_scale
+
+        if update.pattern is not None:
+            cfg.pattern = update.pattern
+            cfg.pattern_three = None
+            cfg.pattern_two = None
+            cfg.variant = "box"
+            cfg.cycle_seconds = None
+        elif update.cycle_seconds is not None:
+            cfg.cycle_seconds = update.cycle_seconds
+            cfg.pattern = None
+            cfg.pattern_three = None
+            cfg.pattern_two = None
+            cfg.variant = None
+
+    return _commit(store, session, apply, response)
 
 
 @router.get("/patterns/box")
-def get_box_pattern():
-    p = CONFIG.pattern or Pattern()
+def get_box_pattern(
+    session: str = Depends(get_session_id),
+    store: ConfigStore = Depends(get_config_store),
+):
+    _, cfg = store.get(session)
+    p = cfg.pattern or Pattern()
     return p
 
 
 @router.post("/patterns/box")
-def set_box_pattern(p: Pattern):
-    global CONFIG
+def set_box_pattern(
+    p: Pattern,
+    response: Response,
+    session: str = Depends(get_session_id),
+    store: ConfigStore = Depends(get_config_store),
+):
     if p.total_seconds <= 0:
         raise HTTPException(status_code=400, detail="pattern total must be > 0")
-    CONFIG.pattern = p
-    CONFIG.pattern_three = None
-    CONFIG.pattern_two = None
-    CONFIG.variant = "box"
-    CONFIG.cycle_seconds = None
-    return get_config()
+
+    def apply(cfg: Config) -> None:
+        apply_pattern(cfg, "box", p)
+
+    return _commit(store, session, apply, response)
 
 
 @router.get("/patterns/three")
-def get_three_pattern():
-    p = CONFIG.pattern_three or Config.ThreePhasePattern()
+def get_three_pattern(
+    session: str = Depends(get_session_id),
+    store: ConfigStore = Depends(get_config_store),
+):
+    _, cfg = store.get(session)
+    p = cfg.pattern_three or Config.ThreePhasePattern()
     return p
 
 
 @router.post("/patterns/three")
-def set_three_pattern(p: Config.ThreePhasePattern):
-    global CONFIG
+def set_three_pattern(
+    p: Config.ThreePhasePattern,
+    response: Response,
+    session: str = Depends(get_session_id),
+    store: ConfigStore = Depends(get_config_store),
+):
     if p.total_seconds <= 0:
         raise HTTPException(status_code=400, detail="pattern total must be > 0")
-    CONFIG.pattern_three = p
-    CONFIG.pattern = None
-    CONFIG.pattern_two = None
-    CONFIG.variant = "three"
-    CONFIG.cycle_seconds = None
-    return get_config()
+
+    def apply(cfg: Config) -> None:
+        apply_pattern(cfg, "three", p)
+
+    return _commit(store, session, apply, response)
 
 
 @router.get("/patterns/two")
-def get_two_pattern():
-    p = CONFIG.pattern_two or Config.TwoPhasePattern()
+def get_two_pattern(
+    session: str = Depends(get_session_id),
+    store: ConfigStore = Depends(get_config_store),
+):
+    _, cfg = store.get(session)
+    p = cfg.pattern_two or Config.TwoPhasePattern()
     return p
 
 
 @router.post("/patterns/two")
-def set_two_pattern(p: Config.TwoPhasePattern):
-    global CONFIG
+def set_two_pattern(
+    p: Config.TwoPhasePattern,
+    response: Response,
+    session: str = Depends(get_session_id),
+    store: ConfigStore = Depends(get_config_store),
+):
     if p.total_seconds <= 0:
         raise HTTPException(status_code=400, detail="pattern total must be > 0")
-    CONFIG.pattern_two = p
-    CONFIG.pattern = None
-    CONFIG.pattern_three = None
-    CONFIG.variant = "two"
-    CONFIG.cycle_seconds = None
-    return get_config()
+
+    def apply(cfg: Config) -> None:
+        apply_pattern(cfg, "two", p)
+
+    return _commit(store, session, apply, response)
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import time
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from services.fastjson import loads
+from services.metrics import EVENTS
+from services.telemetry import EventLog, get_event_log, parse_events
+
+router = APIRouter()
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+@router.post("/events", status_code=204)
+async def ingest_events(request: Request, log: EventLog = Depends(get_event_log)):
+    """Session start/phase/complete events from the breathing and focus pages.
+
+    Any content type is accepted so `navigator.sendBeacon` can post a plain
+    string without a CORS preflight. See `parse_events` for the format.
+    """
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail="payload too large")
+    body = await request.body()
+    if len(body) > MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail="payload too large")
+    try:
+        payload = loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid JSON")
+    now = time.time()
+    day = time.strftime("%Y-%m-%d", time.gmtime(now))
+    rows, rejected = parse_events(payload, int(now * 1000), day)
+    dropped = log.add(rows)
+    EVENTS.inc("accepted", amount=len(rows) - dropped)
+    if rejected:
+        EVENTS.inc("rejected", amount=rejected)
+    if dropped:
+        EVENTS.inc("dropped", amount=dropped)
+    return Response(status_code=204)
+
+
+@router.get("/events/daily")
+def daily_summary(
+    days: int = Query(30, ge=1, le=366),
+    variant: Optional[Literal["box", "three", "two", "focus", "deep_focus"]] = None,
+    log: EventLog = Depends(get_event_log),
+):
+    """Starts and completions per UTC day and variant, from the rollup table.
+
+    Events reach the rollups when their batch is flushed, so the last
+    TELEMETRY_FLUSH_SECONDS may be missing.
+    """
+    return {"days": log.daily(days, variant)}
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from schemas import Config, Pattern, RoomCreate, RoomInfo, RoomPhase
+from services.config_store import ConfigStore, get_config_store, get_session_id
+from services.group_sessions import GroupHub, Room, get_group_hub, phase_plan
+
+router = APIRouter()
+
+PATTERN_MODELS = {
+    "box": Pattern,
+    "three": Config.ThreePhasePattern,
+    "two": Config.TwoPhasePattern,
+}
+
+
+def room_info(room: Room) -> RoomInfo:
+    return RoomInfo(
+        id=room.id,
+        variant=room.variant,
+        phases=[RoomPhase(name=name, seconds=seconds) for name, seconds in room.phases],
+        cycle_seconds=room.cycle,
+        participants=len(room),
+        epoch_ms=round(room.epoch_wall * 1000),
+        ws_path=f"/api/rooms/{room.id}/ws",
+    )
+
+
+@router.post("/rooms", response_model=RoomInfo, status_code=201)
+async def create_room(
+    req: RoomCreate,
+    session: str = Depends(get_session_id),
+    store: ConfigStore = Depends(get_config_store),
+    hub: GroupHub = Depends(get_group_hub),
+):
+    """Open a room clocked by the given pattern, or by the caller's config."""
+    if req.variant is None:
+        # SQLite read under the store's lock; keep it off the event loop
+        _, cfg = await run_in_threadpool(store.get, session)
+        variant = cfg.variant or "box"
+        pattern = {"box": cfg.pattern, "three": cfg.pattern_three, "two": cfg.pattern_two}[variant]
+        if pattern is None:
+            variant, pattern = "box", Pattern()
+    else:
+        variant = req.variant
+        try:
+            pattern = PATTERN_MODELS[variant].model_validate(req.pattern or {})
+        except ValidationError as e:
+            raise RequestValidationError(e.errors(include_url=False))
+    try:
+        room = hub.create(variant, phase_plan(variant, pattern))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except OverflowError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return room_info(room)
+
+
+@router.get("/rooms/{room_id}", response_model=RoomInfo)
+async def get_room(room_id: str, hub: GroupHub = Depends(get_group_hub)):
+    room = hub.get(room_id)
+    if room is None:
+        raise HTTPException(status_code=404, detail="unknown room")
+    return room_info(room)
+
+
+@router.websocket("/rooms/{room_id}/ws")
+async def room_socket(
+    websocket: WebSocket, room_id: str, hub: GroupHub = Depends(get_group_hub)
+):
+    """Server-clocked phase frames for one participant.
+
+    Server -> client: `room` (phases, epoch, server time) on join, then
+    `phase` frames `{c, i, n, d, at}` sent ahead of each boundary `at`
+    (server wall-clock ms). Client -> server: `{"t": "ping", "c": <client
+    ms>}`, answered with `{"t": "pong", "c", "s": <server ms>}` so the
+    client can estimate its clock offset.
+    """
+    await websocket.accept()
+    room = hub.get(room_id)
+    if room is None:
+        # Accept first so browsers see the close code, not a failed handshake
+        await websocket.close(code=4404)
+        return
+    try:
+        sub = room.join(websocket.send_text, lambda code: websocket.close(code=code))
+    except OverflowError:
+        await websocket.close(code=1013)
+        return
+    try:
+        while True:
+            text = await websocket.receive_text()
+            if len(text) > 256:
+                continue
+            try:
+                msg = json.loads(text)
+            except ValueError:
+                continue
+            if isinstance(msg, dict) and msg.get("t") == "ping":
+                sub.offer_control(
+                    json.dumps(
+                        {"t": "pong", "c": msg.get("c"), "s": time.time() * 1000},
+                        separators=(",", ":"),
+                    )
+                )
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        room.leave(sub)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Optional, Literal, Dict, Any, List
+from typing import Optional, Literal, Dict, Any, List, Union
 from pydantic import BaseModel, field_validator
 
 
@@ -91,6 +91,68 @@ class ConfigUpdate(BaseModel):
     pattern: Optional[Pattern] = None
 
 
+# -----------------------------
+# Group sessions
+# -----------------------------
+
+
+class RoomCreate(BaseModel):
+    """A group room; without `variant` the creator's current config is used."""
+
+    variant: Optional[Literal["box", "three", "two"]] = None
+    pattern: Optional[Dict[str, float]] = None
+
+
+class RoomPhase(BaseModel):
+    name: Literal["inhale", "hold", "exhale"]
+    seconds: float
+
+
+class RoomInfo(BaseModel):
+    id: str
+    variant: Literal["box", "three", "two"]
+    phases: List[RoomPhase]
+    cycle_seconds: float
+    participants: int
+    # Server wall clock (ms) at which cycle 0 started
+    epoch_ms: int
+    ws_path: str
+
+
+# -----------------------------
+# Guided-session audio
+# -----------------------------
+
+
+class SessionAudioRequest(BaseModel):
+    """A rendered session; without `variant` the caller's current config is used."""
+
+    variant: Optional[Literal["box", "three", "two"]] = None
+    pattern: Optional[Dict[str, float]] = None
+    cycles: int = 5
+    # Mix the ambient loop under the cues
+    ambient: bool = True
+    format: Literal["opus", "aac", "mp3"] = "opus"
+
+    @field_validator("cycles")
+    @classmethod
+    def at_least_one(cls, v: int) -> int:
+        if v < 1:
+            raise ValueError("cycles must be >= 1")
+        return v
+
+
+class SessionAudioInfo(BaseModel):
+    key: str
+    url: str
+    type: str
+    phases: List[RoomPhase]
+    cycles: int
+    cycle_seconds: float
+    seconds: float
+    bytes: int
+
+
 # -----------------------------
 # Chat schemas
 # -----------------------------
@@ -103,12 +165,47 @@ class ChatMessage(BaseModel):
 
 class ChatRequest(BaseModel):
     messages: List[ChatMessage]
+    # Server-held history: send only the new message(s) after the first turn
+    conversation_id: Optional[str] = None
+    # Apply a recommended plan to the caller's breathing config in the same request
+    apply_plan: bool = False
+    # Answer at once with the local coach's draft; the upstream reply follows
+    # as a revision (same SSE stream, or a revision_id to poll on /api/chat)
+    speculative: bool = False
     model: Optional[str] = "gpt-4o-mini"
     temperature: Optional[float] = 0.3
     max_tokens: Optional[int] = 512
 
 
+class BreathingPlan(BaseModel):
+    """A PLAN_JSON recommendation validated into one of the config patterns."""
+
+    variant: Literal["box", "three", "two"]
+    pattern: Union[Pattern, Config.ThreePhasePattern, Config.TwoPhasePattern]
+    emotion: Optional[str] = None
+    name: Optional[str] = None
+    effect: Optional[str] = None
+    quote: Optional[str] = None
+
+
 class ChatResponse(BaseModel):
     reply: str
     model: Optional[str] = None
     usage: Optional[Dict[str, Any]] = None
+    conversation_id: Optional[str] = None
+    # Hash of the system prompt used upstream; None for offline replies
+    prompt_version: Optional[str] = None
+    plan: Optional[BreathingPlan] = None
+    # Set when the request asked to apply the plan to the session config
+    config: Optional[Dict[str, Any]] = None
+    # Speculative turns: a local draft and where to fetch its upstream revision
+    draft: bool = False
+    revision_id: Optional[str] = None
+
+
+class ChatbotBatchRequest(BaseModel):
+    conversations: List[List[str]]
+    # Upper bound on in-flight items; capped server-side
+    concurrency: Optional[int] = None
+    # Force the local classifier for every item (no upstream calls)
+    offline: bool = False
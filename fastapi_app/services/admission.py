@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Optional, Sequence, Tuple
+
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from services.config_store import SESSION_COOKIE, SESSION_HEADER
+from services.metrics import (
+    ADMISSION_INFLIGHT,
+    ADMISSION_QUEUED,
+    ADMISSION_REJECTED,
+    ADMISSION_WAIT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def trust_forwarded_from_env() -> bool:
+    return os.getenv("RATE_LIMIT_TRUST_FORWARDED", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def client_address(conn: HTTPConnection, trust_forwarded: bool) -> str:
+    """Client IP, taken from X-Forwarded-For only when the proxy is trusted."""
+    forwarded = conn.headers.get("x-forwarded-for")
+    if forwarded and trust_forwarded:
+        return forwarded.split(",", 1)[0].strip()
+    return conn.client.host if conn.client else "unknown"
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Global concurrency limit with a bounded FIFO wait queue.
+
+    At most `limit` requests hold a slot; up to `queue_size` more wait for
+    one, each for at most `queue_timeout` seconds. Anything beyond that is
+    rejected immediately, so overload turns into fast 503s instead of
+    everyone's latency growing.
+    """
+
+    def __init__(self, limit: int = 64, queue_size: int = 128, queue_timeout: float = 2.0) -> None:
+        self.limit = max(1, limit)
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = queue_timeout
+        self.in_use = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+            ADMISSION_INFLIGHT.set(value=self.in_use)
+            return
+        if len(self._waiters) >= self.queue_size:
+            raise Rejected(503, "queue_full", self.queue_timeout)
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        ADMISSION_QUEUED.set(value=len(self._waiters))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(fut, self.queue_timeout)
+        except BaseException as e:
+            if fut.done() and not fut.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release()
+            else:
+                fut.cancel()
+                try:
+                    self._waiters.remove(fut)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                raise Rejected(503, "queue_timeout", self.queue_timeout) from None
+            raise
+        finally:
+            ADMISSION_QUEUED.set(value=len(self._waiters))
+            ADMISSION_WAIT.observe(time.perf_counter() - start)
+
+    def release(self) -> None:
+        # Hand the slot straight to the oldest live waiter; in_use is unchanged
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.in_use -= 1
+        ADMISSION_INFLIGHT.set(value=self.in_use)
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets: `rate` tokens/second up to `burst`.
+
+    Each key costs one `(tokens, stamp)` tuple in an OrderedDict kept in
+    last-use order. A bucket idle long enough to refill is identical to a
+    missing one, so idle keys are evicted from the cold end for free;
+    `max_keys` bounds memory if many clients are active at once.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100_000) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_keys = max_keys
+        self.idle = self.burst / rate if rate > 0 else math.inf
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: str, now: Optional[float] = None) -> float:
+        """Spend one token for `key`; returns 0 when allowed, else seconds to wait."""
+        now = time.monotonic() if now is None else now
+        tokens, stamp = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+        if tokens >= 1.0:
+            wait = 0.0
+            tokens -= 1.0
+        else:
+            wait = (1.0 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        self._evict(now)
+        return wait
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            key, (_, stamp) = next(iter(buckets.items()))
+            if now - stamp < self.idle and len(buckets) <= self.max_keys:
+                break
+            del buckets[key]
+
+
+class AdmissionMiddleware:
+    """Rate-limit and admit POSTs to the LLM-backed and audio-rendering routes.
+
+    Requests under `prefixes` first spend a token from their client's bucket
+    (429 when empty) and then take a global slot from the controller (503
+    when the queue is full or the wait times out). Both carry `Retry-After`.
+    The slot is held until the response, including a streamed one, is done.
+
+    Rate limiting is off unless RATE_LIMIT_PER_MINUTE is set. Keyed by IP
+    behind a reverse proxy, every user shares the proxy's bucket unless
+    `trust_forwarded` is on; the first forwarded request seen without it
+    logs a warning.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: Optional[AdmissionController] = None,
+        limiter: Optional[TokenBucketLimiter] = None,
+        prefixes: Sequence[str] = ("/api/chat", "/chatbot", "/api/session-audio"),
+        key: str = "ip",
+        trust_forwarded: bool = False,
+    ) -> None:
+        self.app = app
+        self.controller = controller
+        self.limiter = limiter
+        self.prefixes = tuple(prefixes)
+        self.key = key
+        self.trust_forwarded = trust_forwarded
+        self._warned_forwarded = False
+
+    @classmethod
+    def from_env(cls, app: ASGIApp) -> "AdmissionMiddleware":
+        def num(name: str, default: float) -> float:
+            try:
+                return float(os.getenv(name, default))
+            except ValueError:
+                return default
+
+        limit = int(num("LLM_MAX_CONCURRENCY", 64))
+        per_minute = num("RATE_LIMIT_PER_MINUTE", 0)
+        return cls(
+            app,
+            controller=AdmissionController(
+                limit,
+                queue_size=int(num("LLM_MAX_QUEUE", 128)),
+                queue_timeout=num("LLM_QUEUE_TIMEOUT_MS", 2000) / 1000.0,
+            )
+            if limit > 0
+            else None,
+            limiter=TokenBucketLimiter(
+                per_minute / 60.0,
+                burst=num("RATE_LIMIT_BURST", 10),
+                max_keys=int(num("RATE_LIMIT_MAX_CLIENTS", 100_000)),
+            )
+            if per_minute > 0
+            else None,
+            key=os.getenv("RATE_LIMIT_KEY", "ip"),
+            trust_forwarded=trust_forwarded_from_env(),
+        )
+
+    def client_key(self, scope: Scope) -> str:
+        conn = HTTPConnection(scope)
+        if self.key == "session":
+            sid = conn.headers.get(SESSION_HEADER) or conn.cookies.get(SESSION_COOKIE)
+            if sid:
+                return "s:" + sid[:128]
+        forwarded = conn.headers.get("x-forwarded-for")
+        if forwarded and not self.trust_forwarded and not self._warned_forwarded:
+            self._warned_forwarded = True
+            logger.warning(
+                "rate limiting by IP behind a proxy (X-Forwarded-For is set): all "
+                "clients share the proxy's bucket; set RATE_LIMIT_TRUST_FORWARDED=1 "
+                "or RATE_LIMIT_KEY=session"
+            )
+        return client_address(conn, self.trust_forwarded)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith(self.prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+        try:
+            if self.limiter is not None:
+                wait = self.limiter.take(self.client_key(scope))
+                if wait > 0:
+                    raise Rejected(429, "rate_limited", wait)
+            if self.controller is not None:
+                await self.controller.acquire()
+        except Rejected as e:
+            ADMISSION_REJECTED.inc(e.reason)
+            await _reject(send, e)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if self.controller is not None:
+                self.controller.release()
+
+
+async def _reject(send: Send, e: Rejected) -> None:
+    body = json.dumps({"detail": e.reason}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": e.status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(e.retry_after))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import json
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+MEDIA_MANIFEST_NAME = "media.json"
+AUDIO_MANIFEST_NAME = "audio.json"
+COMPRESSIBLE = frozenset({".js", ".css", ".json", ".svg", ".html", ".txt", ".map"})
+IMMUTABLE = "public, max-age=31536000, immutable"
+# The 10-hex-digit content hash the build tools put in dist/ file names
+HASHED_NAME = re.compile(r"\.[0-9a-f]{10}\.")
+# Preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class AssetManifest:
+    """Maps source paths under static/ to their hashed dist/ copies, to
+    transcoded media variants (tools/build_media.py) and to audio sprites
+    and ambient loops (tools/build_audio.py)."""
+
+    def __init__(self, static_dir: Path, prefix: str = "/static") -> None:
+        self.static_dir = static_dir
+        self.prefix = prefix.rstrip("/")
+        self.entries: Dict[str, str] = {}
+        self.media: Dict[str, Dict[str, Any]] = {}
+        self.audio: Dict[str, Any] = {}
+        self.load()
+
+    def load(self) -> None:
+        self.entries = _read_json(self.static_dir / DIST_DIR / MANIFEST_NAME)
+        self.media = _read_json(self.static_dir / DIST_DIR / MEDIA_MANIFEST_NAME)
+        self.audio = _read_json(self.static_dir / DIST_DIR / AUDIO_MANIFEST_NAME)
+
+    def url(self, name: str) -> str:
+        """URL for a static asset, e.g. `asset_url('js/chat.js')` in templates.
+
+        Falls back to the unhashed file when the build step has not run.
+        """
+        name = name.lstrip("/")
+        return f"{self.prefix}/{self.entries.get(name, name)}"
+
+    def media_for(self, name: str) -> Optional[Dict[str, Any]]:
+        """Transcoded variants of `name` with absolute URLs, smallest first.
+
+        Returns `{"videos", "images", "poster", "fallback"}` or None when
+        the media pipeline has not produced anything for it.
+        """
+        name = name.strip().lstrip("/")
+        entry = self.media.get(name)
+        if not entry or not entry.get("variants"):
+            return None
+        variants = [dict(v, url=f"{self.prefix}/{v['url']}") for v in entry["variants"]]
+        poster = entry.get("poster")
+        return {
+            "videos": [v for v in variants if v["type"].startswith("video/")],
+            "images": [v for v in variants if v["type"].startswith("image/")],
+            "poster": f"{self.prefix}/{poster['url']}" if poster else None,
+            "fallback": self.url(name),
+        }
+
+    def audio_manifest(self) -> Dict[str, Any]:
+        """Audio sprites and ambient loops with absolute URLs, for /api/audio.
+
+        `sprites[name]` has `cues` (`{start, duration}` seconds into the
+        sprite), `variants` (smallest first) and a per-cue `fallback` URL;
+        `ambient` is keyed by the track's path under static/ and lists its
+        loop `variants` and the full track as `fallback`. Empty until the
+        audio packager has run.
+        """
+        sprites = {
+            name: {
+                "cues": entry["cues"],
+                "variants": self._variant_urls(entry["variants"]),
+                "fallback": {cue: self.url(src) for cue, src in entry["sources"].items()},
+            }
+            for name, entry in self.audio.get("sprites", {}).items()
+            if entry.get("variants")
+        }
+        ambient = {
+            src: {
+                "seconds": entry["seconds"],
+                "variants": self._variant_urls(entry["variants"]),
+                "fallback": self.url(src),
+            }
+            for src, entry in self.audio.get("ambient", {}).items()
+            if entry.get("variants")
+        }
+        return {"sprites": sprites, "ambient": ambient}
+
+    def _variant_urls(self, variants: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {"format": v["format"], "type": v["type"], "url": f"{self.prefix}/{v['url']}", "bytes": v["bytes"]}
+            for v in variants
+        ]
+
+
+def _read_json(path: Path) -> Dict[str, Any]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+class PartialFileResponse(FileResponse):
+    """206 response with bytes `start`..`end` (inclusive) of a file."""
+
+    def __init__(self, path: str, start: int, end: int, stat_result: os.stat_result, **kwargs) -> None:
+        super().__init__(path, status_code=206, stat_result=stat_result, **kwargs)
+        self.start = start
+        self.end = end
+        self.headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers}
+        )
+        remaining = 0 if scope["method"].upper() == "HEAD" else self.end - self.start + 1
+        if remaining:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(self.start)
+                while remaining:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `Range: bytes=...` into inclusive `(start, end)`.
+
+    None means serve the whole file (another unit, several ranges or bad
+    syntax); `start >= size` means the range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if (
+        not sep
+        or not (first or last)
+        or (first and not first.isdigit())
+        or (last and not last.isdigit())
+    ):
+        return None
+    if not first:
+        suffix = int(last)
+        return (max(0, size - suffix), size - 1) if suffix else (size, size)
+    start = int(first)
+    if not last:
+        return start, size - 1
+    if int(last) < start:
+        return None
+    return start, min(int(last), size - 1)
+
+
+class AssetStaticFiles(StaticFiles):
+    """StaticFiles that serves prebuilt `.br`/`.gz` siblings by Accept-Encoding,
+    marks content-hashed dist/ files as immutable and answers single byte
+    ranges, so audio elements can start playback and seek before the whole
+    file has arrived."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # full path -> available (encoding, path, stat) variants
+        self._variants: Dict[str, Tuple[Tuple[str, str, os.stat_result], ...]] = {}
+
+    def _find_variants(self, full_path: str) -> Tuple[Tuple[str, str, os.stat_result], ...]:
+        found = self._variants.get(full_path)
+        if found is None:
+            out = []
+            for encoding, suffix in ENCODINGS:
+                try:
+                    out.append((encoding, full_path + suffix, os.stat(full_path + suffix)))
+                except OSError:
+                    pass
+            found = self._variants[full_path] = tuple(out)
+        return found
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        headers: Dict[str, str] = {}
+        if f"{os.sep}{DIST_DIR}{os.sep}" in full_path:
+            # The manifests keep their names across builds, so they revalidate
+            hashed = HASHED_NAME.search(os.path.basename(full_path))
+            headers["Cache-Control"] = IMMUTABLE if hashed else "no-cache"
+
+        variants = self._find_variants(full_path)
+        chosen: Optional[Tuple[str, str, os.stat_result]] = None
+        if variants:
+            headers["Vary"] = "Accept-Encoding"
+            accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+            for variant in variants:
+                if variant[0] in accepted:
+                    chosen = variant
+                    break
+
+        if chosen is None:
+            headers["Accept-Ranges"] = "bytes"
+            response: Response = FileResponse(
+                full_path, status_code=status_code, stat_result=stat_result, headers=headers
+            )
+        else:
+            encoding, path, variant_stat = chosen
+            headers["Content-Encoding"] = encoding
+            response = FileResponse(
+                path,
+                status_code=status_code,
+                stat_result=variant_stat,
+                headers=headers,
+                # Content type of the original, not of `.br`/`.gz`
+                media_type=mimetypes.guess_type(full_path)[0] or "text/plain",
+            )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        if chosen is None and status_code == 200 and "range" in request_headers:
+            return range_response(full_path, stat_result, request_headers, response)
+        return response
+
+
+def range_response(
+    full_path: str,
+    stat_result: os.stat_result,
+    request_headers: Headers,
+    response: Response,
+) -> Response:
+    """206 for the single byte range asked for, 416 past the end, else `response`."""
+    # If-Range: only a range of the version the client already has
+    if_range = request_headers.get("if-range")
+    if if_range and if_range not in (
+        response.headers.get("etag"),
+        response.headers.get("last-modified"),
+    ):
+        return response
+    size = stat_result.st_size
+    span = byte_range(request_headers["range"], size)
+    if span is None:
+        return response
+    headers = {
+        k: v for k, v in response.headers.items() if k not in ("content-length", "content-type")
+    }
+    if span[0] >= size:
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+    return PartialFileResponse(
+        full_path, span[0], span[1], stat_result, headers=headers, media_type=response.media_type
+    )
+
+
+def _accepted_encodings(header: str) -> frozenset:
+    out = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if token:
+            out.add(token.strip().lower())
+    return frozenset(out)
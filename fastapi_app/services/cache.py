@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def normalize_conversation(lines: List[str]) -> str:
+    """Lowercase, collapse whitespace and drop empty lines."""
+    out = []
+    for line in lines:
+        norm = " ".join(str(line).lower().split())
+        if norm:
+            out.append(norm)
+    return "\n".join(out)
+
+
+def cache_key(*parts: str) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class CacheBackend:
+    """Byte-valued store with TTL expiry and a total byte budget."""
+
+    # True when get/set do disk I/O and belong in a worker thread
+    blocking = False
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def size_bytes(self) -> int:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU with per-entry expiry, evicting oldest entries over budget."""
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= time.monotonic():
+                self._drop(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes and self._data:
+                self._drop(next(iter(self._data)))
+
+    def _drop(self, key: str) -> None:
+        _, value = self._data.pop(key)
+        self._bytes -= len(value)
+
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache(CacheBackend):
+    """On-disk cache that survives restarts; LRU order kept in `accessed`.
+
+    `accessed` is refreshed at most every ACCESS_RESOLUTION seconds, so a
+    hot key is a plain SELECT rather than an UPDATE and commit per hit.
+    """
+
+    blocking = True
+    ACCESS_RESOLUTION = 60.0
+
+    def __init__(self, path: Path, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires, accessed FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            if now - row[2] >= self.ACCESS_RESOLUTION:
+                self._db.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+                self._db.commit()
+            return bytes(row[0])
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now + ttl, now),
+            )
+            self._db.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+            total = self._total()
+            while total > self.max_bytes:
+                row = self._db.execute(
+                    "SELECT key, size FROM cache ORDER BY accessed LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    break
+                self._db.execute("DELETE FROM cache WHERE key = ?", (row[0],))
+                total -= row[1]
+            self._db.commit()
+
+    def _total(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._total()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class ResponseCache:
+    """JSON response cache with singleflight coalescing of identical misses.
+
+    Concurrent callers asking for the same key while the first one is still
+    computing await that same task instead of issuing their own call. The
+    computation runs in a task of its own that every caller shields, so a
+    caller that is cancelled (client gone) leaves the others their result.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 3600.0) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+
+    async def _backend(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.backend.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def get_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        raw = await self._backend(self.backend.get, key)
+        if raw is not None:
+            self.hits += 1
+            return json.loads(raw)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+        self.misses += 1
+        task = asyncio.ensure_future(self._compute(key, compute))
+        # Mark retrieved so a failure nobody awaited any more doesn't warn at GC
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+            raw = json.dumps(value).encode("utf-8")
+            await self._backend(self.backend.set, key, raw, self.ttl)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "bytes": self.backend.size_bytes(),
+            "max_bytes": self.backend.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+def build_response_cache(base_dir: Path) -> Optional[ResponseCache]:
+    """Create the /api/chatbot cache from CHATBOT_CACHE_* env vars.
+
+    CHATBOT_CACHE_BACKEND is `memory` (default), `sqlite` or `off`.
+    """
+    kind = os.getenv("CHATBOT_CACHE_BACKEND", "memory").strip().lower()
+    if kind in ("off", "none", "0", ""):
+        return None
+    ttl = float(os.getenv("CHATBOT_CACHE_TTL", "3600"))
+    max_bytes = int(os.getenv("CHATBOT_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+    if kind == "sqlite":
+        path = Path(
+            os.getenv("CHATBOT_CACHE_PATH", str(base_dir / "var" / "chatbot_cache.db"))
+        )
+        backend: CacheBackend = SQLiteCache(path, max_bytes=max_bytes)
+    else:
+        backend = MemoryCache(max_bytes=max_bytes)
+    return ResponseCache(backend, ttl=ttl)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Tuple
+
+from fastapi import Request, Response
+
+from schemas import Config
+
+SESSION_COOKIE = "jb_session"
+SESSION_HEADER = "x-session-id"
+
+
+class VersionConflict(Exception):
+    pass
+
+
+class ConfigStore:
+    """Session-keyed breathing config shared by all worker processes.
+
+    SQLite in WAL mode is the source of truth; each process keeps a hot LRU
+    of `(version, Config)`. `PRAGMA data_version` only changes when another
+    connection commits, so while it is stable reads never touch the table.
+    Writes are compare-and-swap on the per-session version.
+    """
+
+    def __init__(self, path: Path | str, hot_size: int = 10_000) -> None:
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.hot_size = hot_size
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            str(path), check_same_thread=False, isolation_level=None, timeout=5.0
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS session_config ("
+            "session TEXT PRIMARY KEY, version INTEGER NOT NULL, data TEXT NOT NULL)"
+        )
+        # session -> (version, config, data_version it was last validated at)
+        self._hot: "OrderedDict[str, Tuple[int, Config, int]]" = OrderedDict()
+        self._data_version = self._read_data_version()
+
+    @classmethod
+    def from_env(cls, base_dir: Path) -> "ConfigStore":
+        path = os.getenv("CONFIG_STORE_PATH", str(base_dir / "var" / "config.db"))
+        hot_size = int(os.getenv("CONFIG_STORE_HOT_SIZE", "10000"))
+        return cls(path, hot_size=hot_size)
+
+    def _read_data_version(self) -> int:
+        return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def _load(self, session: str) -> Tuple[int, Config]:
+        row = self._db.execute(
+            "SELECT version, data FROM session_config WHERE session = ?", (session,)
+        ).fetchone()
+        if row is None:
+            return 0, Config()
+        return row[0], Config.model_validate_json(row[1])
+
+    def _remember(self, session: str, version: int, cfg: Config) -> None:
+        self._hot[session] = (version, cfg, self._data_version)
+        self._hot.move_to_end(session)
+        while len(self._hot) > self.hot_size:
+            self._hot.popitem(last=False)
+
+    def get(self, session: str) -> Tuple[int, Config]:
+        """Return `(version, config)`; the config must be treated as read-only."""
+        with self._lock:
+            self._data_version = self._read_data_version()
+            item = self._hot.get(session)
+            if item is not None:
+                version, cfg, seen = item
+                if seen == self._data_version:
+                    self._hot.move_to_end(session)
+                    return version, cfg
+                # Someone else committed since; only reload if our key moved
+                row = self._db.execute(
+                    "SELECT version FROM session_config WHERE session = ?",
+                    (session,),
+                ).fetchone()
+                if (row[0] if row else 0) == version:
+                    self._remember(session, version, cfg)
+                    return version, cfg
+            version, cfg = self._load(session)
+            self._remember(session, version, cfg)
+            return version, cfg
+
+    def put(self, session: str, cfg: Config, expected_version: int) -> int:
+        """Store `cfg` if the session is still at `expected_version`."""
+        data = cfg.model_dump_json()
+        new_version = expected_version + 1
+        with self._lock:
+            if expected_version == 0:
+                cur = self._db.execute(
+                    "INSERT OR IGNORE INTO session_config VALUES (?, ?, ?)",
+                    (session, new_version, data),
+                )
+            else:
+                cur = self._db.execute(
+                    "UPDATE session_config SET version = ?, data = ? "
+                    "WHERE session = ? AND version = ?",
+                    (new_version, data, session, expected_version),
+                )
+            if cur.rowcount != 1:
+                self._hot.pop(session, None)
+                raise VersionConflict(session)
+            self._data_version = self._read_data_version()
+            self._remember(session, new_version, cfg)
+            return new_version
+
+    def update(
+        self, session: str, mutate: Callable[[Config], None], retries: int = 5
+    ) -> Tuple[int, Config]:
+        """Apply `mutate` to a copy of the session config, retrying on races."""
+        for _ in range(retries):
+            version, cfg = self.get(session)
+            cfg = cfg.model_copy(deep=True)
+            mutate(cfg)
+            try:
+                return self.put(session, cfg, version), cfg
+            except VersionConflict:
+                continue
+        raise VersionConflict(session)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+async def get_config_store(request: Request) -> ConfigStore:
+    return request.app.state.config_store
+
+
+async def get_session_id(request: Request, response: Response) -> str:
+    """Session id from the X-Session-Id header or cookie, minting one if absent."""
+    sid = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+    if sid and 0 < len(sid) <= 128:
+        return sid
+    sid = uuid.uuid4().hex
+    response.set_cookie(SESSION_COOKIE, sid, httponly=True, samesite="lax")
+    return sid
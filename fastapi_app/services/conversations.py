@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from fastapi import Request
+
+from schemas import ChatMessage, ChatRequest
+
+# Per-message framing the chat format adds on top of the content
+MESSAGE_OVERHEAD = 4
+_WORDS = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap BPE-ish estimate: one token per word or punctuation mark, plus
+    one per 8 characters of long words. Close enough for a budget check
+    without shipping a tokenizer.
+    """
+    n = 0
+    for m in _WORDS.finditer(text):
+        n += 1 + (m.end() - m.start()) // 8
+    return n
+
+
+def message_tokens(m: ChatMessage) -> int:
+    return estimate_tokens(m.content) + MESSAGE_OVERHEAD
+
+
+def _summary_line(text: str, limit: int = 160) -> str:
+    first = re.split(r"(?<=[.!?])\s", text.strip(), maxsplit=1)[0]
+    return first if len(first) <= limit else first[: limit - 1].rstrip() + "…"
+
+
+def trim_history(
+    messages: List[ChatMessage], budget: int, summary_budget: int = 200
+) -> Tuple[List[ChatMessage], int]:
+    """Keep the newest messages that fit `budget` estimated tokens.
+
+    The latest message is always kept. Dropped user turns are folded, oldest
+    first, into one short system note (at most `summary_budget` tokens) so the
+    model keeps the gist without the full text. Returns `(messages, dropped)`.
+    """
+    if not messages:
+        return [], 0
+    kept: List[ChatMessage] = []
+    used = 0
+    for i in range(len(messages) - 1, -1, -1):
+        cost = message_tokens(messages[i])
+        if kept and used + cost > budget:
+            break
+        kept.append(messages[i])
+        used += cost
+    kept.reverse()
+    dropped = messages[: len(messages) - len(kept)]
+    if not dropped:
+        return kept, 0
+
+    lines: List[str] = []
+    spent = MESSAGE_OVERHEAD + estimate_tokens("Earlier the user said:")
+    for m in reversed(dropped):
+        if m.role != "user":
+            continue
+        line = "- " + _summary_line(m.content)
+        cost = estimate_tokens(line)
+        if spent + cost > summary_budget:
+            break
+        lines.append(line)
+        spent += cost
+    if lines:
+        lines.reverse()
+        note = ChatMessage(
+            role="system", content="Earlier the user said:\n" + "\n".join(lines)
+        )
+        kept.insert(0, note)
+    return kept, len(dropped)
+
+
+class Conversation:
+    __slots__ = ("id", "messages", "expires")
+
+    def __init__(self, cid: str, messages: List[ChatMessage], expires: float) -> None:
+        self.id = cid
+        self.messages = messages
+        self.expires = expires
+
+
+class ConversationStore:
+    """Server-held chat histories so clients only send the new turn.
+
+    In-process LRU with a sliding TTL; each conversation keeps at most
+    `max_messages` messages (older ones would be trimmed before every
+    upstream call anyway). With several workers a conversation lives in the
+    worker that created it; clients recover from a 404 by resending the full
+    history, which starts a new conversation.
+    """
+
+    def __init__(
+        self, max_conversations: int = 10_000, ttl: float = 3600.0, max_messages: int = 100
+    ) -> None:
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self._data: "OrderedDict[str, Conversation]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "ConversationStore":
+        return cls(
+            max_conversations=int(os.getenv("CONVERSATION_MAX", "10000")),
+            ttl=float(os.getenv("CONVERSATION_TTL", "3600")),
+            max_messages=int(os.getenv("CONVERSATION_MAX_MESSAGES", "100")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, cid: str) -> Optional[Conversation]:
+        conv = self._data.get(cid)
+        if conv is None:
+            return None
+        now = time.monotonic()
+        if conv.expires <= now:
+            del self._data[cid]
+            return None
+        conv.expires = now + self.ttl
+        self._data.move_to_end(cid)
+        return conv
+
+    def create(self) -> Conversation:
+        now = time.monotonic()
+        conv = Conversation(uuid.uuid4().hex, [], now + self.ttl)
+        self._data[conv.id] = conv
+        self._evict(now)
+        return conv
+
+    def open(self, req: ChatRequest) -> Tuple[Conversation, ChatRequest]:
+        """Resolve `req` to its conversation and the full request to answer.
+
+        Without `conversation_id`, `req.messages` is the whole history and a
+        new conversation is started from it. Raises KeyError for unknown or
+        expired ids.
+        """
+        if req.conversation_id is None:
+            return self.create(), req
+        conv = self.get(req.conversation_id)
+        if conv is None:
+            raise KeyError(req.conversation_id)
+        full = req.model_copy(update={"messages": conv.messages + req.messages})
+        return conv, full
+
+    def commit(self, conv: Conversation, new: List[ChatMessage], reply: str) -> ChatMessage:
+        """Append this turn once it has been answered; returns the reply message."""
+        conv.messages.extend(new)
+        answer = ChatMessage(role="assistant", content=reply)
+        conv.messages.append(answer)
+        if len(conv.messages) > self.max_messages:
+            del conv.messages[: len(conv.messages) - self.max_messages]
+        return answer
+
+    def _evict(self, now: float) -> None:
+        data = self._data
+        while data:
+            oldest = next(iter(data.values()))
+            if oldest.expires > now and len(data) <= self.max_conversations:
+                break
+            del data[oldest.id]
+
+
+async def get_conversation_store(request: Request) -> ConversationStore:
+    return request.app.state.conversations
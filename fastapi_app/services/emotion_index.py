@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import os
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from data.breathing_map import EMOTION_KEYWORDS, MOOD_BREATHING_MAP
+
+NEGATIONS = frozenset(
+    {"not", "no", "never", "without", "hardly", "barely", "nor", "cannot"}
+)
+# How many words before a keyword a negation still applies to
+NEGATION_WINDOW = 3
+
+_TOKEN = re.compile(r"[a-z0-9']+|[,.;:!?\n]")
+# Negation does not carry across clause breaks ("I don't know, I'm stressed")
+_CLAUSE = frozenset({",", ".", ";", ":", "!", "?", "\n", "but"})
+
+
+class EmotionMatch(NamedTuple):
+    item: Dict[str, Any]
+    score: float
+    confidence: float
+    scores: Dict[str, float]
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over token sequences.
+
+    Keywords are tuples of word tokens, so phrases match on word boundaries
+    for free. `search` yields `(start, end, value)` token spans for every
+    occurrence in one pass, regardless of how many keywords are indexed.
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[Sequence[str], Any]]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        for word, value in keywords:
+            node = 0
+            for ch in word:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(word), value))
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def search(self, tokens: Sequence[str]) -> Iterable[Tuple[int, int, Any]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(tokens):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, value in out[node]:
+                yield i - length + 1, i + 1, value
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower().replace("’", "'"))
+
+
+def _negated(tokens: List[str], start: int) -> bool:
+    for i in range(start - 1, max(-1, start - 1 - NEGATION_WINDOW), -1):
+        tok = tokens[i]
+        if tok in _CLAUSE:
+            return False
+        if tok in NEGATIONS or tok.endswith("n't"):
+            return True
+    return False
+
+
+class EmotionClassifier:
+    """Weighted keyword classifier over MOOD_BREATHING_MAP emotions."""
+
+    def __init__(
+        self,
+        mood_map: List[Dict[str, Any]],
+        keywords: Dict[str, Dict[str, float]],
+    ) -> None:
+        self.mood_map = mood_map
+        self._by_emotion = {item["emotion"]: item for item in mood_map}
+        self._order = {item["emotion"]: i for i, item in enumerate(mood_map)}
+        entries = []
+        for emotion, words in keywords.items():
+            if emotion not in self._by_emotion:
+                continue
+            for word, weight in words.items():
+                entries.append((tokenize(word), (emotion, float(weight))))
+        self.automaton = KeywordAutomaton(entries)
+
+    def scores(self, text: str) -> Dict[str, float]:
+        tokens = tokenize(text)
+        scores: Dict[str, float] = {}
+        for start, _, (emotion, weight) in self.automaton.search(tokens):
+            if _negated(tokens, start):
+                continue
+            scores[emotion] = scores.get(emotion, 0.0) + weight
+        return scores
+
+    def classify(self, text: str) -> EmotionMatch:
+        """Best emotion with a 0..1 confidence (0 when nothing matched).
+
+        Confidence is the winner's share of all matched weight, damped by
+        how much evidence there is in absolute terms.
+        """
+        scores = self.scores(text)
+        if not scores:
+            return EmotionMatch(self.mood_map[0], 0.0, 0.0, scores)
+        # Ties resolve to map order, matching the old first-match behaviour
+        emotion = max(scores, key=lambda e: (scores[e], -self._order[e]))
+        best = scores[emotion]
+        confidence = (best / sum(scores.values())) * (best / (best + 1.0))
+        return EmotionMatch(
+            self._by_emotion[emotion], best, round(confidence, 4), scores
+        )
+
+
+CLASSIFIER = EmotionClassifier(MOOD_BREATHING_MAP, EMOTION_KEYWORDS)
+
+
+def skip_llm_confidence() -> Optional[float]:
+    """Confidence at which /api/chatbot answers locally even with an API key.
+
+    Set CLASSIFIER_SKIP_LLM_CONFIDENCE (e.g. 0.75) to enable; unset disables.
+    """
+    v = os.getenv("CLASSIFIER_SKIP_LLM_CONFIDENCE")
+    try:
+        return float(v) if v else None
+    except ValueError:
+        return None
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson  # type: ignore[import-not-found]
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON; uses orjson when installed (several times faster)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered through `dumps` (no indent, no ASCII escaping)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
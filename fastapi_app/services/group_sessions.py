@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import json
+import os
+import secrets
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from starlette.requests import HTTPConnection
+
+from services.metrics import GROUP_FRAMES, GROUP_KICKED, GROUP_ROOMS, GROUP_SOCKETS
+
+Phases = List[Tuple[str, float]]
+
+# Close code for consumers too slow to keep up (RFC 6455 "try again later")
+SLOW_CONSUMER_CLOSE = 1013
+
+
+def phase_plan(variant: str, pattern: Any) -> Phases:
+    """(name, seconds) for each non-empty phase of a box/three/two pattern."""
+    if variant == "box":
+        steps = [
+            ("inhale", pattern.inhale),
+            ("hold", pattern.hold1),
+            ("exhale", pattern.exhale),
+            ("hold", pattern.hold2),
+        ]
+    elif variant == "three":
+        steps = [("inhale", pattern.inhale), ("hold", pattern.hold), ("exhale", pattern.exhale)]
+    else:
+        steps = [("inhale", pattern.inhale), ("exhale", pattern.exhale)]
+    phases = [(name, float(seconds)) for name, seconds in steps if seconds > 0]
+    if not phases:
+        raise ValueError("pattern has no phases")
+    return phases
+
+
+def _encode(frame: Dict[str, Any]) -> str:
+    return json.dumps(frame, separators=(",", ":"))
+
+
+def _wall_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class Subscriber:
+    """One socket's outbound side: a writer task fed by a latest-wins slot.
+
+    Phase frames replace each other, so a consumer that has not taken the
+    previous frame by the time the next one arrives only ever gets the
+    newest (`dropped` counts the overwritten ones). Pongs go through a small
+    separate queue so clock sync is never starved by phase frames.
+    """
+
+    __slots__ = ("send", "close", "pending", "control", "dropped", "ready", "task", "closing")
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[None]],
+        close: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> None:
+        self.send = send
+        self.close = close
+        self.pending: Optional[str] = None
+        self.control: Deque[str] = deque(maxlen=4)
+        self.dropped = 0
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.closing: Optional[asyncio.Task] = None
+
+    def offer(self, frame: str) -> bool:
+        """Queue a phase frame; False when it replaced one not yet sent."""
+        replaced = self.pending is not None
+        if replaced:
+            self.dropped += 1
+        self.pending = frame
+        self.ready.set()
+        return not replaced
+
+    def offer_control(self, frame: str) -> None:
+        self.control.append(frame)
+        self.ready.set()
+
+    async def run(self) -> None:
+        """Write frames until cancelled, or until a send fails (socket gone)."""
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                while self.control:
+                    await self.send(self.control.popleft())
+                frame, self.pending = self.pending, None
+                if frame is not None:
+                    self.dropped = 0
+                    await self.send(frame)
+        except Exception:  # noqa: BLE001
+            return
+
+    def kick(self, code: int = SLOW_CONSUMER_CLOSE) -> None:
+        if self.task is not None:
+            self.task.cancel()
+        if self.close is not None and self.closing is None:
+            self.closing = asyncio.ensure_future(self.close(code))
+            # The socket may already be gone; nobody awaits the close
+            self.closing.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+class Room:
+    """A shared phase clock for everyone breathing together.
+
+    The clock is a fixed epoch plus the phase plan, so any instant maps to
+    a (cycle, phase) without per-room state. While the room has
+    participants one task wakes `lead` seconds before each phase boundary,
+    encodes the frame once and hands the same string to every subscriber.
+    Frames carry the boundary as server wall-clock ms (`at`); clients
+    shift it by their ping/pong offset estimate and start the phase
+    locally at that moment, so fan-out delay does not skew the group.
+    """
+
+    def __init__(
+        self,
+        room_id: str,
+        variant: str,
+        phases: Phases,
+        lead: float = 0.3,
+        max_participants: int = 5000,
+        max_dropped: int = 3,
+    ) -> None:
+        self.id = room_id
+        self.variant = variant
+        self.phases = phases
+        self.cycle = sum(seconds for _, seconds in phases)
+        self._offsets = [0.0]
+        for _, seconds in phases[:-1]:
+            self._offsets.append(self._offsets[-1] + seconds)
+        self.lead = lead
+        self.max_participants = max_participants
+        self.max_dropped = max_dropped
+        self.epoch_mono = time.monotonic()
+        self.epoch_wall = time.time()
+        self.subscribers: Set[Subscriber] = set()
+        self.empty_since: Optional[float] = self.epoch_mono
+        self._clock: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.subscribers)
+
+    def locate(self, mono: float) -> Tuple[int, int, float]:
+        """(cycle, phase index, phase start on the monotonic clock) at `mono`."""
+        elapsed = max(0.0, mono - self.epoch_mono)
+        cycle, within = divmod(elapsed, self.cycle)
+        index = bisect.bisect_right(self._offsets, within) - 1
+        return int(cycle), index, self.epoch_mono + cycle * self.cycle + self._offsets[index]
+
+    def phase_frame(self, cycle: int, index: int, start_mono: float) -> str:
+        name, seconds = self.phases[index]
+        at = round((self.epoch_wall + (start_mono - self.epoch_mono)) * 1000)
+        return _encode({"t": "phase", "c": cycle, "i": index, "n": name, "d": seconds, "at": at})
+
+    def welcome_frame(self) -> str:
+        return _encode(
+            {
+                "t": "room",
+                "id": self.id,
+                "variant": self.variant,
+                "phases": self.phases,
+                "epoch": round(self.epoch_wall * 1000),
+                "now": _wall_ms(),
+            }
+        )
+
+    def join(
+        self,
+        send: Callable[[str], Awaitable[None]],
+        close: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> Subscriber:
+        """Subscribe a socket; it first gets the room and the current phase."""
+        if len(self.subscribers) >= self.max_participants:
+            raise OverflowError("room is full")
+        sub = Subscriber(send, close)
+        sub.offer_control(self.welcome_frame())
+        sub.offer(self.phase_frame(*self.locate(time.monotonic())))
+        sub.task = asyncio.ensure_future(sub.run())
+        # A writer that stopped on its own lost its socket
+        sub.task.add_done_callback(lambda t: t.cancelled() or self.leave(sub))
+        self.subscribers.add(sub)
+        self.empty_since = None
+        GROUP_SOCKETS.inc()
+        if self._clock is None or self._clock.done():
+            self._clock = asyncio.ensure_future(self._run())
+        return sub
+
+    def leave(self, sub: Subscriber) -> None:
+        if sub not in self.subscribers:
+            return
+        self.subscribers.discard(sub)
+        if sub.task is not None:
+            sub.task.cancel()
+        GROUP_SOCKETS.dec()
+        if not self.subscribers:
+            self.empty_since = time.monotonic()
+            if self._clock is not None:
+                self._clock.cancel()
+                self._clock = None
+
+    def broadcast(self, frame: str) -> None:
+        sent = dropped = 0
+        slow: List[Subscriber] = []
+        for sub in self.subscribers:
+            if sub.offer(frame):
+                sent += 1
+            else:
+                dropped += 1
+                if sub.dropped > self.max_dropped:
+                    slow.append(sub)
+        for sub in slow:
+            self.leave(sub)
+            sub.kick()
+        GROUP_FRAMES.inc("sent", amount=sent)
+        if dropped:
+            GROUP_FRAMES.inc("dropped", amount=dropped)
+        if slow:
+            GROUP_KICKED.inc(amount=len(slow))
+
+    async def _run(self) -> None:
+        now = time.monotonic()
+        cycle, index, _ = self.locate(now)
+        while self.subscribers:
+            # Next boundary after the phase that is current now
+            index += 1
+            if index == len(self.phases):
+                cycle, index = cycle + 1, 0
+            start = self.epoch_mono + cycle * self.cycle + self._offsets[index]
+            delay = start - self.lead - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.broadcast(self.phase_frame(cycle, index, start))
+
+    def close(self) -> None:
+        for sub in list(self.subscribers):
+            self.leave(sub)
+            sub.kick(1001)
+        if self._clock is not None:
+            self._clock.cancel()
+
+
+class GroupHub:
+    """In-process registry of group rooms.
+
+    Rooms live in the worker that created them, so several workers need
+    sticky routing by room id (or a dedicated worker for /api/rooms).
+    Rooms left empty for `idle_ttl` seconds are dropped on the next create.
+    """
+
+    def __init__(
+        self,
+        max_rooms: int = 1000,
+        max_participants: int = 5000,
+        idle_ttl: float = 3600.0,
+        lead: float = 0.3,
+        max_dropped: int = 3,
+    ) -> None:
+        self.max_rooms = max_rooms
+        self.max_participants = max_participants
+        self.idle_ttl = idle_ttl
+        self.lead = lead
+        self.max_dropped = max_dropped
+        self._rooms: Dict[str, Room] = {}
+
+    @classmethod
+    def from_env(cls) -> "GroupHub":
+        return cls(
+            max_rooms=int(os.getenv("GROUP_MAX_ROOMS", "1000")),
+            max_participants=int(os.getenv("GROUP_MAX_PARTICIPANTS", "5000")),
+            idle_ttl=float(os.getenv("GROUP_ROOM_TTL", "3600")),
+            lead=float(os.getenv("GROUP_LEAD_MS", "300")) / 1000.0,
+            max_dropped=int(os.getenv("GROUP_MAX_DROPPED", "3")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def get(self, room_id: str) -> Optional[Room]:
+        return self._rooms.get(room_id)
+
+    def create(self, variant: str, phases: Phases) -> Room:
+        self._evict(time.monotonic())
+        if len(self._rooms) >= self.max_rooms:
+            raise OverflowError("too many rooms")
+        room = Room(
+            secrets.token_urlsafe(6),
+            variant,
+            phases,
+            lead=min(self.lead, min(seconds for _, seconds in phases) / 2),
+            max_participants=self.max_participants,
+            max_dropped=self.max_dropped,
+        )
+        self._rooms[room.id] = room
+        GROUP_ROOMS.set(value=len(self._rooms))
+        return room
+
+    def close(self) -> None:
+        for room in self._rooms.values():
+            room.close()
+        self._rooms.clear()
+        GROUP_ROOMS.set(value=0)
+
+    def _evict(self, now: float) -> None:
+        idle = [
+            rid
+            for rid, room in self._rooms.items()
+            if room.empty_since is not None and now - room.empty_since >= self.idle_ttl
+        ]
+        for rid in idle:
+            del self._rooms[rid]
+        if idle:
+            GROUP_ROOMS.set(value=len(self._rooms))
+
+
+async def get_group_hub(conn: HTTPConnection) -> GroupHub:
+    return conn.app.state.group_hub
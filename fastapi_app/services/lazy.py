@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import importlib
+import os
+import threading
+from types import ModuleType
+from typing import Any, Optional
+
+
+def lazy_startup() -> bool:
+    """LAZY_STARTUP=1: build LLM machinery and pages on first use, not at boot."""
+    return os.getenv("LAZY_STARTUP", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    httpx (with certifi and its CLI extras) is most of the app's own import
+    time but is only needed once an upstream call is made. Modules bind
+    `httpx = LazyModule("httpx")` and import the real one under
+    TYPE_CHECKING for annotations, which stay strings at runtime.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.__name = name
+        self.__module: Optional[ModuleType] = None
+        self.__lock = threading.Lock()
+
+    def __getattr__(self, attr: str) -> Any:
+        module = self.__module
+        if module is None:
+            with self.__lock:
+                if self.__module is None:
+                    self.__module = importlib.import_module(self.__name)
+                module = self.__module
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__module is not None else "not loaded"
+        return f"<lazy module {self.__name!r} ({state})>"
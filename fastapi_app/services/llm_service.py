@@ -2,167 +2,695 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, AsyncIterator, Awaitable, Callable, Iterator, Set, Tuple
+import asyncio
 import json
+import re
+import time
 
-import httpx
+from fastapi import Request
 
 from schemas import ChatRequest, ChatResponse, ChatMessage
-from data.breathing_map import MOOD_BREATHING_MAP
+from services.emotion_index import CLASSIFIER, EmotionMatch, skip_llm_confidence
+from services.cache import ResponseCache, cache_key, normalize_conversation
+from services.conversations import trim_history
+from services.lazy import LazyModule
+from services.metrics import (
+    CHAT_TRIMMED,
+    LLM_CALLS,
+    LLM_ERRORS,
+    LLM_HEDGES,
+    LLM_PROMPTS,
+    LLM_RETRIES,
+    UpstreamTimer,
+    record_usage,
+)
+from services.plan_parser import PlanJsonDetector
+from services.prompts import Prompt, get_prompt_registry
+from services.resilience import (
+    CircuitBreaker,
+    CircuitOpen,
+    Deadline,
+    LatencyWindow,
+    ResiliencePolicy,
+    UpstreamUnavailable,
+    is_retryable,
+    retry_after,
+)
+from services.routing import Upstream, UpstreamRouter, outcome
+
+if TYPE_CHECKING:
+    import httpx
+else:
+    httpx = LazyModule("httpx")
+
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+PLAN_KEYWORDS = ("recommend", "suggest", "ready", "start", "go ahead", "plan")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    v = os.getenv(name)
+    if v is None:
+        return default
+    return v.strip().lower() in ("1", "true", "yes", "on")
+
+
+def build_http_client(
+    max_connections: Optional[int] = None,
+    max_keepalive: Optional[int] = None,
+    keepalive_expiry: Optional[float] = None,
+    http2: Optional[bool] = None,
+    timeout: float = 30.0,
+) -> httpx.AsyncClient:
+    """Create the shared keep-alive pool used for all upstream calls.
+
+    Pool limits default to LLM_POOL_MAX_CONNECTIONS / LLM_POOL_MAX_KEEPALIVE /
+    LLM_POOL_KEEPALIVE_EXPIRY; HTTP/2 is enabled with LLM_HTTP2=1 when the
+    optional `h2` package is installed.
+    """
+    limits = httpx.Limits(
+        max_connections=(
+            max_connections
+            if max_connections is not None
+            else _env_int("LLM_POOL_MAX_CONNECTIONS", 100)
+        ),
+        max_keepalive_connections=(
+            max_keepalive
+            if max_keepalive is not None
+            else _env_int("LLM_POOL_MAX_KEEPALIVE", 20)
+        ),
+        keepalive_expiry=(
+            keepalive_expiry
+            if keepalive_expiry is not None
+            else _env_float("LLM_POOL_KEEPALIVE_EXPIRY", 30.0)
+        ),
+    )
+    use_http2 = _env_bool("LLM_HTTP2") if http2 is None else http2
+    if use_http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            use_http2 = False
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=use_http2)
+
+
+def _error_reason(e: Exception) -> str:
+    if isinstance(e, httpx.HTTPStatusError):
+        return str(e.response.status_code)
+    return type(e).__name__
 
 
 class LLMService:
-    def __init__(self, base_dir: Path, model: str = "gpt-4o-mini") -> None:
+    def __init__(
+        self,
+        base_dir: Path,
+        model: str = "gpt-4o-mini",
+        client: Optional[httpx.AsyncClient] = None,
+        base_url: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        policy: Optional[ResiliencePolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        router: Optional[UpstreamRouter] = None,
+    ) -> None:
         self.base_dir = base_dir
         self.model_default = model
+        # Short /api/chatbot classifications can go to a faster, cheaper model
+        self.fast_model = os.getenv("LLM_FAST_MODEL") or model
         self.api_key = os.getenv("OPENAI_API_KEY")
-        self._system_prompt = None
-
-    def load_prompt(self) -> str:
-        if self._system_prompt is not None:
-            return self._system_prompt
-        # Prefer companion prompt if available
-        companion = self.base_dir / "PROMPT_COMPANION.txt"
-        prompt_path = (
-            companion if companion.exists() else (self.base_dir / "PROMPT.txt")
+        self.base_url = (
+            base_url or os.getenv("LLM_BASE_URL") or DEFAULT_BASE_URL
+        ).rstrip("/")
+        # base_url alone unless LLM_UPSTREAMS lists several endpoints
+        self.router = router or UpstreamRouter.from_env(self.base_url)
+        self.prompts = get_prompt_registry(base_dir)
+        self._client = client
+        self._owns_client = client is None
+        self.cache = cache
+        self.policy = policy or ResiliencePolicy.from_env()
+        self.breaker = breaker or CircuitBreaker(
+            self.policy.breaker_failures, self.policy.breaker_reset
         )
-        if prompt_path.exists():
-            self._system_prompt = prompt_path.read_text(encoding="utf-8").strip()
-        else:
-            self._system_prompt = (
-                "You are a calm, supportive breathing coach. Keep answers short, warm, and actionable. "
-                "Prefer simple guidance like box (4-4-4-4), 4-7-8, or equal inhale/exhale. Avoid therapy claims."
-            )
-        return self._system_prompt
+        self.latency = LatencyWindow()
+        # Estimated-token budget for history sent upstream, per turn
+        self.context_tokens = _env_int("CHAT_CONTEXT_TOKENS", 2000)
+        self.summary_tokens = _env_int("CHAT_SUMMARY_TOKENS", 200)
+        self._attempts = 0
+        self._hedges = 0
 
-    async def chat(self, req: ChatRequest) -> ChatResponse:
-        if not self.api_key:
-            # Offline companion: brief empathetic response and only recommend when user seems ready
-            user_msgs = [m.content.lower() for m in req.messages if m.role == "user"]
-            last_user = user_msgs[-1] if user_msgs else ""
-            wants_plan = (
-                any(
-                    k in last_user
-                    for k in [
-                        "recommend",
-                        "suggest",
-                        "ready",
-                        "start",
-                        "go ahead",
-                        "plan",
-                    ]
-                )
-                or len(user_msgs) >= 2
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = build_http_client()
+        return self._client
+
+    @property
+    def online(self) -> bool:
+        """Whether upstream calls are configured; otherwise the offline coach answers."""
+        return bool(self.api_key) or self.router.configured
+
+    async def aclose(self) -> None:
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+        self._client = None
+
+    def load_prompt(self, name: str = "coach") -> Prompt:
+        """Current system prompt from the process-wide registry."""
+        prompt = self.prompts.get(name)
+        LLM_PROMPTS.inc(name, prompt.version)
+        return prompt
+
+    def _headers(self, upstream: Upstream) -> Dict[str, str]:
+        key = upstream.api_key if upstream.api_key is not None else self.api_key
+        headers = {"Content-Type": "application/json"}
+        if key:
+            headers["Authorization"] = f"Bearer {key}"
+        return headers
+
+    @staticmethod
+    def _payload_for(upstream: Upstream, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """`payload` with its model renamed to what `upstream` serves it as."""
+        model = upstream.model(payload["model"])
+        return payload if model == payload["model"] else dict(payload, model=model)
+
+    def _plan_intent(self, req: ChatRequest) -> Optional[str]:
+        """Why the offline coach should recommend now: "asked" when the last
+        user message asks for it, "turns" after a couple of user turns, else None.
+        """
+        user_msgs = [m.content.lower() for m in req.messages if m.role == "user"]
+        last_user = user_msgs[-1] if user_msgs else ""
+        if any(k in last_user for k in PLAN_KEYWORDS):
+            return "asked"
+        if len(user_msgs) >= 2:
+            return "turns"
+        return None
+
+    def _offline_reply(self, req: ChatRequest, with_plan: Optional[bool] = None) -> str:
+        # Offline companion: brief empathetic response and only recommend when user seems ready
+        if with_plan is None:
+            with_plan = self._plan_intent(req) is not None
+        if with_plan:
+            # Pick a simple default and emit a detectable plan line
+            plan = {
+                "emotion": "Calm / Relaxed",
+                "pattern": "Box breathing",
+                "type": "4 point",
+                "timing": {
+                    "inhale": 4,
+                    "hold": 4,
+                    "exhale": 4,
+                    "hold_after_exhale": 4,
+                },
+                "effect": "Calms nervous system, reduces anxiety",
+                "quote": "Breathe gently; you’re not alone.",
+            }
+            plan_json = json.dumps(plan, separators=(",", ":"))
+            return (
+                "We can ground together with box breathing."
+                f"\nPLAN_JSON: {plan_json}\nI'll set that up now."
             )
-            if wants_plan:
-                # Pick a simple default and emit a detectable plan line
-                plan = {
-                    "emotion": "Calm / Relaxed",
-                    "pattern": "Box breathing",
-                    "type": "4 point",
-                    "timing": {
-                        "inhale": 4,
-                        "hold": 4,
-                        "exhale": 4,
-                        "hold_after_exhale": 4,
-                    },
-                    "effect": "Calms nervous system, reduces anxiety",
-                    "quote": "Breathe gently; you’re not alone.",
-                }
-                plan_json = json.dumps(plan, separators=(",", ":"))
-                reply = (
-                    "We can ground together with box breathing."
-                    f"\nPLAN_JSON: {plan_json}\nI'll set that up now."
-                )
-            else:
-                reply = "I'm here with you. That sounds like a lot. What would you like to feel right now?"
-            return ChatResponse(reply=reply, model="coach-local")
+        return "I'm here with you. That sounds like a lot. What would you like to feel right now?"
+
+    def can_speculate(self) -> bool:
+        """Whether a local draft is worth sending ahead of the upstream answer.
 
-        system_prompt = self.load_prompt()
+        Without a key, or while the circuit is open, the offline reply is the
+        final answer anyway.
+        """
+        return self.online and self.breaker.state == CircuitBreaker.CLOSED
+
+    def draft_reply(self, req: ChatRequest) -> str:
+        """Local reply sent first in speculative mode.
+
+        It only carries the default plan when the user explicitly asked for
+        one; a plan inferred from the turn count is left to the upstream.
+        """
+        return self._offline_reply(req, with_plan=self._plan_intent(req) == "asked")
+
+    def _chat_payload(self, req: ChatRequest) -> Tuple[Dict[str, Any], Prompt]:
+        prompt = self.load_prompt()
+        history, dropped = trim_history(
+            req.messages, self.context_tokens, self.summary_tokens
+        )
+        if dropped:
+            CHAT_TRIMMED.inc(amount=dropped)
+        # System prompt first and unchanged between turns, so the upstream's
+        # prompt-prefix cache can reuse it; per-turn notes go after it
         messages: List[ChatMessage] = [
-            ChatMessage(role="system", content=system_prompt)
-        ] + req.messages
+            ChatMessage(role="system", content=prompt.text)
+        ] + history
 
-        payload = {
+        return {
             "model": req.model or self.model_default,
             "messages": [m.model_dump() for m in messages],
             "temperature": req.temperature,
             "max_tokens": req.max_tokens,
-        }
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        async with httpx.AsyncClient(timeout=30) as client:
-            r = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                json=payload,
-                headers=headers,
-            )
+        }, prompt
+
+    async def chat(self, req: ChatRequest) -> ChatResponse:
+        if not self.online:
+            LLM_CALLS.inc("chat", "offline")
+            return ChatResponse(reply=self._offline_reply(req), model="coach-local")
+
+        payload, prompt = self._chat_payload(req)
+        try:
+            data = await self._post("chat", payload)
+        except UpstreamUnavailable:
+            LLM_CALLS.inc("chat", "fallback")
+            return ChatResponse(reply=self._offline_reply(req), model="coach-local")
+        reply = data["choices"][0]["message"]["content"].strip()
+        usage = data.get("usage")
+        return ChatResponse(
+            reply=reply, model=payload["model"], usage=usage, prompt_version=prompt.version
+        )
+
+    async def _post(self, op: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a completion request within the deadline, retrying and hedging.
+
+        Raises UpstreamUnavailable when the circuit is open, the deadline runs
+        out or retryable failures exhaust the attempts; other upstream errors
+        (e.g. 400/401) propagate unchanged.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpen("upstream circuit open")
+        deadline = Deadline(self.policy.deadline)
+        # Endpoints already tried; retries and hedges prefer the others
+        tried: Set[str] = set()
+        attempt = 0
+        while True:
+            try:
+                data = await self._hedged(op, payload, deadline, tried)
+            except Exception as e:  # noqa: BLE001
+                delay = self._retry_delay(op, e, attempt, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            LLM_CALLS.inc(op, "upstream")
+            record_usage(payload["model"], data.get("usage"))
+            return data
+
+    def _retry_delay(
+        self, op: str, e: Exception, attempt: int, deadline: Deadline
+    ) -> Optional[float]:
+        """Seconds to wait before retrying after `e`, or None to give up.
+
+        Giving up on a retryable failure re-raises it as UpstreamUnavailable.
+        """
+        if not is_retryable(e):
+            self.breaker.release()
+            return None
+        self.breaker.record_failure()
+        delay = max(self.policy.backoff(attempt), retry_after(e) or 0.0)
+        if (
+            attempt + 1 >= self.policy.attempts
+            or delay >= deadline.remaining()
+            or not self.breaker.allow()
+        ):
+            raise UpstreamUnavailable(f"upstream failed: {_error_reason(e)}") from e
+        LLM_RETRIES.inc(op)
+        return delay
+
+    async def _hedged(
+        self, op: str, payload: Dict[str, Any], deadline: Deadline, tried: Set[str]
+    ) -> Dict[str, Any]:
+        """One attempt, plus a second identical request if the first is slow.
+
+        The hedge fires after the recent p95 latency (never below
+        LLM_HEDGE_MIN_MS) and at most for LLM_HEDGE_MAX_RATIO of attempts;
+        the first successful response wins and the other is cancelled.
+        """
+        self._attempts += 1
+        delay = None
+        if self.policy.hedge and self._hedges < self.policy.hedge_max_ratio * self._attempts:
+            p95 = self.latency.quantile(0.95)
+            if p95 is not None:
+                delay = max(p95, self.policy.hedge_min_delay)
+        if delay is None or delay >= deadline.remaining():
+            return await self._attempt(op, payload, deadline, tried)
+
+        primary = asyncio.ensure_future(self._attempt(op, payload, deadline, tried))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+            self._hedges += 1
+            LLM_HEDGES.inc(op, "fired")
+            hedge = asyncio.ensure_future(self._attempt(op, payload, deadline, tried))
+            pending.add(hedge)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            LLM_HEDGES.inc(op, "won")
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _attempt(
+        self, op: str, payload: Dict[str, Any], deadline: Deadline, tried: Set[str]
+    ) -> Dict[str, Any]:
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            raise httpx.TimeoutException("deadline exceeded")
+        upstream = self.router.acquire(op, tried)
+        tried.add(upstream.name)
+        ok: Optional[bool] = None
+        timer = UpstreamTimer(op)
+        request = self.client.build_request(
+            "POST",
+            upstream.completions_url,
+            json=self._payload_for(upstream, payload),
+            headers=self._headers(upstream),
+            timeout=remaining,
+            extensions={"trace": timer},
+        )
+
+        async def fetch() -> httpx.Response:
+            r = await self.client.send(request, stream=True)
+            timer.headers_received()
+            try:
+                await r.aread()
+            finally:
+                await r.aclose()
+            return r
+
+        try:
+            # Caps connect + headers + body at the remaining budget, even if the
+            # upstream trickles bytes slower than the per-read timeout
+            r = await asyncio.wait_for(fetch(), remaining)
             r.raise_for_status()
             data = r.json()
-            reply = data["choices"][0]["message"]["content"].strip()
-            usage = data.get("usage")
-        return ChatResponse(reply=reply, model=payload["model"], usage=usage)
+            ok = True
+        except asyncio.TimeoutError as e:
+            ok = False
+            LLM_ERRORS.inc(op, "deadline")
+            raise httpx.TimeoutException("deadline exceeded") from e
+        except Exception as e:
+            ok = outcome(e)
+            LLM_ERRORS.inc(op, _error_reason(e))
+            raise
+        finally:
+            total = timer.finish()
+            # Cancelled (e.g. a hedge that lost): ok stays None
+            self.router.release(upstream, op, total, ok)
+        self.latency.add(total)
+        return data
 
-    async def conversation_to_breathing(self, lines: List[str]) -> Dict[str, Any]:
-        """Implements chat_bot.py behavior: take a short conversation and ask the model to output JSON
-        with a conversation and one mapped breathing technique from MOOD_BREATHING_MAP.
-        Falls back to a simple heuristic if no API key.
+    async def chat_stream(
+        self, req: ChatRequest
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Yield `(event, data)` pairs for a streamed chat turn.
+
+        Events are `token` ({"delta"}), `plan` (the parsed PLAN_JSON object,
+        emitted as soon as its closing brace arrives) and a final `done`
+        ({"reply", "model", "usage"}). The offline coach uses the same protocol,
+        and also answers when the upstream is unavailable before the first token.
         """
-        emotions = [item["emotion"] for item in MOOD_BREATHING_MAP]
-        system_prompt = (
-            "You are a compassionate chatbot.\n"
-            "- Have a short conversation with the user (8–10 lines max).\n"
-            "- The conversation should feel casual and empathetic, not like an interview.\n"
-            "- At the end, analyze the conversation and decide the user’s emotional state.\n"
-            f"- You MUST pick one emotion strictly from this list:\n{emotions}\n"
-            "- Then, return the mapped breathing technique from the given JSON exactly.\n"
-            '- End with: "It seems like you had a very (emotion) kind of day, let\'s do a quick (pattern) to help you."\n'
-            "- Final output must be JSON with this format:\n"
-            '{\n  "conversation": [... bot responses ...],\n  "breathing": { ... one breathing map entry ... }\n}\n'
-        )
+        detector = PlanJsonDetector()
+        parts: List[str] = []
+
+        def on_delta(delta: str) -> List[Tuple[str, Dict[str, Any]]]:
+            parts.append(delta)
+            out: List[Tuple[str, Dict[str, Any]]] = [("token", {"delta": delta})]
+            plan = detector.feed(delta)
+            if plan is not None:
+                out.append(("plan", plan))
+            return out
+
+        def offline() -> Iterator[Tuple[str, Dict[str, Any]]]:
+            reply = self._offline_reply(req)
+            # Word-sized chunks so clients exercise the same incremental path
+            for piece in re.findall(r"\S+\s*|\s+", reply):
+                yield from on_delta(piece)
+            yield "done", {"reply": reply, "model": "coach-local", "usage": None}
 
-        if not self.api_key:
-            # naive heuristic: if 'sleep' appears, pick Sleepy; if 'stress' pick Anxious; else calm
-            text = "\n".join(lines).lower()
-            chosen = MOOD_BREATHING_MAP[0]
-            for item in MOOD_BREATHING_MAP:
-                key = item["emotion"].split("/")[0].strip().lower()
-                if key in text:
-                    chosen = item
+        if not self.online:
+            LLM_CALLS.inc("chat_stream", "offline")
+            for event in offline():
+                yield event
+            return
+
+        payload, prompt = self._chat_payload(req)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        usage = None
+        deadline = Deadline(self.policy.deadline)
+        tried: Set[str] = set()
+        attempt = 0
+        fallback = not self.breaker.allow()
+        while not fallback:
+            emitted = False
+            timer = UpstreamTimer("chat_stream")
+            try:
+                async for event in self._stream_events(
+                    payload, timer, on_delta, deadline, tried
+                ):
+                    if event[0] == "usage":
+                        usage = event[1]
+                    else:
+                        emitted = True
+                        yield event
+                break
+            except Exception as e:  # noqa: BLE001
+                LLM_ERRORS.inc("chat_stream", _error_reason(e))
+                if emitted:
+                    # Tokens already reached the client; a retry would repeat them
+                    self.breaker.record_failure()
+                    raise
+                try:
+                    delay = self._retry_delay("chat_stream", e, attempt, deadline)
+                except UpstreamUnavailable:
+                    fallback = True
                     break
-            return {
-                "conversation": [
-                    "I’m here with you. Let’s take a gentle breath together.",
-                    "Would you like to try box breathing or a slower exhale today?",
-                    "It seems like you had a very {} kind of day, let's do a quick {} to help you.".format(
-                        chosen["emotion"], chosen["pattern"]
-                    ),
-                ],
-                "breathing": chosen,
-            }
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+            finally:
+                timer.finish()
+        if fallback:
+            LLM_CALLS.inc("chat_stream", "fallback")
+            for event in offline():
+                yield event
+            return
+        self.breaker.record_success()
+        LLM_CALLS.inc("chat_stream", "upstream")
+        record_usage(payload["model"], usage)
+        yield "done", {
+            "reply": "".join(parts).strip(),
+            "model": payload["model"],
+            "usage": usage,
+            "prompt_version": prompt.version,
+        }
 
+    async def _stream_events(
+        self,
+        payload: Dict[str, Any],
+        timer: UpstreamTimer,
+        on_delta: Callable[[str], List[Tuple[str, Dict[str, Any]]]],
+        deadline: Deadline,
+        tried: Set[str],
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        usage = None
+        upstream = self.router.acquire("chat_stream", tried)
+        tried.add(upstream.name)
+        started = time.perf_counter()
+        # Endpoints are compared on time to the response head
+        ttfb: Optional[float] = None
+        ok: Optional[bool] = None
+        try:
+            request = self.client.build_request(
+                "POST",
+                upstream.completions_url,
+                json=self._payload_for(upstream, payload),
+                headers=self._headers(upstream),
+                extensions={"trace": timer},
+            )
+            # The deadline bounds time to the response head; once tokens flow the
+            # client's per-read timeout applies
+            try:
+                r = await asyncio.wait_for(
+                    self.client.send(request, stream=True), deadline.remaining()
+                )
+            except asyncio.TimeoutError as e:
+                raise httpx.TimeoutException("deadline exceeded") from e
+            try:
+                timer.headers_received()
+                ttfb = time.perf_counter() - started
+                r.raise_for_status()
+                async for line in r.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(data)
+                    except ValueError:
+                        continue
+                    usage = chunk.get("usage") or usage
+                    for choice in chunk.get("choices") or []:
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            for event in on_delta(delta):
+                                yield event
+            finally:
+                await r.aclose()
+            ok = True
+        except Exception as e:
+            ok = outcome(e)
+            raise
+        finally:
+            elapsed = ttfb if ttfb is not None else time.perf_counter() - started
+            self.router.release(upstream, "chat_stream", elapsed, ok)
+        yield "usage", usage
+
+    async def conversation_to_breathing(self, lines: List[str]) -> Dict[str, Any]:
+        """Take a short conversation and ask the model to output JSON
+        with a conversation and one mapped breathing technique from MOOD_BREATHING_MAP.
+        Falls back to the indexed keyword classifier if no API key.
+        """
+        text = "\n".join(lines)
+        if not self.online:
+            LLM_CALLS.inc("chatbot", "offline")
+            return self._offline_breathing(text)
+        threshold = skip_llm_confidence()
+        if threshold is not None:
+            match = CLASSIFIER.classify(text)
+            if match.confidence >= threshold:
+                LLM_CALLS.inc("chatbot", "classifier")
+                return self._offline_breathing(text, match)
+
+        prompt = self.load_prompt("chatbot")
         payload = {
-            "model": self.model_default,
+            "model": self.fast_model,
             "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": "\n".join(lines)},
+                {"role": "system", "content": prompt.text},
+                {"role": "user", "content": text},
             ],
             "temperature": 0.7,
         }
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        async with httpx.AsyncClient(timeout=30) as client:
-            r = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                json=payload,
-                headers=headers,
+        try:
+            if self.cache is None:
+                return await self._breathing_upstream(payload, prompt)
+            # Many users open with the same few words; share one upstream call
+            key = cache_key(
+                "chatbot", payload["model"], prompt.version, normalize_conversation(lines)
             )
-            r.raise_for_status()
-            data = r.json()
-            content = data["choices"][0]["message"]["content"]
+            computed = False
+
+            def compute() -> Awaitable[Dict[str, Any]]:
+                nonlocal computed
+                computed = True
+                return self._breathing_upstream(payload, prompt)
+
+            result = await self.cache.get_or_compute(key, compute)
+            if not computed:
+                LLM_CALLS.inc("chatbot", "cache")
+            return result
+        except UpstreamUnavailable:
+            # Not cached: the next request should try the upstream again
+            LLM_CALLS.inc("chatbot", "fallback")
+            return self._offline_breathing(text)
+
+    async def iter_breathing(
+        self,
+        conversations: List[List[str]],
+        concurrency: int = 8,
+        offline: bool = False,
+    ) -> AsyncIterator[Tuple[int, Any]]:
+        """Classify many conversations with at most `concurrency` in flight.
+
+        Yields `(index, result)` in completion order; a failed item yields
+        its exception as the result instead of aborting the batch.
+        """
+        queue: "asyncio.Queue[Tuple[int, Any]]" = asyncio.Queue()
+        items = iter(enumerate(conversations))
+
+        async def worker() -> None:
+            for i, lines in items:
+                try:
+                    if offline:
+                        res: Any = self._offline_breathing("\n".join(lines))
+                    else:
+                        res = await self.conversation_to_breathing(lines)
+                except Exception as e:  # noqa: BLE001
+                    res = e
+                await queue.put((i, res))
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(max(1, min(concurrency, len(conversations))))
+        ]
+        try:
+            for _ in range(len(conversations)):
+                yield await queue.get()
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def _offline_breathing(
+        self, text: str, match: Optional[EmotionMatch] = None
+    ) -> Dict[str, Any]:
+        match = match or CLASSIFIER.classify(text)
+        chosen = match.item
+        return {
+            "conversation": [
+                "I’m here with you. Let’s take a gentle breath together.",
+                "Would you like to try box breathing or a slower exhale today?",
+                "It seems like you had a very {} kind of day, let's do a quick {} to help you.".format(
+                    chosen["emotion"], chosen["pattern"]
+                ),
+            ],
+            "breathing": chosen,
+            "confidence": match.confidence,
+        }
+
+    async def _breathing_upstream(
+        self, payload: Dict[str, Any], prompt: Prompt
+    ) -> Dict[str, Any]:
+        data = await self._post("chatbot", payload)
+        content = data["choices"][0]["message"]["content"]
         # Let the caller parse JSON; here we just return a minimal wrapper
-        return {"result": content}
+        return {"result": content, "prompt_version": prompt.version}
+
+
+async def get_llm_service(request: Request) -> LLMService:
+    """FastAPI dependency returning the app-scoped service created in lifespan.
+
+    With LAZY_STARTUP=1 the lifespan leaves it unset and the first request
+    builds it from `app.state.llm_factory`. Tests can swap it with
+    `app.dependency_overrides[get_llm_service]`.
+    """
+    state = request.app.state
+    service = state.llm_service
+    if service is None:
+        service = state.llm_service = state.llm_factory()
+    return service
@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; covers sub-millisecond page hits up to slow upstream turns
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _fmt_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_value(v: float) -> str:
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, v in sorted(self._values.items()):
+            lines.append(f"{self.name}{_fmt_labels(self.label_names, labels)} {_fmt_value(v)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def count(self, *labels: str) -> int:
+        row = self._values.get(labels)
+        return int(sum(row[:-1])) if row else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, row in sorted(self._values.items()):
+            cumulative = 0.0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                le = _fmt_labels(self.label_names, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {_fmt_value(cumulative)}")
+            cumulative += row[len(self.buckets)]
+            le = _fmt_labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {_fmt_value(cumulative)}")
+            base = _fmt_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{base} {row[-1]!r}")
+            lines.append(f"{self.name}_count{base} {_fmt_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn: Callable[[], Iterable[str]]) -> None:
+        """Register a callable producing extra exposition lines at scrape time."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        for fn in self._collectors:
+            lines.extend(fn())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_LATENCY = REGISTRY.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route template",
+        ("method", "route", "status"),
+    )
+)
+HTTP_INFLIGHT = REGISTRY.register(
+    Gauge("http_requests_in_flight", "HTTP requests currently being served")
+)
+LLM_PHASE = REGISTRY.register(
+    Histogram(
+        "llm_upstream_seconds",
+        "Upstream LLM latency split into connect, ttfb (time to response headers) and total",
+        ("op", "phase"),
+    )
+)
+LLM_CALLS = REGISTRY.register(
+    Counter(
+        "llm_calls_total",
+        "LLM-backed requests by operation and where the answer came from",
+        ("op", "source"),
+    )
+)
+LLM_ERRORS = REGISTRY.register(
+    Counter("llm_upstream_errors_total", "Failed upstream LLM calls", ("op", "reason"))
+)
+LLM_RETRIES = REGISTRY.register(
+    Counter("llm_upstream_retries_total", "Upstream LLM attempts after the first", ("op",))
+)
+LLM_HEDGES = REGISTRY.register(
+    Counter(
+        "llm_upstream_hedges_total",
+        "Hedged upstream requests: fired, and won (the hedge answered first)",
+        ("op", "outcome"),
+    )
+)
+LLM_BREAKER_STATE = REGISTRY.register(
+    Gauge(
+        "llm_circuit_state",
+        "Upstream circuit breaker state (0 closed, 1 half-open, 2 open)",
+        ("upstream",),
+    )
+)
+LLM_ROUTED = REGISTRY.register(
+    Counter(
+        "llm_upstream_routed_total",
+        "Upstream attempts by the endpoint the router picked",
+        ("upstream", "op"),
+    )
+)
+LLM_UPSTREAM_LATENCY = REGISTRY.register(
+    Gauge(
+        "llm_upstream_latency_ewma_seconds",
+        "Per-endpoint latency estimate used for routing",
+        ("upstream", "op"),
+    )
+)
+LLM_UPSTREAM_ERROR_RATE = REGISTRY.register(
+    Gauge(
+        "llm_upstream_error_rate",
+        "Per-endpoint decaying error rate used for routing, as of its last attempt",
+        ("upstream",),
+    )
+)
+LLM_UPSTREAM_INFLIGHT = REGISTRY.register(
+    Gauge("llm_upstream_in_flight", "Upstream attempts in flight per endpoint", ("upstream",))
+)
+ADMISSION_INFLIGHT = REGISTRY.register(
+    Gauge("llm_admission_in_flight", "LLM route requests holding an admission slot")
+)
+ADMISSION_QUEUED = REGISTRY.register(
+    Gauge("llm_admission_queued", "LLM route requests waiting for an admission slot")
+)
+ADMISSION_WAIT = REGISTRY.register(
+    Histogram("llm_admission_wait_seconds", "Time queued LLM route requests waited for a slot")
+)
+ADMISSION_REJECTED = REGISTRY.register(
+    Counter(
+        "llm_admission_rejected_total",
+        "LLM route requests turned away (rate_limited, queue_full, queue_timeout)",
+        ("reason",),
+    )
+)
+CHAT_TRIMMED = REGISTRY.register(
+    Counter(
+        "chat_context_trimmed_messages_total",
+        "Older chat messages left out of upstream prompts to fit CHAT_CONTEXT_TOKENS",
+    )
+)
+LLM_PROMPTS = REGISTRY.register(
+    Counter(
+        "llm_prompt_requests_total",
+        "Upstream requests by system prompt and prompt version hash",
+        ("prompt", "version"),
+    )
+)
+LLM_TOKENS = REGISTRY.register(
+    Counter("llm_tokens_total", "Tokens reported by upstream usage", ("model", "kind"))
+)
+CHAT_SPECULATIVE = REGISTRY.register(
+    Counter(
+        "chat_speculative_total",
+        "Speculative chat turns: draft (sent), revised (upstream answer delivered), "
+        "kept (draft stayed final) or skipped (answered without a draft)",
+        ("outcome",),
+    )
+)
+GROUP_ROOMS = REGISTRY.register(Gauge("group_rooms", "Open group breathing rooms"))
+GROUP_SOCKETS = REGISTRY.register(
+    Gauge("group_sockets", "WebSockets subscribed to group rooms")
+)
+GROUP_FRAMES = REGISTRY.register(
+    Counter(
+        "group_frames_total",
+        "Group phase frames per subscriber: sent, or dropped (replaced before a slow socket took it)",
+        ("outcome",),
+    )
+)
+GROUP_KICKED = REGISTRY.register(
+    Counter("group_slow_consumers_total", "Group sockets closed for falling behind")
+)
+EVENTS = REGISTRY.register(
+    Counter(
+        "telemetry_events_total",
+        "Session telemetry events: accepted, rejected (invalid) or dropped (buffer full)",
+        ("outcome",),
+    )
+)
+EVENTS_FLUSH = REGISTRY.register(
+    Histogram("telemetry_flush_seconds", "Time to write one telemetry batch and its rollups")
+)
+
+SESSION_AUDIO = REGISTRY.register(
+    Counter(
+        "session_audio_total",
+        "Guided-session track requests: hit, rendered, coalesced (shared a render), "
+        "failed, busy (too many pending); and evicted tracks",
+        ("outcome",),
+    )
+)
+SESSION_AUDIO_RENDER = REGISTRY.register(
+    Histogram("session_audio_render_seconds", "Time to render and encode one guided-session track")
+)
+
+
+def gauge_lines(name: str, help: str, value: float) -> List[str]:
+    """Exposition lines for a one-off gauge produced by a collector."""
+    return [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {_fmt_value(value)}"]
+
+
+def record_usage(model: str, usage: Optional[Dict[str, object]]) -> None:
+    if not usage:
+        return
+    for kind in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        v = usage.get(kind)
+        if isinstance(v, (int, float)):
+            LLM_TOKENS.inc(model, kind.replace("_tokens", ""), amount=v)
+
+
+class UpstreamTimer:
+    """httpx `trace` extension that splits one upstream call into phases.
+
+    Pass `extensions={"trace": timer}` to the request and call
+    `headers_received()` once the response head arrives; `connect` is only
+    recorded when a new connection was opened (pool misses).
+    """
+
+    __slots__ = ("op", "start", "connect_start", "connect", "ttfb")
+
+    def __init__(self, op: str) -> None:
+        self.op = op
+        self.start = time.perf_counter()
+        self.connect_start: Optional[float] = None
+        self.connect: Optional[float] = None
+        self.ttfb: Optional[float] = None
+
+    async def __call__(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.started":
+            self.connect_start = time.perf_counter()
+        elif event in ("connection.start_tls.complete", "connection.connect_tcp.complete"):
+            if self.connect_start is not None:
+                self.connect = time.perf_counter() - self.connect_start
+
+    def headers_received(self) -> None:
+        if self.ttfb is None:
+            self.ttfb = time.perf_counter() - self.start
+
+    def finish(self) -> float:
+        total = time.perf_counter() - self.start
+        if self.connect is not None:
+            LLM_PHASE.observe(self.connect, self.op, "connect")
+        if self.ttfb is not None:
+            LLM_PHASE.observe(self.ttfb, self.op, "ttfb")
+        LLM_PHASE.observe(total, self.op, "total")
+        return total
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route latency and in-flight requests.
+
+    The route label is the matched path template (e.g. `/api/patterns/box`),
+    the mount path for static files, or `unmatched`, so label cardinality
+    stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp, exclude: Sequence[str] = ("/metrics",)) -> None:
+        self.app = app
+        self.exclude = frozenset(exclude)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_INFLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_INFLIGHT.dec()
+            route = scope.get("route")
+            if route is not None:
+                label = getattr(route, "path", "unmatched")
+            elif scope.get("root_path") and scope.get("app_root_path") is not None:
+                label = scope["root_path"][len(scope["app_root_path"]):] or "unmatched"
+            else:
+                label = "unmatched"
+            HTTP_LATENCY.observe(
+                time.perf_counter() - start, scope["method"], label, str(status[0])
+            )
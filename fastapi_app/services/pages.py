@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from services.preload import Preload, link_header
+
+if TYPE_CHECKING:
+    from fastapi.templating import Jinja2Templates
+
+
+class PageCache:
+    """Renders page templates once into bytes with a strong ETag.
+
+    Page output does not depend on the request, so each template is rendered
+    on first use (or by `warm`) and later hits are a dict lookup. With
+    `reload=True` (DEV_MODE=1) the mtimes of `watch` paths are checked on
+    every hit and everything is re-rendered when one changes; `on_reload`
+    runs first so e.g. the asset manifest can be re-read. Async callers use
+    `page`, which renders (and checks mtimes) in the threadpool, so neither
+    a cold page nor a reload check blocks the event loop. `load_templates`
+    is only called on the first render, which keeps jinja2 out of the
+    import path when warming is skipped (LAZY_STARTUP=1).
+
+    With `preloads`, each page also gets the critical assets of its template
+    (see services/preload.py), sent as a `Link` header and, through
+    `early_hints(path)` for the paths in `routes`, as 103 Early Hints.
+    """
+
+    def __init__(
+        self,
+        load_templates: Callable[[], Jinja2Templates],
+        watch: Iterable[Path] = (),
+        reload: Optional[bool] = None,
+        on_reload: Optional[Callable[[], None]] = None,
+        routes: Optional[Dict[str, str]] = None,
+        preloads: Optional[Callable[[Jinja2Templates, str], List[Preload]]] = None,
+    ) -> None:
+        self.load_templates = load_templates
+        self.routes: Dict[str, str] = dict(routes or {})
+        self.preloads = preloads
+        self._templates: Optional[Jinja2Templates] = None
+        self.watch: List[Path] = list(watch)
+        self.reload = (
+            os.getenv("DEV_MODE", "").lower() in ("1", "true", "yes")
+            if reload is None
+            else reload
+        )
+        self.on_reload = on_reload
+        # name -> (body, etag, Link header value)
+        self._pages: Dict[str, Tuple[bytes, str, str]] = {}
+        self._hints: Dict[str, List[bytes]] = {}
+        self._lock = threading.Lock()
+        self._signature = self._current_signature() if self.reload else None
+
+    @property
+    def templates(self) -> Jinja2Templates:
+        if self._templates is None:
+            with self._lock:
+                if self._templates is None:
+                    self._templates = self.load_templates()
+        return self._templates
+
+    def _current_signature(self) -> Tuple[float, ...]:
+        out = []
+        for root in self.watch:
+            paths = root.rglob("*") if root.is_dir() else [root]
+            for p in paths:
+                try:
+                    out.append(p.stat().st_mtime_ns)
+                except OSError:
+                    out.append(0)
+        return tuple(out)
+
+    def _check_reload(self) -> None:
+        sig = self._current_signature()
+        if sig != self._signature:
+            if self.on_reload is not None:
+                self.on_reload()
+            with self._lock:
+                self._signature = sig
+                self._pages.clear()
+                self._hints.clear()
+
+    def render(self, name: str) -> Tuple[bytes, str, str]:
+        body = self.templates.get_template(name).render({"request": None}).encode("utf-8")
+        etag = '"' + hashlib.blake2s(body, digest_size=10).hexdigest() + '"'
+        preloads = self.preloads(self.templates, name) if self.preloads is not None else []
+        page = (body, etag, link_header(preloads))
+        with self._lock:
+            self._pages[name] = page
+            self._hints[name] = [p.link().encode("latin-1") for p in preloads]
+        return page
+
+    def get(self, name: str) -> Tuple[bytes, str, str]:
+        if self.reload:
+            self._check_reload()
+        page = self._pages.get(name)
+        return page if page is not None else self.render(name)
+
+    async def page(self, name: str) -> Tuple[bytes, str, str]:
+        """`get` for the event loop: a cached page is a dict lookup."""
+        page = None if self.reload else self._pages.get(name)
+        return page if page is not None else await run_in_threadpool(self.get, name)
+
+    async def early_hints(self, path: str) -> Optional[List[bytes]]:
+        """Preload links for the page served at `path`, if it is one."""
+        name = self.routes.get(path)
+        if name is None:
+            return None
+        if name not in self._hints or self.reload:
+            await self.page(name)
+        return self._hints.get(name)
+
+    def warm(self, names: Iterable[str]) -> None:
+        for name in names:
+            self.render(name)
+
+    async def response(self, request: Request, name: str) -> Response:
+        body, etag, links = await self.page(name)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        inm = request.headers.get("if-none-match")
+        if inm and etag in (t.strip() for t in inm.split(",")):
+            return Response(status_code=304, headers=headers)
+        if links:
+            headers["Link"] = links
+        return HTMLResponse(content=body, headers=headers)
@@ -0,0 +1,69 @@
+"""16-bit PCM helpers shared by the audio packager and the session renderer.
+
+Decoding and encoding go through an ffmpeg binary; everything in between
+works on `array("h")` sample buffers at RATE.
+"""
+from __future__ import annotations
+
+import array
+import math
+import subprocess
+import sys
+import wave
+from pathlib import Path
+from typing import List, Optional
+
+RATE = 48_000
+CROSSFADE_SECONDS = 1.0
+
+
+def decode(
+    ffmpeg: str, src: Path, channels: int, filters: Optional[List[str]] = None
+) -> array.array:
+    """Decode `src` to interleaved signed 16-bit PCM at RATE, after `filters`."""
+    cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-i", str(src)]
+    if filters:
+        cmd += ["-af", ",".join(filters)]
+    cmd += ["-f", "s16le", "-acodec", "pcm_s16le", "-ac", str(channels), "-ar", str(RATE), "-"]
+    proc = subprocess.run(cmd, capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.decode(errors="replace").strip() or f"cannot decode {src}")
+    pcm = array.array("h")
+    pcm.frombytes(proc.stdout[: len(proc.stdout) // 2 * 2])
+    if sys.byteorder == "big":
+        pcm.byteswap()
+    return pcm
+
+
+def loop_segment(pcm: array.array, channels: int, seconds: float) -> Optional[array.array]:
+    """The first `seconds` of `pcm`, starting CROSSFADE_SECONDS in, whose
+    tail is crossfaded (equal power) into the audio just before it; playing
+    it back to back continues exactly where the loop started."""
+    fade = int(CROSSFADE_SECONDS * RATE) * channels
+    length = int(seconds * RATE) * channels
+    if len(pcm) < length + fade or length < 2 * fade:
+        return None
+    head = pcm[:fade]
+    out = pcm[fade : fade + length]
+    base = length - fade
+    frames = fade // channels
+    for f in range(frames):
+        t = (f + 0.5) / frames
+        a, b = math.cos(t * math.pi / 2), math.sin(t * math.pi / 2)
+        for c in range(channels):
+            i = f * channels + c
+            v = out[base + i] * a + head[i] * b
+            out[base + i] = max(-32768, min(32767, int(round(v))))
+    return out
+
+
+def write_wav(path: Path, pcm: array.array, channels: int) -> None:
+    data = pcm
+    if sys.byteorder == "big":
+        data = array.array("h", pcm)
+        data.byteswap()
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(data.tobytes())
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Optional
+
+from pydantic import ValidationError
+
+from schemas import BreathingPlan, Config, Pattern
+
+PLAN_TAG = "PLAN_JSON:"
+
+
+class PlanJsonDetector:
+    """Incrementally spots the `PLAN_JSON: {...}` line in a streamed reply.
+
+    Feed text chunks as they arrive; `feed` returns the parsed plan the
+    moment its closing brace is seen, and None otherwise. Mirrors the
+    brace-depth scan in static/js/chat.js but is string/escape aware and
+    never rescans text it has already consumed.
+    """
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._tag_at = -1
+        self._start = -1
+        self._pos = 0
+        self._depth = 0
+        self._in_str = False
+        self._escape = False
+        self.plan: Optional[Dict[str, Any]] = None
+
+    @property
+    def done(self) -> bool:
+        return self.plan is not None
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        if self.plan is not None or not chunk:
+            return None
+        self._buf += chunk
+        if self._tag_at < 0:
+            # Keep a small tail so a tag split across chunks is still found
+            idx = self._buf.find(PLAN_TAG)
+            if idx < 0:
+                keep = len(PLAN_TAG) - 1
+                if len(self._buf) > keep:
+                    self._buf = self._buf[-keep:]
+                return None
+            self._buf = self._buf[idx + len(PLAN_TAG) :]
+            self._tag_at = 0
+            self._pos = 0
+        if self._start < 0:
+            brace = self._buf.find("{", self._pos)
+            if brace < 0:
+                self._pos = len(self._buf)
+                return None
+            self._start = brace
+            self._pos = brace
+        buf = self._buf
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_str = False
+                continue
+            if c == '"':
+                self._in_str = True
+            elif c == "{":
+                self._depth += 1
+            elif c == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    return self._finish(buf[self._start : i + 1], buf[i + 1 :])
+        self._pos = len(buf)
+        return None
+
+    def _finish(self, raw: str, rest: str) -> Optional[Dict[str, Any]]:
+        try:
+            plan = json.loads(raw)
+        except ValueError:
+            plan = None
+        if not isinstance(plan, dict):
+            # Malformed object: look for another tag in whatever follows
+            self.__init__()
+            return self.feed(rest)
+        self.plan = plan
+        return plan
+
+
+def extract_plan_json(text: str) -> Optional[Dict[str, Any]]:
+    """Return the first complete PLAN_JSON object in `text`, if any."""
+    return PlanJsonDetector().feed(text)
+
+
+def _seconds(timing: Dict[str, Any], key: str, default: float) -> float:
+    value = timing.get(key, default)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"timing.{key} must be a number") from None
+
+
+def validate_plan(raw: Dict[str, Any]) -> BreathingPlan:
+    """Map a MOOD_BREATHING_MAP-shaped plan onto the matching config pattern.
+
+    `type` picks the variant ("4 point" box, "3 point" three-phase, anything
+    else two-phase); `timing` keys follow the map (`hold` is hold1 and
+    `hold_after_exhale` is hold2 for box). Missing phases default to 4s, or
+    0s for holds. Raises ValueError for plans that do not validate or whose
+    cycle would be empty.
+    """
+    timing = raw.get("timing")
+    if not isinstance(timing, dict):
+        raise ValueError("plan has no timing object")
+    kind = str(raw.get("type") or "").strip().lower()
+    try:
+        if kind.startswith("4"):
+            variant = "box"
+            pattern: Any = Pattern(
+                inhale=_seconds(timing, "inhale", 4),
+                hold1=_seconds(timing, "hold", 4),
+                exhale=_seconds(timing, "exhale", 4),
+                hold2=_seconds(timing, "hold_after_exhale", 4),
+            )
+        elif kind.startswith("3"):
+            variant = "three"
+            pattern = Config.ThreePhasePattern(
+                inhale=_seconds(timing, "inhale", 4),
+                hold=_seconds(timing, "hold", 0),
+                exhale=_seconds(timing, "exhale", 4),
+            )
+        else:
+            variant = "two"
+            pattern = Config.TwoPhasePattern(
+                inhale=_seconds(timing, "inhale", 4),
+                exhale=_seconds(timing, "exhale", 4),
+            )
+    except ValidationError as e:
+        raise ValueError(e.errors()[0]["msg"]) from None
+    if pattern.total_seconds <= 0:
+        raise ValueError("pattern total must be > 0")
+
+    def text(key: str) -> Optional[str]:
+        value = raw.get(key)
+        if value is None:
+            return None
+        return str(value).strip() or None
+
+    return BreathingPlan(
+        variant=variant,
+        pattern=pattern,
+        emotion=text("emotion"),
+        name=text("pattern"),
+        effect=text("effect"),
+        quote=text("quote"),
+    )
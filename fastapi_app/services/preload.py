@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Set
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+if TYPE_CHECKING:
+    from jinja2 import Environment
+
+# ASGI extension for `103 Early Hints` (Hypercorn); uvicorn does not offer it
+EARLY_HINT = "http.response.early_hint"
+
+
+class Preload(NamedTuple):
+    url: str
+    # "style", "script", "image", or "module" for `<script type="module">`
+    kind: str
+
+    def link(self) -> str:
+        if self.kind == "module":
+            return f"<{self.url}>; rel=modulepreload"
+        return f"<{self.url}>; rel=preload; as={self.kind}"
+
+
+def link_header(preloads: List[Preload]) -> str:
+    return ", ".join(p.link() for p in preloads)
+
+
+def template_preloads(
+    env: Environment,
+    name: str,
+    asset_url: Callable[[str], str],
+    media_for: Callable[[str], Optional[Dict[str, Any]]],
+) -> List[Preload]:
+    """Critical assets of template `name` in document order.
+
+    Walks the Jinja AST of `name` and its `{% extends %}` parents, with each
+    block resolved to its most-derived override as rendering would. Every
+    `asset_url('...css'|'...js')` call becomes a style or script preload
+    (modulepreload when its tag says `type="module"`), and `media_for(...)`
+    contributes the background video's poster image. Videos, audio and
+    images referenced from CSS or scripts are left to the browser: they are
+    large and not needed for first paint.
+    """
+    from jinja2 import nodes
+
+    chain = []
+    seen: Set[str] = set()
+    current: Optional[str] = name
+    while current is not None and current not in seen:
+        seen.add(current)
+        ast = env.parse(env.loader.get_source(env, current)[0], current)
+        chain.append(ast)
+        parent = ast.find(nodes.Extends)
+        current = (
+            parent.template.value
+            if parent is not None and isinstance(parent.template, nodes.Const)
+            else None
+        )
+    blocks: Dict[str, Any] = {}
+    for ast in chain:
+        for block in ast.find_all(nodes.Block):
+            blocks.setdefault(block.name, block)
+
+    def block_text(block_name: str) -> str:
+        block = blocks.get(block_name)
+        if block is None:
+            return ""
+        return "".join(n.data for n in block.find_all(nodes.TemplateData)).strip()
+
+    def argument(call: Any) -> Optional[str]:
+        if len(call.args) != 1:
+            return None
+        arg = call.args[0]
+        if isinstance(arg, nodes.Const) and isinstance(arg.value, str):
+            return arg.value
+        # {{ media_for(self.bg_source()) }}: the block's literal content
+        if (
+            isinstance(arg, nodes.Call)
+            and isinstance(arg.node, nodes.Getattr)
+            and isinstance(arg.node.node, nodes.Name)
+            and arg.node.node.name == "self"
+        ):
+            return block_text(arg.node.attr)
+        return None
+
+    out: List[Preload] = []
+    urls: Set[str] = set()
+    tag = ""
+
+    def add(url: str, kind: str) -> None:
+        if url not in urls:
+            urls.add(url)
+            out.append(Preload(url, kind))
+
+    def walk(node: Any) -> None:
+        nonlocal tag
+        for child in node.iter_child_nodes():
+            if isinstance(child, nodes.Block):
+                walk(blocks[child.name])
+            elif isinstance(child, nodes.TemplateData):
+                # Text of the tag the next expression sits in
+                start = child.data.rfind("<")
+                tag = child.data[start:] if start != -1 else tag + child.data
+            elif isinstance(child, nodes.Call) and isinstance(child.node, nodes.Name):
+                value = argument(child)
+                if value is None:
+                    continue
+                if child.node.name == "asset_url":
+                    if value.endswith(".css"):
+                        add(asset_url(value), "style")
+                    elif value.endswith(".js"):
+                        module = 'type="module"' in tag or "type='module'" in tag
+                        add(asset_url(value), "module" if module else "script")
+                elif child.node.name == "media_for":
+                    media = media_for(value)
+                    if media and media.get("poster"):
+                        add(media["poster"], "image")
+            else:
+                walk(child)
+
+    walk(chain[-1])
+    return out
+
+
+class EarlyHintsMiddleware:
+    """Sends `103 Early Hints` with a page's preload links before the page.
+
+    Only when the server offers the ASGI early-hint extension; elsewhere the
+    same links arrive in the page's `Link` header (which CDNs such as
+    Cloudflare also turn into 103 responses).
+    """
+
+    def __init__(
+        self, app: ASGIApp, hints: Callable[[str], Awaitable[Optional[List[bytes]]]]
+    ) -> None:
+        self.app = app
+        self.hints = hints
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "GET"
+            and EARLY_HINT in scope.get("extensions", {})
+        ):
+            links = await self.hints(scope["path"])
+            if links:
+                await send({"type": EARLY_HINT, "links": links})
+        await self.app(scope, receive, send)
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from data.breathing_map import MOOD_BREATHING_MAP
+
+DEFAULT_COACH_PROMPT = (
+    "You are a calm, supportive breathing coach. Keep answers short, warm, and actionable. "
+    "Prefer simple guidance like box (4-4-4-4), 4-7-8, or equal inhale/exhale. Avoid therapy claims."
+)
+
+
+class Prompt:
+    """A rendered system prompt and the hash that identifies its exact bytes."""
+
+    __slots__ = ("name", "text", "version")
+
+    def __init__(self, name: str, text: str) -> None:
+        self.name = name
+        self.text = text
+        self.version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+def _normalize(text: str) -> str:
+    # Same bytes regardless of editor line endings or trailing whitespace,
+    # so upstream prompt-prefix caches keep hitting across reloads
+    return "\n".join(line.rstrip() for line in text.replace("\r\n", "\n").split("\n")).strip()
+
+
+class PromptRegistry:
+    """Process-wide system prompts, rendered once and reloaded on file change.
+
+    Each prompt has a builder and the files it reads. `get` is a dict lookup;
+    at most every `check_interval` seconds (PROMPT_RELOAD_SECONDS, 0 turns
+    checks off) it stats those files and rebuilds prompts whose mtimes moved.
+    """
+
+    def __init__(self, check_interval: Optional[float] = None) -> None:
+        if check_interval is None:
+            check_interval = float(os.getenv("PROMPT_RELOAD_SECONDS", "2"))
+        self.check_interval = check_interval
+        self._builders: Dict[str, Tuple[Callable[[], str], List[Path]]] = {}
+        self._prompts: Dict[str, Prompt] = {}
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def register(
+        self, name: str, build: Callable[[], str], watch: Iterable[Path] = ()
+    ) -> None:
+        self._builders[name] = (build, list(watch))
+        self._load(name)
+
+    def register_file(self, name: str, candidates: List[Path], default: str) -> None:
+        """The first existing file among `candidates`, else `default`."""
+
+        def build() -> str:
+            for path in candidates:
+                if path.exists():
+                    return path.read_text(encoding="utf-8")
+            return default
+
+        self.register(name, build, candidates)
+
+    def get(self, name: str) -> Prompt:
+        if self.check_interval > 0:
+            now = time.monotonic()
+            if now - self._checked >= self.check_interval:
+                self._checked = now
+                self.reload_changed()
+        return self._prompts[name]
+
+    def versions(self) -> Dict[str, str]:
+        return {name: p.version for name, p in self._prompts.items()}
+
+    def reload_changed(self) -> List[str]:
+        changed = [
+            name
+            for name, (_, watch) in self._builders.items()
+            if _signature(watch) != self._signatures.get(name)
+        ]
+        for name in changed:
+            self._load(name)
+        return changed
+
+    def _load(self, name: str) -> None:
+        build, watch = self._builders[name]
+        with self._lock:
+            self._signatures[name] = _signature(watch)
+            self._prompts[name] = Prompt(name, _normalize(build()))
+
+
+def _signature(paths: List[Path]) -> Tuple[int, ...]:
+    out = []
+    for p in paths:
+        try:
+            out.append(p.stat().st_mtime_ns)
+        except OSError:
+            out.append(0)
+    return tuple(out)
+
+
+def chatbot_prompt() -> str:
+    emotions = [item["emotion"] for item in MOOD_BREATHING_MAP]
+    return (
+        "You are a compassionate chatbot.\n"
+        "- Have a short conversation with the user (8–10 lines max).\n"
+        "- The conversation should feel casual and empathetic, not like an interview.\n"
+        "- At the end, analyze the conversation and decide the user’s emotional state.\n"
+        f"- You MUST pick one emotion strictly from this list:\n{emotions}\n"
+        "- Then, return the mapped breathing technique from the given JSON exactly.\n"
+        '- End with: "It seems like you had a very (emotion) kind of day, let\'s do a quick (pattern) to help you."\n'
+        "- Final output must be JSON with this format:\n"
+        '{\n  "conversation": [... bot responses ...],\n  "breathing": { ... one breathing map entry ... }\n}\n'
+    )
+
+
+_REGISTRIES: Dict[Path, PromptRegistry] = {}
+
+
+def get_prompt_registry(base_dir: Path) -> PromptRegistry:
+    """The shared registry for prompts under `base_dir`, created on first use."""
+    key = Path(base_dir).resolve()
+    registry = _REGISTRIES.get(key)
+    if registry is None:
+        registry = PromptRegistry()
+        # Prefer companion prompt if available
+        registry.register_file(
+            "coach",
+            [key / "PROMPT_COMPANION.txt", key / "PROMPT.txt"],
+            DEFAULT_COACH_PROMPT,
+        )
+        registry.register("chatbot", chatbot_prompt)
+        _REGISTRIES[key] = registry
+    return registry
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import os
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Deque, Optional
+
+from services.lazy import LazyModule
+from services.metrics import LLM_BREAKER_STATE
+
+if TYPE_CHECKING:
+    import httpx
+else:
+    httpx = LazyModule("httpx")
+
+# Statuses worth another attempt; everything else (400, 401, 404, ...) is final
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class UpstreamUnavailable(Exception):
+    """The upstream could not answer in time; callers fall back to offline replies."""
+
+
+class CircuitOpen(UpstreamUnavailable):
+    pass
+
+
+def is_retryable(e: BaseException) -> bool:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code in RETRYABLE_STATUSES
+    return isinstance(e, httpx.TransportError)
+
+
+def retry_after(e: BaseException) -> Optional[float]:
+    """Seconds from a `Retry-After` header on a 429/503, if present."""
+    if not isinstance(e, httpx.HTTPStatusError):
+        return None
+    value = e.response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Deadline:
+    """Time budget for one logical upstream call, shared by all its attempts."""
+
+    __slots__ = ("expires",)
+
+    def __init__(self, seconds: float) -> None:
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+
+class ResiliencePolicy:
+    """Deadline, retry, hedging and breaker settings for upstream LLM calls.
+
+    Defaults come from `from_env()`; see the README for the variables.
+    """
+
+    def __init__(
+        self,
+        deadline: float = 20.0,
+        attempts: int = 3,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        hedge: bool = False,
+        hedge_min_delay: float = 0.3,
+        hedge_max_ratio: float = 0.1,
+        breaker_failures: int = 5,
+        breaker_reset: float = 30.0,
+    ) -> None:
+        self.deadline = deadline
+        self.attempts = max(1, attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_ratio = hedge_max_ratio
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+
+    @classmethod
+    def from_env(cls) -> "ResiliencePolicy":
+        def num(name: str, default: float) -> float:
+            try:
+                return float(os.getenv(name, default))
+            except ValueError:
+                return default
+
+        return cls(
+            deadline=num("LLM_DEADLINE_SECONDS", 20.0),
+            attempts=int(num("LLM_RETRY_ATTEMPTS", 3)),
+            backoff_base=num("LLM_RETRY_BASE_MS", 200) / 1000.0,
+            backoff_max=num("LLM_RETRY_MAX_MS", 2000) / 1000.0,
+            hedge=os.getenv("LLM_HEDGE", "").strip().lower() in ("1", "true", "yes", "on"),
+            hedge_min_delay=num("LLM_HEDGE_MIN_MS", 300) / 1000.0,
+            hedge_max_ratio=num("LLM_HEDGE_MAX_RATIO", 0.1),
+            breaker_failures=int(num("LLM_BREAKER_FAILURES", 5)),
+            breaker_reset=num("LLM_BREAKER_RESET_SECONDS", 30.0),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt` (0-based)."""
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0.0, cap)
+
+
+class LatencyWindow:
+    """Recent successful upstream latencies, used to derive the hedge delay."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CircuitBreaker:
+    """Closed -> open after `failures` consecutive upstream failures.
+
+    While open every call fails fast; after `reset` seconds one probe is let
+    through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, failures: int = 5, reset: float = 30.0, name: str = "default") -> None:
+        self.failures = max(1, failures)
+        self.reset = reset
+        self.name = name
+        self.state = self.CLOSED
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._publish()
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset:
+                return False
+            self._set(self.HALF_OPEN)
+        now = time.monotonic()
+        # A probe abandoned by a cancelled request must not wedge the breaker
+        if self._probing and now - self._probe_started < self.reset:
+            return False
+        self._probing = True
+        self._probe_started = now
+        return True
+
+    def record_success(self) -> None:
+        self._consecutive = 0
+        self._probing = False
+        if self.state != self.CLOSED:
+            self._set(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self._consecutive += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self._consecutive >= self.failures:
+            self._opened_at = time.monotonic()
+            self._set(self.OPEN)
+
+    def release(self) -> None:
+        """Give back a half-open probe slot that ended without a verdict."""
+        self._probing = False
+
+    def _set(self, state: str) -> None:
+        self.state = state
+        self._publish()
+
+    def _publish(self) -> None:
+        value = {self.CLOSED: 0, self.HALF_OPEN: 1, self.OPEN: 2}[self.state]
+        LLM_BREAKER_STATE.set(self.name, value=value)
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import random
+import time
+from typing import TYPE_CHECKING, Any, Collection, Dict, FrozenSet, List, Optional
+
+from services.lazy import LazyModule
+from services.metrics import (
+    LLM_ROUTED,
+    LLM_UPSTREAM_ERROR_RATE,
+    LLM_UPSTREAM_INFLIGHT,
+    LLM_UPSTREAM_LATENCY,
+)
+
+if TYPE_CHECKING:
+    import httpx
+else:
+    httpx = LazyModule("httpx")
+
+# Operation -> tier; `fast` is the short classification behind /api/chatbot
+TIERS = {"chat": "chat", "chat_stream": "chat", "chatbot": "fast"}
+# Request errors that say nothing about the endpoint's health
+CLIENT_STATUSES = frozenset({400, 413, 422})
+# Cost multiplier per unit of (decayed) error rate
+ERROR_PENALTY = 10.0
+
+
+def outcome(e: BaseException) -> Optional[bool]:
+    """False when `e` counts against the endpoint, None when it does not."""
+    if isinstance(e, httpx.HTTPStatusError):
+        return None if e.response.status_code in CLIENT_STATUSES else False
+    return False if isinstance(e, Exception) else None
+
+
+class Upstream:
+    """One OpenAI-compatible endpoint and its recent health.
+
+    Latency is a peak-sensitive EWMA per operation: a slower sample replaces
+    the estimate at once, faster ones pull it down with time constant
+    `decay`. The error rate is an EWMA of failures that also decays while
+    the endpoint is not picked, so a recovered endpoint gets traffic again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        api_key: Optional[str] = None,
+        weight: float = 1.0,
+        models: Optional[Dict[str, str]] = None,
+        tiers: Optional[Collection[str]] = None,
+    ) -> None:
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        # None: use the service's OPENAI_API_KEY
+        self.api_key = api_key
+        self.weight = max(weight, 1e-6)
+        # Logical model (what the app asks for) -> model this endpoint serves
+        self.models = dict(models or {})
+        self.tiers: FrozenSet[str] = frozenset(tiers or set(TIERS.values()))
+        self.in_flight = 0
+        self.picks = 0
+        self.failures = 0
+        self.latency: Dict[str, float] = {}
+        self._error_rate = 0.0
+        self._updated = 0.0
+
+    @property
+    def completions_url(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    def model(self, logical: str) -> str:
+        return self.models.get(logical, logical)
+
+    def error_rate(self, now: float, decay: float) -> float:
+        if not self._error_rate:
+            return 0.0
+        return self._error_rate * math.exp(-(now - self._updated) / decay)
+
+    def observe(
+        self, op: str, seconds: Optional[float], ok: Optional[bool], now: float, decay: float
+    ) -> None:
+        # Weight of the old estimates, by time since the last verdict
+        w = math.exp(-(now - self._updated) / decay) if self._updated else 0.0
+        if seconds is not None:
+            last = self.latency.get(op)
+            if last is None or seconds >= last:
+                self.latency[op] = seconds
+            elif ok:
+                # Failed or abandoned attempts only bound the latency from below
+                self.latency[op] = last * w + seconds * (1.0 - w)
+        if ok is not None:
+            self._error_rate = self.error_rate(now, decay) * w + (0.0 if ok else 1.0) * (1.0 - w)
+            self._updated = now
+            if not ok:
+                self.failures += 1
+
+    def snapshot(self, now: float, decay: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "weight": self.weight,
+            "tiers": sorted(self.tiers),
+            "models": self.models,
+            "in_flight": self.in_flight,
+            "picks": self.picks,
+            "failures": self.failures,
+            "latency_ms": {op: round(s * 1000, 1) for op, s in sorted(self.latency.items())},
+            "error_rate": round(self.error_rate(now, decay), 4),
+        }
+
+
+class UpstreamRouter:
+    """Spreads upstream LLM calls across endpoints.
+
+    For each attempt, two candidates serving the operation's tier are drawn
+    at random in proportion to `weight` (capacity), and the one with the
+    lower cost is used: latency EWMA x (1 + in-flight / weight) x
+    (1 + ERROR_PENALTY x error rate). Endpoints without a latency sample for
+    the operation are assumed as fast as the fastest known one, so they are
+    probed. `avoid` steers retries and hedges to endpoints not tried yet.
+    With `strategy="weighted"` the first draw is used as is (for comparison).
+    """
+
+    def __init__(
+        self,
+        upstreams: List[Upstream],
+        decay: float = 10.0,
+        strategy: str = "p2c",
+        configured: bool = False,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        if not upstreams:
+            raise ValueError("at least one upstream is required")
+        names = [u.name for u in upstreams]
+        if len(set(names)) != len(names):
+            raise ValueError(f"duplicate upstream names: {names}")
+        for tier in set(TIERS.values()):
+            if not any(tier in u.tiers for u in upstreams):
+                raise ValueError(f"no upstream serves the {tier!r} tier")
+        self.upstreams = upstreams
+        self.decay = max(decay, 1e-3)
+        self.strategy = strategy
+        # True when LLM_UPSTREAMS lists endpoints (with keys of their own)
+        self.configured = configured
+        self.rng = rng or random.Random()
+
+    @classmethod
+    def from_env(cls, base_url: str) -> "UpstreamRouter":
+        """Endpoints from LLM_UPSTREAMS (a JSON list), else `base_url` alone.
+
+        Each entry: {"name", "base_url", "weight"?, "api_key"? or
+        "api_key_env"?, "models"? ({logical: served}), "tiers"? (["chat",
+        "fast"])}.
+        """
+        decay = float(os.getenv("LLM_ROUTE_DECAY_SECONDS", "10"))
+        strategy = os.getenv("LLM_ROUTE_STRATEGY", "p2c")
+        raw = os.getenv("LLM_UPSTREAMS", "").strip()
+        if not raw:
+            return cls([Upstream("default", base_url)], decay=decay, strategy=strategy)
+        upstreams = []
+        for i, entry in enumerate(json.loads(raw)):
+            key = entry.get("api_key")
+            if key is None and entry.get("api_key_env"):
+                key = os.getenv(entry["api_key_env"], "")
+            upstreams.append(
+                Upstream(
+                    name=str(entry.get("name") or f"upstream{i}"),
+                    base_url=entry["base_url"],
+                    api_key=key,
+                    weight=float(entry.get("weight", 1.0)),
+                    models=entry.get("models"),
+                    tiers=entry.get("tiers"),
+                )
+            )
+        return cls(upstreams, decay=decay, strategy=strategy, configured=True)
+
+    def _cost(self, up: Upstream, op: str, now: float) -> float:
+        latency = up.latency.get(op)
+        if latency is None:
+            known = [u.latency[op] for u in self.upstreams if op in u.latency]
+            latency = min(known) if known else 0.0
+        return (
+            latency
+            * (1.0 + up.in_flight / up.weight)
+            * (1.0 + ERROR_PENALTY * up.error_rate(now, self.decay))
+        )
+
+    def _draw(self, pool: List[Upstream]) -> Upstream:
+        return self.rng.choices(pool, weights=[u.weight for u in pool])[0]
+
+    def acquire(self, op: str, avoid: Collection[str] = ()) -> Upstream:
+        """Pick the endpoint for one attempt and count it as in flight."""
+        tier = TIERS.get(op, "chat")
+        pool = [u for u in self.upstreams if tier in u.tiers]
+        fresh = [u for u in pool if u.name not in avoid]
+        pool = fresh or pool
+        if len(pool) == 1:
+            up = pool[0]
+        else:
+            up = self._draw(pool)
+            if self.strategy == "p2c":
+                other = self._draw([u for u in pool if u is not up])
+                now = time.monotonic()
+                if self._cost(other, op, now) < self._cost(up, op, now):
+                    up = other
+        up.in_flight += 1
+        up.picks += 1
+        LLM_ROUTED.inc(up.name, op)
+        LLM_UPSTREAM_INFLIGHT.set(up.name, value=up.in_flight)
+        return up
+
+    def release(
+        self, up: Upstream, op: str, seconds: Optional[float], ok: Optional[bool]
+    ) -> None:
+        """End an attempt: `ok` None for cancelled or client-caused failures."""
+        up.in_flight -= 1
+        now = time.monotonic()
+        up.observe(op, seconds, ok, now, self.decay)
+        LLM_UPSTREAM_INFLIGHT.set(up.name, value=up.in_flight)
+        if op in up.latency:
+            LLM_UPSTREAM_LATENCY.set(up.name, op, value=up.latency[op])
+        LLM_UPSTREAM_ERROR_RATE.set(up.name, value=up.error_rate(now, self.decay))
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [u.snapshot(now, self.decay) for u in self.upstreams]
@@ -0,0 +1,468 @@
+from __future__ import annotations
+
+import array
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from starlette.requests import HTTPConnection
+
+from services.metrics import SESSION_AUDIO, SESSION_AUDIO_RENDER
+from services.pcm import RATE, decode, loop_segment, write_wav
+
+# Cue and ambient sources under static/ (also packaged by tools/build_audio.py)
+BREATH_CUES = {"inhale": "audio/breath-in.mp3", "exhale": "audio/breath-out.mp3"}
+AMBIENT = "audio/water-noises.mp3"
+
+# Bump when the mix changes, so earlier renders are not served for new keys
+RENDER_VERSION = 1
+CUE_GAIN = 0.9
+BED_GAIN = 0.35
+BED_LOOP_SECONDS = 20.0
+FADE_SECONDS = 1.5
+# A cue cut short by its phase fades out over this long
+CUE_FADE_SECONDS = 0.05
+# Tempo range for fitting a cue to its phase, as in the browser engine
+TEMPO_LIMITS = (0.25, 4.0)
+# Phase lengths are rounded to this step before keying, bounding how many
+# distinct tracks arbitrary timings can produce
+PHASE_QUANTUM = 0.1
+
+# format -> (mime type, extension, ffmpeg encoder args)
+FORMATS: Dict[str, Tuple[str, str, List[str]]] = {
+    "opus": ("audio/webm; codecs=opus", ".webm", ["-c:a", "libopus", "-b:a", "32k", "-vbr", "on"]),
+    "aac": ("audio/mp4; codecs=mp4a.40.2", ".m4a", ["-c:a", "aac", "-b:a", "48k", "-movflags", "+faststart"]),
+    "mp3": ("audio/mpeg", ".mp3", ["-c:a", "libmp3lame", "-b:a", "48k"]),
+}
+_NAME = re.compile(r"^([0-9a-f]{20})\.(webm|m4a|mp3)$")
+
+Phases = Tuple[Tuple[str, float], ...]
+
+
+class SessionAudioUnavailable(Exception):
+    """No ffmpeg (or no sources) to render with; clients keep in-browser cues."""
+
+
+class SessionAudioBusy(SessionAudioUnavailable):
+    """Too many renders pending; the client should retry later."""
+
+
+class RenderSpec(NamedTuple):
+    phases: Phases
+    cycles: int
+    ambient: bool = True
+    format: str = "opus"
+
+    @classmethod
+    def build(
+        cls, phases: Iterable[Tuple[str, float]], cycles: int, ambient: bool = True, format: str = "opus"
+    ) -> "RenderSpec":
+        # Rounded to PHASE_QUANTUM, so 4 and 4.03 share a render; phases
+        # that round to nothing are dropped
+        steps = ((n, round(float(s) / PHASE_QUANTUM)) for n, s in phases)
+        return cls(
+            tuple((n, round(k * PHASE_QUANTUM, 3)) for n, k in steps if k > 0),
+            cycles,
+            ambient,
+            format,
+        )
+
+    @property
+    def cycle_seconds(self) -> float:
+        return sum(s for _, s in self.phases)
+
+    @property
+    def seconds(self) -> float:
+        return self.cycle_seconds * self.cycles
+
+
+class SessionAudio(NamedTuple):
+    key: str
+    path: Path
+    spec: RenderSpec
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    @property
+    def media_type(self) -> str:
+        return FORMATS[self.spec.format][0]
+
+
+def atempo_chain(tempo: float) -> List[str]:
+    """`atempo` filters for `tempo`; one instance only covers 0.5-2.0 well."""
+    out = []
+    while tempo < 0.5:
+        out.append("atempo=0.5")
+        tempo /= 0.5
+    while tempo > 2.0:
+        out.append("atempo=2.0")
+        tempo /= 2.0
+    out.append(f"atempo={tempo:.6f}")
+    return out
+
+
+class SessionAudioCache:
+    """Guided-session tracks rendered once and kept on disk.
+
+    A track is the breath cues, each time-stretched (pitch kept) to its
+    phase, laid over a seamless ambient loop for `cycles` cycles and encoded
+    as one compact stream. Files are named by a hash of everything that
+    shapes them (phase timings, cycles, mix, format, source bytes), so a
+    name never changes meaning and can be cached forever. The directory is
+    an LRU by modification time, bumped on every hit, trimmed to
+    `max_bytes`; tracks rendered by `warm` are never evicted. Concurrent
+    requests for the same track share one render; at most `concurrency`
+    ffmpeg renders run at once, at most `max_pending` distinct tracks
+    wait or render and each client starts at most `max_per_client` of them
+    (SessionAudioBusy beyond either). Sources are checked and hashed once,
+    at construction.
+    """
+
+    def __init__(
+        self,
+        static_dir: Path,
+        directory: Path,
+        max_bytes: int = 200 * 1024 * 1024,
+        ffmpeg: Optional[str] = None,
+        concurrency: int = 1,
+        max_seconds: float = 1800.0,
+        max_pending: int = 4,
+        max_per_client: int = 1,
+    ) -> None:
+        self.static_dir = static_dir
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ffmpeg = ffmpeg
+        self.concurrency = max(1, concurrency)
+        self.max_seconds = max_seconds
+        self.max_pending = max(1, max_pending)
+        self.max_per_client = max(1, max_per_client)
+        # File names of pre-warmed tracks, kept through eviction
+        self._pinned: Set[str] = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, "asyncio.Future[SessionAudio]"] = {}
+        # Renders started per client key, while they wait or run
+        self._clients: Dict[str, int] = {}
+        # Decoded audio reused across renders
+        self._raw: Dict[str, array.array] = {}
+        self._stretched: Dict[Tuple[str, float], array.array] = {}
+        self._bed_pcm: Optional[array.array] = None
+        self._lock = threading.Lock()
+        self.available = bool(ffmpeg) and all(
+            (static_dir / rel).is_file() for rel in [*BREATH_CUES.values(), AMBIENT]
+        )
+        self._sources = self._hash_sources() if self.available else ""
+
+    @classmethod
+    def from_env(cls, base_dir: Path) -> "SessionAudioCache":
+        directory = os.getenv("SESSION_AUDIO_DIR") or str(base_dir / "var" / "session-audio")
+        return cls(
+            static_dir=base_dir / "static",
+            directory=Path(directory),
+            max_bytes=int(float(os.getenv("SESSION_AUDIO_MAX_MB", "200")) * 1024 * 1024),
+            ffmpeg=shutil.which(os.getenv("FFMPEG") or "ffmpeg"),
+            concurrency=int(os.getenv("SESSION_AUDIO_CONCURRENCY", "1")),
+            max_seconds=float(os.getenv("SESSION_AUDIO_MAX_SECONDS", "1800")),
+            max_pending=int(os.getenv("SESSION_AUDIO_MAX_PENDING", "4")),
+            max_per_client=int(os.getenv("SESSION_AUDIO_MAX_PER_CLIENT", "1")),
+        )
+
+
+    def _hash_sources(self) -> str:
+        h = hashlib.sha256()
+        for rel in [*BREATH_CUES.values(), AMBIENT]:
+            h.update(hashlib.sha256((self.static_dir / rel).read_bytes()).digest())
+        return h.hexdigest()
+
+    def key(self, spec: RenderSpec) -> str:
+        blob = json.dumps(
+            {
+                "v": RENDER_VERSION,
+                "phases": spec.phases,
+                "cycles": spec.cycles,
+                "ambient": spec.ambient,
+                "encoder": FORMATS[spec.format][2],
+                "mix": [RATE, CUE_GAIN, BED_GAIN, BED_LOOP_SECONDS, FADE_SECONDS, TEMPO_LIMITS],
+                "sources": self._sources,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(blob.encode()).hexdigest()[:20]
+
+    def lookup(self, name: str) -> Optional[Path]:
+        """Path of a rendered track by file name, counting it as used."""
+        if not _NAME.match(name):
+            return None
+        path = self.directory / name
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    @staticmethod
+    def media_type(name: str) -> str:
+        ext = os.path.splitext(name)[1]
+        return next((mime for mime, e, _ in FORMATS.values() if e == ext), "application/octet-stream")
+
+    def track(self, spec: RenderSpec) -> SessionAudio:
+        key = self.key(spec)
+        return SessionAudio(key, self.directory / (key + FORMATS[spec.format][1]), spec)
+
+    async def get(self, spec: RenderSpec, client: Optional[str] = None) -> SessionAudio:
+        """The track for `spec`, rendered first if it is not cached.
+
+        Raises ValueError for specs that cannot be rendered and
+        SessionAudioUnavailable when rendering is not possible here
+        (SessionAudioBusy when too many renders are pending, overall or
+        started by `client`).
+        """
+        if spec.format not in FORMATS:
+            raise ValueError(f"format must be one of {sorted(FORMATS)}")
+        if spec.cycles < 1 or spec.cycle_seconds <= 0:
+            raise ValueError("session must have at least one non-empty cycle")
+        if spec.seconds > self.max_seconds:
+            raise ValueError(f"session longer than {self.max_seconds:g}s")
+        if not self.available:
+            raise SessionAudioUnavailable("session audio rendering is not available")
+        track = self.track(spec)
+        key = track.key
+        if await asyncio.to_thread(self.lookup, track.name) is not None:
+            SESSION_AUDIO.inc("hit")
+            return track
+        pending = self._inflight.get(key)
+        if pending is not None:
+            SESSION_AUDIO.inc("coalesced")
+            return await asyncio.shield(pending)
+        if len(self._inflight) >= self.max_pending:
+            SESSION_AUDIO.inc("busy")
+            raise SessionAudioBusy("too many session renders pending")
+        if client is not None and self._clients.get(client, 0) >= self.max_per_client:
+            SESSION_AUDIO.inc("busy")
+            raise SessionAudioBusy("a session render for this client is already pending")
+        future = asyncio.ensure_future(self._render(track))
+        self._inflight[key] = future
+        if client is not None:
+            self._clients[client] = self._clients.get(client, 0) + 1
+        future.add_done_callback(lambda _: self._done(key, client))
+        return await asyncio.shield(future)
+
+    def _done(self, key: str, client: Optional[str]) -> None:
+        self._inflight.pop(key, None)
+        if client is not None:
+            left = self._clients.pop(client, 1) - 1
+            if left > 0:
+                self._clients[client] = left
+
+    async def _render(self, track: SessionAudio) -> SessionAudio:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        async with self._slots:
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self.render, track)
+            except Exception:
+                SESSION_AUDIO.inc("failed")
+                raise
+            SESSION_AUDIO_RENDER.observe(time.perf_counter() - started)
+            SESSION_AUDIO.inc("rendered")
+        await asyncio.to_thread(self.evict, track.path)
+        return track
+
+    async def warm(self, specs: Iterable[RenderSpec]) -> None:
+        """Render `specs` in the background; failures only show in metrics."""
+        if not self.available:
+            return
+        for spec in specs:
+            try:
+                if spec.format in FORMATS:
+                    self._pinned.add(self.track(spec).name)
+                await self.get(spec)
+            except (ValueError, SessionAudioUnavailable, RuntimeError, OSError):
+                pass
+
+    async def aclose(self) -> None:
+        """Cancel renders in progress (their ffmpeg runs finish in the background)."""
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # -- rendering (worker threads) --
+
+    def _raw_cue(self, name: str) -> array.array:
+        pcm = self._raw.get(name)
+        if pcm is None:
+            pcm = self._raw[name] = decode(self.ffmpeg, self.static_dir / BREATH_CUES[name], 1)
+        return pcm
+
+    def _cue(self, name: str, seconds: float) -> array.array:
+        """Cue `name` stretched (pitch kept) to about `seconds`."""
+        pcm = self._stretched.get((name, seconds))
+        if pcm is not None:
+            return pcm
+        raw = self._raw_cue(name)
+        tempo = len(raw) / RATE / seconds
+        tempo = min(max(tempo, TEMPO_LIMITS[0]), TEMPO_LIMITS[1])
+        if abs(tempo - 1.0) < 0.01:
+            pcm = raw
+        else:
+            pcm = decode(
+                self.ffmpeg, self.static_dir / BREATH_CUES[name], 1, atempo_chain(tempo)
+            )
+        # Patterns are few; keep the working set bounded all the same
+        if len(self._stretched) >= 64:
+            self._stretched.clear()
+        self._stretched[(name, seconds)] = pcm
+        return pcm
+
+    def _bed(self) -> array.array:
+        if self._bed_pcm is None:
+            src = decode(self.ffmpeg, self.static_dir / AMBIENT, 1)
+            # Sources shorter than the loop are looped as they are
+            self._bed_pcm = loop_segment(src, 1, BED_LOOP_SECONDS) or src
+        return self._bed_pcm
+
+    def _cycle(self, phases: Phases) -> array.array:
+        """One cycle of cues on silence; phase starts rounded to the sample."""
+        total = round(sum(s for _, s in phases) * RATE)
+        out = array.array("h", bytes(total * 2))
+        t = 0.0
+        for name, seconds in phases:
+            start = round(t * RATE)
+            t += seconds
+            if name not in BREATH_CUES:
+                continue
+            room = round(t * RATE) - start
+            cue = self._cue(name, seconds)
+            n = min(len(cue), room)
+            out[start : start + n] = cue[:n]
+            if n < len(cue):
+                fade = min(n, int(CUE_FADE_SECONDS * RATE))
+                for i in range(fade):
+                    j = start + n - fade + i
+                    out[j] = int(out[j] * (fade - i) / fade)
+        return out
+
+    def render(self, track: SessionAudio) -> None:
+        spec = track.spec
+        _, ext, encoder = FORMATS[spec.format]
+        # The decoded-audio caches are shared by concurrent renders
+        with self._lock:
+            cues = self._cycle(spec.phases)
+            bed_pcm = self._bed() if spec.ambient else None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        seconds = spec.seconds
+        fade = min(FADE_SECONDS, seconds / 4)
+        with tempfile.TemporaryDirectory(dir=self.directory) as tmp:
+            cycle = Path(tmp) / "cycle.wav"
+            write_wav(cycle, cues, 1)
+            # The cycle is repeated sample-exactly, so cues never drift
+            inputs = ["-stream_loop", str(spec.cycles - 1), "-i", str(cycle)]
+            graph = f"[0:a]volume={CUE_GAIN}"
+            if bed_pcm is not None:
+                bed = Path(tmp) / "bed.wav"
+                write_wav(bed, bed_pcm, 1)
+                inputs += ["-stream_loop", "-1", "-i", str(bed)]
+                graph += (
+                    f"[c];[1:a]volume={BED_GAIN},afade=t=in:d={fade}[b];"
+                    "[c][b]amix=inputs=2:duration=first:normalize=0"
+                )
+            graph += f",afade=t=out:st={seconds - fade:.3f}:d={fade}[out]"
+            out = Path(tmp) / ("render" + ext)
+            cmd = [
+                self.ffmpeg, "-hide_banner", "-loglevel", "error", "-y", *inputs,
+                "-filter_complex", graph, "-map", "[out]", "-t", f"{seconds:.3f}",
+                "-ac", "1", *encoder, str(out),
+            ]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0 or not out.exists():
+                raise RuntimeError(
+                    (proc.stderr.strip().splitlines() or ["ffmpeg failed"])[-1]
+                )
+            os.replace(out, track.path)
+
+    def evict(self, keep: Optional[Path] = None) -> None:
+        """Delete least recently used tracks until the cache fits `max_bytes`."""
+        files = []
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for entry in entries:
+            if _NAME.match(entry.name):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if (keep is not None and path == str(keep)) or os.path.basename(path) in self._pinned:
+                continue
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            SESSION_AUDIO.inc("evicted")
+
+    def stats(self) -> Dict[str, Any]:
+        files = [p for p in self.directory.glob("*") if _NAME.match(p.name)] if self.directory.is_dir() else []
+        return {
+            "available": self.available,
+            "tracks": len(files),
+            "bytes": sum(p.stat().st_size for p in files),
+            "max_bytes": self.max_bytes,
+            "rendering": len(self._inflight),
+            "max_pending": self.max_pending,
+            "max_per_client": self.max_per_client,
+            "pinned": len(self._pinned),
+        }
+
+
+def warm_specs(
+    cycles: Optional[int] = None, formats: Optional[Iterable[str]] = None
+) -> List[RenderSpec]:
+    """The MOOD_BREATHING_MAP patterns, with and without ambient, per format.
+
+    Defaults: SESSION_AUDIO_WARM_CYCLES (5) and the comma-separated
+    SESSION_AUDIO_WARM_FORMATS (`opus`; empty disables pre-warming).
+    """
+    from data.breathing_map import MOOD_BREATHING_MAP
+    from services.group_sessions import phase_plan
+    from services.plan_parser import validate_plan
+
+    if cycles is None:
+        cycles = int(os.getenv("SESSION_AUDIO_WARM_CYCLES", "5"))
+    if formats is None:
+        formats = os.getenv("SESSION_AUDIO_WARM_FORMATS", "opus").split(",")
+    formats = [f.strip() for f in formats if f.strip() in FORMATS]
+    specs: Dict[RenderSpec, None] = {}
+    for item in MOOD_BREATHING_MAP:
+        try:
+            plan = validate_plan(item)
+            phases = phase_plan(plan.variant, plan.pattern)
+        except ValueError:
+            continue
+        for fmt in formats:
+            for ambient in (False, True):
+                specs[RenderSpec.build(phases, cycles, ambient, fmt)] = None
+    return list(specs)
+
+
+async def get_session_audio(conn: HTTPConnection) -> SessionAudioCache:
+    return conn.app.state.session_audio
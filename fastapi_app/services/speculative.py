@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Optional
+
+from starlette.requests import HTTPConnection
+
+from schemas import ChatResponse
+from services.metrics import CHAT_SPECULATIVE
+
+
+class Revision:
+    __slots__ = ("id", "task", "expires")
+
+    def __init__(self, rid: str, task: "asyncio.Task[ChatResponse]", expires: float) -> None:
+        self.id = rid
+        self.task = task
+        self.expires = expires
+
+
+class RevisionStore:
+    """Upstream answers still owed to speculative `/api/chat` turns.
+
+    Each revision is a task that runs after its draft was returned, so it no
+    longer holds an admission slot; `max_pending` bounds how many run at once
+    and further speculative turns are answered the normal way. Finished
+    results are kept until `ttl` seconds after the turn, then forgotten; a
+    revision still running at that point is cancelled.
+    """
+
+    def __init__(self, max_pending: int = 64, ttl: float = 120.0) -> None:
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Revision]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "RevisionStore":
+        return cls(
+            max_pending=int(os.getenv("CHAT_SPECULATIVE_MAX_PENDING", "64")),
+            ttl=float(os.getenv("CHAT_REVISION_TTL", "120")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def pending(self) -> int:
+        return sum(1 for r in self._data.values() if not r.task.done())
+
+    def full(self) -> bool:
+        self._evict(time.monotonic())
+        return self.pending() >= self.max_pending
+
+    def start(self, work: Awaitable[ChatResponse]) -> str:
+        now = time.monotonic()
+        self._evict(now)
+        task = asyncio.ensure_future(work)
+        task.add_done_callback(_count)
+        rev = Revision(uuid.uuid4().hex, task, now + self.ttl)
+        self._data[rev.id] = rev
+        return rev.id
+
+    def get(self, rid: str) -> Optional["asyncio.Task[ChatResponse]"]:
+        self._evict(time.monotonic())
+        rev = self._data.get(rid)
+        return rev.task if rev is not None else None
+
+    def cancel(self, rid: str) -> Optional[bool]:
+        """Drop a revision; True if it was still running, None if unknown."""
+        rev = self._data.pop(rid, None)
+        if rev is None:
+            return None
+        return rev.task.cancel()
+
+    def _evict(self, now: float) -> None:
+        data = self._data
+        while data:
+            oldest = next(iter(data.values()))
+            if oldest.expires > now:
+                break
+            del data[oldest.id]
+            oldest.task.cancel()
+
+    async def aclose(self) -> None:
+        tasks = [r.task for r in self._data.values()]
+        self._data.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _count(task: "asyncio.Task[ChatResponse]") -> None:
+    if task.cancelled() or task.exception() is not None:
+        CHAT_SPECULATIVE.inc("kept")
+    else:
+        CHAT_SPECULATIVE.inc("revised")
+
+
+async def get_revision_store(conn: HTTPConnection) -> RevisionStore:
+    return conn.app.state.revisions
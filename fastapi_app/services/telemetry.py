@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.requests import HTTPConnection
+
+from services.metrics import EVENTS, EVENTS_FLUSH
+
+KINDS = frozenset({"start", "phase", "complete"})
+VARIANTS = frozenset({"box", "three", "two", "focus", "deep_focus"})
+PAGES = frozenset({"box", "circle", "focus", "deep-focus"})
+PHASES = frozenset({"inhale", "hold", "exhale", "focus", "break"})
+MAX_SECONDS = 86_400.0
+# SQLite INTEGER range; larger values make executemany raise OverflowError
+INT64_MIN, INT64_MAX = -(2**63), 2**63 - 1
+
+logger = logging.getLogger(__name__)
+
+# (received_ms, day, kind, variant, page, run, phase, seconds, cycles, client_ms)
+Row = Tuple[
+    int, str, str, str, Optional[str], str, Optional[str], Optional[float], Optional[int], Optional[int]
+]
+
+
+def _number(v: Any) -> Optional[float]:
+    if type(v) in (int, float) and 0 <= v <= MAX_SECONDS:
+        return float(v)
+    return None
+
+
+def _client_ms(v: Any) -> Optional[int]:
+    # Beacons are parsed with the stdlib when orjson is missing, which lets NaN through
+    if type(v) in (int, float) and math.isfinite(v):
+        return max(INT64_MIN, min(INT64_MAX, int(v)))
+    return None
+
+
+def parse_events(payload: Any, received_ms: int, day: str) -> Tuple[List[Row], int]:
+    """Validate a beacon body into rows; returns `(rows, rejected)`.
+
+    Body: `{"p": page, "e": [{"t", "r", "v", "at"?, "d"?, "n"?, "c"?}, ...]}`
+    where `t` is start/phase/complete, `r` a client-chosen run id, `v` the
+    variant, `at` client ms, `d` seconds (phase length, or run length on
+    complete), `n` the phase name and `c` cycles done. Bad events are
+    skipped one by one so a single typo does not lose the batch.
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("e"), list):
+        return [], 1
+    page = payload.get("p")
+    if page not in PAGES:
+        page = None
+    rows: List[Row] = []
+    rejected = 0
+    for e in payload["e"]:
+        if not isinstance(e, dict):
+            rejected += 1
+            continue
+        kind = e.get("t")
+        variant = e.get("v")
+        run = e.get("r")
+        if (
+            kind not in KINDS
+            or variant not in VARIANTS
+            or type(run) is not str
+            or not 0 < len(run) <= 64
+        ):
+            rejected += 1
+            continue
+        phase = e.get("n")
+        cycles = e.get("c")
+        rows.append(
+            (
+                received_ms,
+                day,
+                kind,
+                variant,
+                page,
+                run,
+                phase if phase in PHASES else None,
+                _number(e.get("d")),
+                cycles if type(cycles) is int and 0 <= cycles < 1_000_000 else None,
+                _client_ms(e.get("at")),
+            )
+        )
+    return rows, rejected
+
+
+class EventLog:
+    """Buffered, append-only session telemetry in SQLite (WAL).
+
+    `add` only appends validated tuples to an in-memory list. A background
+    task flushes the list with one `executemany` per batch once it holds
+    `flush_events` rows or every `flush_interval` seconds. The same
+    transaction folds the batch into `session_daily` rollups (starts,
+    completions, completed seconds per UTC day and variant), so summary
+    queries never scan raw events. Up to `max_buffer` rows are held while
+    the database is unavailable; beyond that new events are dropped.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        flush_events: int = 500,
+        flush_interval: float = 2.0,
+        max_buffer: int = 50_000,
+    ) -> None:
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.flush_events = flush_events
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: List[Row] = []
+        self._lock = threading.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._db = sqlite3.connect(str(path), check_same_thread=False, timeout=5.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS session_events ("
+            "received INTEGER NOT NULL, day TEXT NOT NULL, kind TEXT NOT NULL, "
+            "variant TEXT NOT NULL, page TEXT, run TEXT NOT NULL, phase TEXT, "
+            "seconds REAL, cycles INTEGER, client_ms INTEGER)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS session_daily ("
+            "day TEXT NOT NULL, variant TEXT NOT NULL, starts INTEGER NOT NULL, "
+            "completions INTEGER NOT NULL, completed_seconds REAL NOT NULL, "
+            "PRIMARY KEY (day, variant)) WITHOUT ROWID"
+        )
+        self._db.commit()
+
+    @classmethod
+    def from_env(cls, base_dir: Path) -> "EventLog":
+        return cls(
+            os.getenv("TELEMETRY_PATH", str(base_dir / "var" / "telemetry.db")),
+            flush_events=int(os.getenv("TELEMETRY_FLUSH_EVENTS", "500")),
+            flush_interval=float(os.getenv("TELEMETRY_FLUSH_SECONDS", "2")),
+            max_buffer=int(os.getenv("TELEMETRY_MAX_BUFFER", "50000")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def add(self, rows: List[Row]) -> int:
+        """Queue rows for the next flush; returns how many were dropped."""
+        room = self.max_buffer - len(self._buffer)
+        dropped = max(0, len(rows) - room)
+        if dropped:
+            rows = rows[: max(0, room)]
+        self._buffer.extend(rows)
+        if self._wake is not None and len(self._buffer) >= self.flush_events:
+            self._wake.set()
+        return dropped
+
+    def start(self) -> None:
+        self._wake = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:  # noqa: BLE001
+                # Ingest must outlive any one bad batch
+                logger.exception("telemetry flush failed")
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        try:
+            await asyncio.to_thread(self.write, batch)
+        except sqlite3.Error:
+            # Keep the rows for the next attempt, up to the buffer limit
+            keep = batch[: max(0, self.max_buffer - len(self._buffer))]
+            self._buffer[:0] = keep
+            EVENTS.inc("dropped", amount=len(batch) - len(keep))
+        except Exception:  # noqa: BLE001
+            # Not transient: retrying the same rows would fail again
+            logger.exception("dropping %d telemetry events that could not be written", len(batch))
+            EVENTS.inc("dropped", amount=len(batch))
+
+    def write(self, batch: List[Row]) -> None:
+        start = time.perf_counter()
+        rollup: Dict[Tuple[str, str], List[float]] = defaultdict(lambda: [0, 0, 0.0])
+        for row in batch:
+            kind = row[2]
+            if kind == "start":
+                rollup[row[1], row[3]][0] += 1
+            elif kind == "complete":
+                r = rollup[row[1], row[3]]
+                r[1] += 1
+                r[2] += row[7] or 0.0
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO session_events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch
+            )
+            self._db.executemany(
+                "INSERT INTO session_daily VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (day, variant) DO UPDATE SET "
+                "starts = starts + excluded.starts, "
+                "completions = completions + excluded.completions, "
+                "completed_seconds = completed_seconds + excluded.completed_seconds",
+                [(day, variant, s, c, secs) for (day, variant), (s, c, secs) in rollup.items()],
+            )
+        EVENTS_FLUSH.observe(time.perf_counter() - start)
+
+    def daily(self, days: int = 30, variant: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-day, per-variant totals for the last `days` UTC days, newest first."""
+        since = time.strftime("%Y-%m-%d", time.gmtime(time.time() - (days - 1) * 86_400))
+        sql = (
+            "SELECT day, variant, starts, completions, completed_seconds "
+            "FROM session_daily WHERE day >= ?"
+        )
+        params: Tuple[Any, ...] = (since,)
+        if variant is not None:
+            sql += " AND variant = ?"
+            params += (variant,)
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY day DESC, variant", params).fetchall()
+        return [
+            {
+                "day": day,
+                "variant": v,
+                "starts": starts,
+                "completions": completions,
+                "avg_completed_seconds": round(secs / completions, 1) if completions else None,
+            }
+            for day, v, starts, completions, secs in rows
+        ]
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._closing = True
+            self._wake.set()
+            try:
+                await self._task
+            except Exception:  # noqa: BLE001
+                logger.exception("telemetry flush task failed")
+        await self.flush()
+        with self._lock:
+            self._db.close()
+
+
+async def get_event_log(conn: HTTPConnection) -> EventLog:
+    return conn.app.state.events
@@ -1,6 +1,37 @@
 // Lightweight Web Audio engine for breathing cues
-// Exposes createAudioEngine() that returns controls for start/stop and volumes
+// Exposes createAudioEngine() that returns controls for start/stop and volumes.
+// Cues come from one sprite per cue set and ambient tracks from short loops
+// streamed through a media element (see /api/audio, tools/build_audio.py).
+// A guided session can instead follow one server-rendered track holding every
+// cue of every cycle (see /api/session-audio); cues are then not scheduled
+// per phase, and the one-shots remain the fallback.
 (function () {
+  const MANIFEST_URL = "/api/audio";
+  const SESSION_AUDIO_URL = "/api/session-audio";
+  // Preferred first; must match services/session_audio.py FORMATS
+  const SESSION_FORMATS = [
+    ["opus", "audio/webm; codecs=opus"],
+    ["aac", "audio/mp4; codecs=mp4a.40.2"],
+    ["mp3", "audio/mpeg"],
+  ];
+  // Seconds the track may wander from the visual clock before it is re-seeked
+  const SESSION_DRIFT = 0.15;
+  let manifestPromise = null;
+
+  function loadManifest() {
+    if (!manifestPromise) {
+      manifestPromise = fetch(MANIFEST_URL)
+        .then((r) => (r.ok ? r.json() : {}))
+        .catch(() => ({}));
+    }
+    return manifestPromise;
+  }
+
+  // Smallest variant first; the browser's answer is only a hint for decoding
+  function playableVariants(variants) {
+    const probe = document.createElement("audio");
+    return (variants || []).filter((v) => probe.canPlayType(v.type) !== "");
+  }
   function createNoiseNode(ctx) {
     const bufferSize = 2 * ctx.sampleRate;
     const noiseBuffer = ctx.createBuffer(1, bufferSize, ctx.sampleRate);
@@ -24,16 +55,18 @@
   function createAudioEngine() {
     let ctx = null;
     let masterGain, assistGain, bgGain;
-    let inhaleBuffer = null,
-      exhaleBuffer = null;
+    // { buffer, start, duration }: a whole file or a slice of a sprite
+    let inhaleCue = null,
+      exhaleCue = null;
     let inhaleSource = null,
       exhaleSource = null;
     let inhaleGain = null,
       exhaleGain = null;
     let inhaleLevel = 1.5,
       exhaleLevel = 1.5;
-    let bgBuffer = null;
-    let bgSource = null;
+    let bgElement = null;
+    // { info, element, gain, cycle, live }: the prepared session track
+    let session = null;
     let running = false;
 
     const state = {
@@ -65,54 +98,153 @@
       masterGain.connect(ctx.destination);
     }
 
+    // Ambient tracks play through a media element, which fetches byte
+    // ranges and starts as soon as enough has arrived, instead of
+    // downloading and decoding the whole file first
     async function loadBackground(url) {
       ensureContext();
-      const res = await fetch(url);
-      const arr = await res.arrayBuffer();
-      bgBuffer = await ctx.decodeAudioData(arr);
+      const manifest = await loadManifest();
+      const track = (manifest.ambient || {})[url.replace(/^\/static\//, "")];
+      const variant = track && playableVariants(track.variants)[0];
+      if (bgElement) bgElement.pause();
+      bgElement = new Audio();
+      bgElement.loop = true;
+      bgElement.preload = "auto";
+      bgElement.src = variant ? variant.url : url;
+      ctx.createMediaElementSource(bgElement).connect(bgGain);
       if (running) startBackground();
     }
 
+    function wholeCue(buffer) {
+      return { buffer, start: 0, duration: buffer.duration };
+    }
+
     async function loadAssistance(inhaleUrl, exhaleUrl) {
       ensureContext();
       const [a, b] = await Promise.all([
         fetch(inhaleUrl).then((r) => r.arrayBuffer()),
         fetch(exhaleUrl).then((r) => r.arrayBuffer()),
       ]);
-      inhaleBuffer = await ctx.decodeAudioData(a);
-      exhaleBuffer = await ctx.decodeAudioData(b);
+      inhaleCue = wholeCue(await ctx.decodeAudioData(a));
+      exhaleCue = wholeCue(await ctx.decodeAudioData(b));
     }
 
-    function startBackground() {
-      if (!ctx || !bgBuffer) return;
-      if (bgSource) {
-        try {
-          bgSource.stop();
-        } catch {}
+    // One download and one decode for the whole cue set; falls back to the
+    // separate files when the sprite is missing or cannot be decoded
+    async function loadCues(name, fallback = {}) {
+      ensureContext();
+      const manifest = await loadManifest();
+      const sprite = (manifest.sprites || {})[name];
+      for (const variant of sprite ? playableVariants(sprite.variants) : []) {
         try {
-          bgSource.disconnect();
+          const data = await fetch(variant.url).then((r) => r.arrayBuffer());
+          const buffer = await ctx.decodeAudioData(data);
+          const cue = (n) => sprite.cues[n] && { buffer, ...sprite.cues[n] };
+          inhaleCue = cue("inhale");
+          exhaleCue = cue("exhale");
+          return;
         } catch {}
       }
-      bgSource = ctx.createBufferSource();
-      bgSource.buffer = bgBuffer;
-      bgSource.loop = true;
-      bgSource.connect(bgGain);
+      const urls = { ...fallback, ...((sprite && sprite.fallback) || {}) };
+      await loadAssistance(urls.inhale, urls.exhale);
+    }
+
+    // Renders (or finds) the track for `opts` ({variant, pattern, cycles});
+    // without a variant the server uses the stored config. Resolves to the
+    // track info, or null when the server cannot render and cues stay local
+    async function prepareSession(opts = {}) {
+      ensureContext();
+      const probe = document.createElement("audio");
+      const format = SESSION_FORMATS.find(([, type]) => probe.canPlayType(type) !== "");
+      if (!format) return null;
+      let info;
       try {
-        bgSource.start();
-      } catch {}
+        const r = await fetch(SESSION_AUDIO_URL, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          // Cues only: the ambient bed keeps its own element and volume
+          body: JSON.stringify({ cycles: 5, ...opts, ambient: false, format: format[0] }),
+        });
+        if (!r.ok) return null;
+        info = await r.json();
+      } catch {
+        return null;
+      }
+      endSession();
+      const element = new Audio();
+      element.preload = "auto";
+      element.src = info.url;
+      const gain = ctx.createGain();
+      gain.gain.value = inhaleLevel;
+      ctx.createMediaElementSource(element).connect(gain);
+      gain.connect(assistGain);
+      session = { info, element, gain, cycle: -1, live: false };
+      return info;
+    }
+
+    // The next inhale is the first of the prepared track's cycles
+    function beginSession() {
+      if (!session) return false;
+      session.element.pause();
+      session.cycle = -1;
+      session.live = true;
+      return true;
+    }
+
+    function endSession() {
+      if (!session) return;
+      session.element.pause();
+      session.live = false;
+    }
+
+    // Keeps the track on the phase clock; false when the phase needs a
+    // one-shot instead (track not ready, over, or for another pattern)
+    function followSession(phase, seconds) {
+      // Holds carry no cue, and box patterns may have two of different length
+      if (phase !== "inhale" && phase !== "exhale") return true;
+      const { info, element } = session;
+      const index = info.phases.findIndex((p) => p.name === phase);
+      // Rendered phases are rounded to 0.1 s
+      if (index === -1 || Math.abs(info.phases[index].seconds - seconds) > 0.06) {
+        // The pattern changed since the track was prepared
+        endSession();
+        return false;
+      }
+      if (phase === "inhale") session.cycle += 1;
+      if (session.cycle < 0) return false;
+      if (session.cycle >= info.cycles) {
+        endSession();
+        return false;
+      }
+      let target = session.cycle * info.cycle_seconds;
+      for (let i = 0; i < index; i++) target += info.phases[i].seconds;
+      if (element.paused) {
+        if (element.readyState < 2) return false;
+        element.currentTime = target;
+        element.play().catch(endSession);
+      } else if (Math.abs(element.currentTime - target) > SESSION_DRIFT) {
+        element.currentTime = target;
+      }
+      return true;
+    }
+
+    function startBackground() {
+      if (!ctx || !bgElement) return;
+      bgElement.play().catch(() => {});
     }
 
     function start() {
       ensureContext();
       if (running) return;
       if (ctx.state === "suspended") ctx.resume();
-      if (bgBuffer) startBackground();
+      if (bgElement) startBackground();
       running = true;
     }
 
     function stop() {
       if (!ctx || !running) return;
       masterGain.gain.setTargetAtTime(0, ctx.currentTime, 0.02);
+      endSession();
       running = false;
     }
 
@@ -140,29 +272,30 @@
       } catch {}
     }
 
-    function startOneShot(buffer, seconds, destGain) {
-      if (!buffer) return null;
+    function startOneShot(cue, seconds, destGain) {
+      if (!cue) return null;
       const src = ctx.createBufferSource();
-      src.buffer = buffer;
-      if (seconds && seconds > 0.05 && buffer.duration > 0.05) {
-        const rate = Math.min(4, Math.max(0.25, buffer.duration / seconds));
+      src.buffer = cue.buffer;
+      if (seconds && seconds > 0.05 && cue.duration > 0.05) {
+        const rate = Math.min(4, Math.max(0.25, cue.duration / seconds));
         src.playbackRate.value = rate;
       }
       src.connect(destGain || assistGain);
       try {
-        src.start();
+        src.start(0, cue.start, cue.duration);
       } catch {}
       return src;
     }
 
     function onPhase(phase, seconds) {
       if (!ctx || !running) return;
+      if (session && session.live && followSession(phase, seconds)) return;
       if (phase === "inhale") {
         stopOneShot(inhaleSource);
-        inhaleSource = startOneShot(inhaleBuffer, seconds, inhaleGain);
+        inhaleSource = startOneShot(inhaleCue, seconds, inhaleGain);
       } else if (phase === "exhale") {
         stopOneShot(exhaleSource);
-        exhaleSource = startOneShot(exhaleBuffer, seconds, exhaleGain);
+        exhaleSource = startOneShot(exhaleCue, seconds, exhaleGain);
       }
     }
 
@@ -175,10 +308,15 @@
       setGuideVolume: setAssistVolume,
       loadBackground,
       loadAssistance,
+      loadCues,
       onPhase,
+      prepareSession,
+      beginSession,
+      endSession,
       setInhaleLevel(v) {
         inhaleLevel = Math.max(0, Number(v) || 0);
         if (inhaleGain) inhaleGain.gain.value = inhaleLevel;
+        if (session) session.gain.gain.value = inhaleLevel;
       },
       setExhaleLevel(v) {
         exhaleLevel = Math.max(0, Number(v) || 0);
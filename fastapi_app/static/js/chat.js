@@ -6,6 +6,8 @@
   const planBtn = document.getElementById("plan-btn");
   const transcript = [];
   const history = [];
+  // Server-held history; once set, only new messages are sent
+  let conversationId = null;
 
   function addMsg(role, text) {
     const row = document.createElement("div");
@@ -56,31 +58,146 @@
     if (planBtn) planBtn.disabled = true;
   }
 
+  // apply_plan: the server saves a recommended plan to our config in the
+  // same request, so no second round trip to /api/patterns/* is needed.
+  // speculative: the local coach's draft arrives first, the upstream reply
+  // replaces it as it streams in
+  function requestBody(pending) {
+    const opts = { apply_plan: true, speculative: true };
+    return conversationId
+      ? { conversation_id: conversationId, messages: pending, ...opts }
+      : { messages: history, ...opts };
+  }
+
+  function postChat(url, pending, signal) {
+    return fetch(url, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(requestBody(pending)),
+      signal,
+    });
+  }
+
+  // The server forgot the conversation (expiry, restart, another worker):
+  // start a new one from the full history
+  async function postTurn(url, pending, signal) {
+    const res = await postChat(url, pending, signal);
+    if (res.status !== 404 || !conversationId) return res;
+    conversationId = null;
+    return postChat(url, pending, signal);
+  }
+
+  // Reads /api/chat/stream (SSE over fetch) and calls onEvent(name, data).
+  async function streamChat(pending, onEvent, signal) {
+    const res = await postTurn("/api/chat/stream", pending, signal);
+    if (!res.ok || !res.body) throw new Error("stream unavailable");
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buf = "";
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buf += decoder.decode(value, { stream: true });
+      let sep;
+      while ((sep = buf.indexOf("\n\n")) !== -1) {
+        const block = buf.slice(0, sep);
+        buf = buf.slice(sep + 2);
+        let name = "message";
+        let data = "";
+        for (const line of block.split("\n")) {
+          if (line.startsWith("event:")) name = line.slice(6).trim();
+          else if (line.startsWith("data:")) data += line.slice(5).trim();
+        }
+        try {
+          onEvent(name, data ? JSON.parse(data) : {});
+        } catch {}
+      }
+    }
+  }
+
+  // Long-polls the upstream revision of a speculative /api/chat draft
+  async function fetchRevision(id) {
+    for (let i = 0; i < 6; i++) {
+      const res = await fetch(`/api/chat/revisions/${id}?wait=10`);
+      if (res.status === 200) return res.json();
+      if (res.status !== 202) return null;
+    }
+    return null;
+  }
+
+  async function fetchReply(pending, last) {
+    let text = "";
+    let plan = null;
+    let reply = null;
+    let config = null;
+    let draft = null;
+    const ctrl = new AbortController();
+    try {
+      await streamChat(pending, (name, data) => {
+        if (name === "draft") {
+          draft = data;
+          conversationId = data.conversation_id || conversationId;
+          if (last) last.textContent = data.reply;
+          // A plan the user asked for outright: keep the local answer and
+          // close the stream, which cancels the upstream call
+          if (data.plan) ctrl.abort();
+        } else if (name === "token") {
+          text += data.delta || "";
+          if (last) last.textContent = text;
+        } else if (name === "plan") {
+          plan = data;
+        } else if (name === "done") {
+          reply = data.reply;
+          config = data.config || null;
+          conversationId = data.conversation_id || conversationId;
+        }
+      }, ctrl.signal);
+    } catch {}
+    // The server keeps the draft as this turn's answer when the stream ends early
+    if (reply == null && !text && draft) reply = draft.reply;
+    if (reply == null && !text) {
+      // Fall back to the non-streaming endpoint
+      const res = await postTurn("/api/chat", pending);
+      let data = await res.json();
+      if (data.revision_id && !extractPlanJson(data.reply)) {
+        if (last) last.textContent = data.reply;
+        data = (await fetchRevision(data.revision_id)) || data;
+      } else if (data.revision_id) {
+        fetch(`/api/chat/revisions/${data.revision_id}`, { method: "DELETE" }).catch(() => {});
+      }
+      reply = data.reply;
+      config = data.config || null;
+      conversationId = data.conversation_id || conversationId;
+    }
+    reply = reply || text || "Sorry, I could not respond.";
+    return { reply, plan: plan || extractPlanJson(reply), config };
+  }
+
   async function send(text) {
     addMsg("user", text);
     addMsg("assistant", "…");
     transcript.push(text);
-    history.push({ role: "user", content: text });
+    const pending = [{ role: "user", content: text }];
+    history.push(...pending);
     try {
-      const res = await fetch("/api/chat", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ messages: history }),
-      });
-      const data = await res.json();
       const last = elChat.querySelector(
         ".msg-row.assistant:last-child .bubble"
       );
-      const reply = data.reply || "Sorry, I could not respond.";
+      const { reply, plan, config } = await fetchReply(pending, last);
       if (last) last.textContent = reply;
       transcript.push(reply);
       history.push({ role: "assistant", content: reply });
-      const plan = extractPlanJson(reply);
       if (plan) {
         try {
           const meta = storeAndConfirm(plan);
           disableChat();
-          setTimeout(() => applyPlan({ breathing: meta }), 800);
+          setTimeout(
+            () =>
+              config
+                ? (window.location.href = config.variant === "box" ? "/box" : "/circle")
+                : applyPlan({ breathing: meta }),
+            800
+          );
         } catch {}
       }
     } catch (err) {
@@ -0,0 +1,53 @@
+// Shared /api/config access for page scripts: one fetch per page load and,
+// while the page is open, one SSE connection that pushes new versions.
+(() => {
+  let current = null;
+  // Version of `current`, from the response ETag ("cfg-<version>-<tag>")
+  let version = null;
+  let source = null;
+  const listeners = new Set();
+
+  function get() {
+    if (!current) {
+      current = fetch("/api/config").then((res) => {
+        if (!res.ok) throw new Error("Failed to load config");
+        const m = /"cfg-(\d+)-/.exec(res.headers.get("ETag") || "");
+        if (m) version = Number(m[1]);
+        return res.json();
+      });
+      current.catch(() => {
+        current = null;
+      });
+    }
+    return current;
+  }
+
+  // Subscribes from the loaded version, so only newer configs arrive,
+  // including any written between the page's fetch and this connection
+  function connect() {
+    if (source || !window.EventSource) return;
+    const query = version === null ? "" : `?version=${version}`;
+    source = new EventSource(`/api/config/watch${query}`);
+    source.addEventListener("config", (e) => {
+      let cfg;
+      try {
+        cfg = JSON.parse(e.data);
+      } catch {
+        return;
+      }
+      if (e.lastEventId) version = Number(e.lastEventId);
+      current = Promise.resolve(cfg);
+      listeners.forEach((fn) => fn(cfg));
+    });
+  }
+
+  function watch(cb) {
+    listeners.add(cb);
+    get()
+      .catch(() => {})
+      .then(connect);
+    return () => listeners.delete(cb);
+  }
+
+  window.jbConfig = { get, watch };
+})();
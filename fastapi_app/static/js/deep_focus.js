@@ -16,6 +16,8 @@
   let ms = 25 * 60 * 1000;
   let id = null;
   let isPaused = false;
+  let run = null;
+  let blocks = 0;
 
   function fmt(ms) {
     const s = Math.max(0, Math.floor(ms / 1000));
@@ -48,7 +50,9 @@
       id = null;
       running = false;
       isPaused = false;
+      if (run && !onBreak) run.complete(++blocks, 25 * 60);
       setPhase(!onBreak);
+      if (run) run.phase(onBreak ? "break" : "focus", (onBreak ? 5 : 25) * 60);
       start();
     }
   }
@@ -56,6 +60,10 @@
   function start() {
     if (running) return;
     running = true;
+    if (!run && window.jbTelemetry) {
+      run = window.jbTelemetry.start("deep_focus");
+      run.phase("focus", 25 * 60);
+    }
     if (!id) id = setInterval(tick, 1000);
     isPaused = false;
     updateUI();
@@ -73,6 +81,8 @@
 
   function reset() {
     pause();
+    run = null;
+    blocks = 0;
     setPhase(false);
     isPaused = false;
     updateUI();
@@ -80,6 +90,8 @@
 
   function stopAll() {
     running = false;
+    run = null;
+    blocks = 0;
     if (id) {
       clearInterval(id);
       id = null;
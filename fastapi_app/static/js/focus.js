@@ -14,6 +14,8 @@
   let onBreak = false;
   let cycleCount = 0;
   let remainingMs = 25 * 60 * 1000;
+  let phaseMs = remainingMs;
+  let run = null;
 
   function fmt(ms) {
     const s = Math.max(0, Math.round(ms / 1000));
@@ -29,7 +31,7 @@
         ? Number(longMin.value || 15)
         : Number(shortMin.value || 5)
       : Number(focusMin.value || 25);
-    remainingMs = totalMin * 60 * 1000;
+    remainingMs = phaseMs = totalMin * 60 * 1000;
     if (label) label.textContent = isBreak ? "Break" : "Focus";
     if (timeLeft) timeLeft.textContent = fmt(remainingMs);
     if (init) return;
@@ -44,10 +46,12 @@
       running = false;
       if (!onBreak) {
         cycleCount += 1;
+        if (run) run.complete(cycleCount, phaseMs / 1000);
         setPhase(true);
       } else {
         setPhase(false);
       }
+      if (run) run.phase(onBreak ? "break" : "focus", phaseMs / 1000);
       start();
     }
   }
@@ -55,6 +59,10 @@
   function start() {
     if (running) return;
     running = true;
+    if (!run && window.jbTelemetry) {
+      run = window.jbTelemetry.start("focus");
+      run.phase(onBreak ? "break" : "focus", phaseMs / 1000);
+    }
     if (!timerId) timerId = setInterval(tick, 1000);
   }
 
@@ -68,6 +76,7 @@
 
   function reset() {
     pause();
+    run = null;
     cycleCount = 0;
     setPhase(false, true);
   }
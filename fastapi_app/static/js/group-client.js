@@ -0,0 +1,98 @@
+// Group breathing rooms: follow a server-clocked phase stream over a
+// WebSocket. Phase frames arrive slightly before their start time `at`
+// (server ms); we shift `at` by the estimated clock offset and start the
+// phase locally at that moment, so everyone in the room stays in step.
+(() => {
+  const PING_FAST_MS = 1000;
+  const PING_SLOW_MS = 15000;
+  const SAMPLES = 8;
+
+  function join(roomId, handlers = {}) {
+    const proto = location.protocol === "https:" ? "wss:" : "ws:";
+    const url = `${proto}//${location.host}/api/rooms/${encodeURIComponent(roomId)}/ws`;
+    let ws = null;
+    let offset = 0; // server clock minus local clock, ms
+    let samples = [];
+    let pingTimer = null;
+    let phaseTimer = null;
+    let retry = 0;
+    let closed = false;
+
+    function ping() {
+      if (ws && ws.readyState === WebSocket.OPEN) {
+        ws.send(JSON.stringify({ t: "ping", c: Date.now() }));
+      }
+      const delay = samples.length < 5 ? PING_FAST_MS : PING_SLOW_MS;
+      pingTimer = setTimeout(ping, delay);
+    }
+
+    function onPong(msg) {
+      const now = Date.now();
+      const rtt = now - msg.c;
+      if (rtt < 0) return;
+      samples.push({ rtt, offset: msg.s - (msg.c + now) / 2 });
+      if (samples.length > SAMPLES) samples.shift();
+      // The lowest-latency exchange has the least asymmetric delay
+      offset = samples.reduce((a, b) => (b.rtt < a.rtt ? b : a)).offset;
+    }
+
+    function onPhase(msg) {
+      clearTimeout(phaseTimer);
+      const delay = msg.at - offset - Date.now();
+      const phase = {
+        name: msg.n,
+        index: msg.i,
+        cycle: msg.c,
+        seconds: msg.d,
+        // Joined mid-phase: only the rest of it is left
+        remainingMs: Math.max(0, msg.d * 1000 + Math.min(0, delay)),
+      };
+      phaseTimer = setTimeout(() => handlers.onPhase && handlers.onPhase(phase), Math.max(0, delay));
+    }
+
+    function connect() {
+      ws = new WebSocket(url);
+      ws.onopen = () => {
+        retry = 0;
+        clearTimeout(pingTimer);
+        ping();
+      };
+      ws.onmessage = (e) => {
+        let msg;
+        try {
+          msg = JSON.parse(e.data);
+        } catch {
+          return;
+        }
+        if (msg.t === "phase") onPhase(msg);
+        else if (msg.t === "pong") onPong(msg);
+        else if (msg.t === "room") {
+          if (!samples.length) offset = msg.now - Date.now();
+          handlers.onRoom && handlers.onRoom(msg);
+        }
+      };
+      ws.onclose = (e) => {
+        clearTimeout(pingTimer);
+        if (closed || e.code === 4404) {
+          handlers.onClose && handlers.onClose(e.code);
+          return;
+        }
+        retry = Math.min(retry + 1, 6);
+        setTimeout(connect, 250 * 2 ** retry * (0.5 + Math.random() / 2));
+      };
+    }
+
+    connect();
+    return {
+      offset: () => offset,
+      leave() {
+        closed = true;
+        clearTimeout(pingTimer);
+        clearTimeout(phaseTimer);
+        ws && ws.close(1000);
+      },
+    };
+  }
+
+  window.jbGroup = { join };
+})();
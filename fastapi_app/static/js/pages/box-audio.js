@@ -57,14 +57,22 @@
     });
 
   const eng = ensureEngine();
-  eng.loadBackground("/static/audio/birds-chirping-calm.mp3").catch(() => {});
+  eng.loadBackground("/static/audio/water-noises.mp3").catch(() => {});
   eng
-    .loadAssistance(
-      "/static/audio/breath-in.mp3",
-      "/static/audio/breath-out.mp3"
-    )
+    .loadCues("breath", {
+      inhale: "/static/audio/breath-in.mp3",
+      exhale: "/static/audio/breath-out.mp3",
+    })
     .catch(() => {});
   eng.autoStartOnFirstGesture(document.body);
+  // The box player always runs the box pattern, whatever the config's variant
+  const prepare = (cfg) =>
+    cfg && eng.prepareSession({ variant: "box", pattern: cfg.pattern || {} });
+  if (window.jbConfig) {
+    window.jbConfig.get().then(prepare).catch(() => {});
+    window.jbConfig.watch(prepare);
+  }
+  window._bbEngine = eng;
 
   if (volMaster) eng.setMasterVolume(Math.max(0.05, Number(volMaster.value)));
   if (volBg) eng.setBackgroundVolume(Math.max(0.05, Number(volBg.value)));
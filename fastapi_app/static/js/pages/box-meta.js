@@ -23,8 +23,7 @@
     } catch {}
   }
   try {
-    const res = await fetch("/api/config");
-    const cfg = await res.json();
+    const cfg = await window.jbConfig.get();
     if (cfg.variant === "box" && cfg.pattern) {
       const c = `${n(cfg.pattern.inhale)}-${n(cfg.pattern.hold1)}-${n(
         cfg.pattern.exhale
@@ -4,8 +4,7 @@
 
   async function getConfig() {
     try {
-      const res = await fetch("/api/config");
-      return await res.json();
+      return await window.jbConfig.get();
     } catch {
       return {
         box_scale: 1,
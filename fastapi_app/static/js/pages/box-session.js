@@ -4,6 +4,7 @@
   const mount = document.getElementById("mount");
   let active = false;
   let cycles = 0;
+  let run = null;
 
   function updateCounter() {
     if (counterEl) counterEl.textContent = `${cycles}/5`;
@@ -14,11 +15,13 @@
     if (!root) return;
     root.addEventListener("bb:phase", (e) => {
       if (!active) return;
+      if (run && e.detail) run.phase(e.detail.phase, e.detail.seconds);
       if (e.detail && e.detail.phase === "inhale") {
         cycles += 1;
         updateCounter();
         if (cycles >= 5) {
           active = false;
+          if (run) run.complete(cycles);
           const p = window._bbPlayer;
           if (p && p.stop) p.stop();
         }
@@ -33,6 +36,9 @@
       cycles = 0;
       updateCounter();
       active = true;
+      run = window.jbTelemetry ? window.jbTelemetry.start("box") : null;
+      const eng = window._bbEngine;
+      if (eng && eng.beginSession) eng.beginSession();
       const p = window._bbPlayer;
       if (p && p.start) p.start();
     });
@@ -8,19 +8,24 @@
   let engine = window.createAudioEngine ? window.createAudioEngine() : null;
   if (engine) {
     engine
-      .loadBackground("/static/audio/birds-chirping-calm.mp3")
+      .loadBackground("/static/audio/water-noises.mp3")
       .catch(() => {});
     engine
-      .loadAssistance(
-        "/static/audio/breath-in.mp3",
-        "/static/audio/breath-out.mp3"
-      )
+      .loadCues("breath", {
+        inhale: "/static/audio/breath-in.mp3",
+        exhale: "/static/audio/breath-out.mp3",
+      })
       .catch(() => {});
     engine.autoStartOnFirstGesture(document.body);
     if (volMaster)
       engine.setMasterVolume(Math.max(0.05, Number(volMaster.value)));
     if (volBg) engine.setBackgroundVolume(Math.max(0.05, Number(volBg.value)));
     engine.setAssistVolume(assistOn && assistOn.checked ? 0.2 : 0.1);
+    // Group rooms keep the per-phase cues: their clock is the server's
+    if (!new URLSearchParams(location.search).get("room") && window.jbConfig) {
+      engine.prepareSession().catch(() => {});
+      window.jbConfig.watch(() => engine.prepareSession().catch(() => {}));
+    }
     window._circleEngine = engine;
   }
 
@@ -19,8 +19,7 @@
     } catch {}
   }
   try {
-    const res = await fetch("/api/config");
-    const cfg = await res.json();
+    const cfg = await window.jbConfig.get();
     if (cfg.variant === "three" && cfg.pattern_three)
       setMeta(
         "Inhale-Hold-Exhale",
@@ -7,6 +7,8 @@
   let timerId;
   let running = false;
   let cycles = 0;
+  let variant = "box";
+  let run = null;
 
   function updateCounter() {
     const el = document.getElementById("cycleCount");
@@ -22,11 +24,13 @@
     circle.style.opacity = "0.9";
     const eng = window._circleEngine;
     if (eng && eng.onPhase) eng.onPhase("inhale", inhaleMs / 1000);
+    if (run) run.phase("inhale", inhaleMs / 1000);
     clearTimeout(timerId);
     timerId = setTimeout(() => {
       if (!running) return;
       if (holdMs > 0) {
         if (label) label.textContent = "Hold";
+        if (run) run.phase("hold", holdMs / 1000);
         setTimeout(startExhale, holdMs);
       } else {
         startExhale();
@@ -42,6 +46,7 @@
     circle.style.opacity = "0.6";
     const eng = window._circleEngine;
     if (eng && eng.onPhase) eng.onPhase("exhale", exhaleMs / 1000);
+    if (run) run.phase("exhale", exhaleMs / 1000);
     clearTimeout(timerId);
     timerId = setTimeout(() => {
       if (!running) return;
@@ -49,29 +54,33 @@
       updateCounter();
       if (cycles >= 5) {
         running = false;
+        if (run) run.complete(cycles);
         return;
       }
       runCycle();
     }, exhaleMs);
   }
 
+  function applyConfig(cfg) {
+    variant = cfg.variant || "box";
+    if (cfg.variant === "three" && cfg.pattern_three) {
+      inhaleMs = Math.max(0, Number(cfg.pattern_three.inhale) || 0) * 1000;
+      holdMs = Math.max(0, Number(cfg.pattern_three.hold) || 0) * 1000;
+      exhaleMs = Math.max(0, Number(cfg.pattern_three.exhale) || 0) * 1000;
+    } else if (cfg.variant === "two" && cfg.pattern_two) {
+      inhaleMs = Math.max(0, Number(cfg.pattern_two.inhale) || 0) * 1000;
+      holdMs = 0;
+      exhaleMs = Math.max(0, Number(cfg.pattern_two.exhale) || 0) * 1000;
+    } else if (cfg.pattern) {
+      inhaleMs = Math.max(0, Number(cfg.pattern.inhale) || 0) * 1000;
+      holdMs = 0;
+      exhaleMs = Math.max(0, Number(cfg.pattern.exhale) || 0) * 1000;
+    }
+  }
+
   async function loadConfig() {
     try {
-      const res = await fetch("/api/config");
-      const cfg = await res.json();
-      if (cfg.variant === "three" && cfg.pattern_three) {
-        inhaleMs = Math.max(0, Number(cfg.pattern_three.inhale) || 0) * 1000;
-        holdMs = Math.max(0, Number(cfg.pattern_three.hold) || 0) * 1000;
-        exhaleMs = Math.max(0, Number(cfg.pattern_three.exhale) || 0) * 1000;
-      } else if (cfg.variant === "two" && cfg.pattern_two) {
-        inhaleMs = Math.max(0, Number(cfg.pattern_two.inhale) || 0) * 1000;
-        holdMs = 0;
-        exhaleMs = Math.max(0, Number(cfg.pattern_two.exhale) || 0) * 1000;
-      } else if (cfg.pattern) {
-        inhaleMs = Math.max(0, Number(cfg.pattern.inhale) || 0) * 1000;
-        holdMs = 0;
-        exhaleMs = Math.max(0, Number(cfg.pattern.exhale) || 0) * 1000;
-      }
+      applyConfig(await window.jbConfig.get());
       clearTimeout(timerId);
       circle.style.width = "60px";
       circle.style.height = "60px";
@@ -83,13 +92,44 @@
     }
   }
   loadConfig();
+  // New durations take effect from the next phase
+  window.jbConfig.watch(applyConfig);
 
   const startBtn = document.getElementById("startBtn");
+
+  // ?room=<id>: follow a server-clocked group session instead of local timers
+  const roomId = new URLSearchParams(location.search).get("room");
+  if (roomId && window.jbGroup) {
+    if (startBtn) startBtn.hidden = true;
+    window.jbGroup.join(roomId, {
+      onPhase(p) {
+        const ms = p.remainingMs;
+        if (label) label.textContent = p.name[0].toUpperCase() + p.name.slice(1);
+        const eng = window._circleEngine;
+        if (eng && eng.onPhase && p.name !== "hold") eng.onPhase(p.name, ms / 1000);
+        if (p.name === "hold") return;
+        const grow = p.name === "inhale";
+        circle.style.transition = `width ${ms}ms ease-in-out, height ${ms}ms ease-in-out, opacity 300ms ease`;
+        circle.style.width = grow ? "200px" : "60px";
+        circle.style.height = grow ? "200px" : "60px";
+        circle.style.opacity = grow ? "0.9" : "0.6";
+        if (grow) {
+          cycles += 1;
+          const el = document.getElementById("cycleCount");
+          if (el) el.textContent = String(cycles);
+        }
+      },
+    });
+  }
+
   startBtn &&
     startBtn.addEventListener("click", () => {
       cycles = 0;
       updateCounter();
       running = true;
+      run = window.jbTelemetry ? window.jbTelemetry.start(variant) : null;
+      const eng = window._circleEngine;
+      if (eng && eng.beginSession) eng.beginSession();
       runCycle();
     });
 
@@ -0,0 +1,50 @@
+// Session telemetry for the breathing and focus pages. Events are queued
+// and posted in small batches to /api/events with navigator.sendBeacon
+// (a plain string body, so no preflight), also when the page is hidden.
+(() => {
+  const URL = "/api/events";
+  const MAX_BATCH = 50;
+  const FLUSH_MS = 10000;
+  const page = location.pathname.replace(/^\/+|\/+$/g, "") || "home";
+  let queue = [];
+  let timer = null;
+
+  function flush() {
+    clearTimeout(timer);
+    timer = null;
+    if (!queue.length) return;
+    const body = JSON.stringify({ p: page, e: queue });
+    queue = [];
+    if (navigator.sendBeacon && navigator.sendBeacon(URL, body)) return;
+    fetch(URL, { method: "POST", body, keepalive: true }).catch(() => {});
+  }
+
+  function push(event) {
+    event.at = Date.now();
+    queue.push(event);
+    if (queue.length >= MAX_BATCH) flush();
+    else if (!timer) timer = setTimeout(flush, FLUSH_MS);
+  }
+
+  function start(variant) {
+    const run = Math.random().toString(36).slice(2, 10);
+    const startedAt = Date.now();
+    push({ t: "start", r: run, v: variant });
+    return {
+      phase(name, seconds) {
+        push({ t: "phase", r: run, v: variant, n: name, d: seconds });
+      },
+      complete(cycles, seconds) {
+        const d = seconds ?? (Date.now() - startedAt) / 1000;
+        push({ t: "complete", r: run, v: variant, c: cycles, d });
+      },
+    };
+  }
+
+  document.addEventListener("visibilitychange", () => {
+    if (document.visibilityState === "hidden") flush();
+  });
+  window.addEventListener("pagehide", flush);
+
+  window.jbTelemetry = { start, flush };
+})();
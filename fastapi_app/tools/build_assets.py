@@ -0,0 +1,128 @@
+"""Build content-hashed, precompressed copies of static/ into static/dist/.
+
+Run from fastapi_app/:  python -m tools.build_assets [--clean]
+
+Each source file is emitted once per distinct content as
+`dist/<dir>/<name>.<hash>.<ext>`; files with identical bytes share one
+output. Text assets also get `.gz` (and `.br` when the optional `brotli`
+package is installed) siblings. CSS `url(/static/...)` references are
+rewritten to the hashed names. The mapping is written to
+`dist/manifest.json`, which services/assets.py reads at startup.
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import shutil
+from pathlib import Path
+from typing import Dict
+
+from services.assets import (
+    AUDIO_MANIFEST_NAME,
+    COMPRESSIBLE,
+    DIST_DIR,
+    MANIFEST_NAME,
+    MEDIA_MANIFEST_NAME,
+)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STATIC_DIR = BASE_DIR / "static"
+
+_CSS_URL = re.compile(r"""url\(\s*(["']?)/static/([^"')]+)\1\s*\)""")
+
+
+def _hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _compress(path: Path, data: bytes) -> Dict[str, int]:
+    sizes = {}
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        path.with_name(path.name + ".gz").write_bytes(gz)
+        sizes["gz"] = len(gz)
+    try:
+        import brotli  # type: ignore[import-not-found]
+    except ImportError:
+        return sizes
+    br = brotli.compress(data, quality=11)
+    if len(br) < len(data):
+        path.with_name(path.name + ".br").write_bytes(br)
+        sizes["br"] = len(br)
+    return sizes
+
+
+def build(static_dir: Path = STATIC_DIR, clean: bool = False) -> Dict[str, str]:
+    dist = static_dir / DIST_DIR
+    if clean and dist.exists():
+        # Transcoded media is expensive to rebuild; tools/build_media and
+        # tools/build_audio own it
+        for child in dist.iterdir():
+            if child.name in ("media", MEDIA_MANIFEST_NAME, "audio-sprites", AUDIO_MANIFEST_NAME):
+                continue
+            if child.is_dir():
+                shutil.rmtree(child)
+            else:
+                child.unlink()
+    dist.mkdir(parents=True, exist_ok=True)
+
+    sources = sorted(
+        p
+        for p in static_dir.rglob("*")
+        if p.is_file()
+        and dist not in p.parents
+        and not p.name.startswith(".")
+        and p.suffix not in (".gz", ".br")
+    )
+    # CSS last so the urls it references are already hashed
+    sources.sort(key=lambda p: p.suffix == ".css")
+
+    manifest: Dict[str, str] = {}
+    by_hash: Dict[str, str] = {}
+    report = []
+    for src in sources:
+        rel = src.relative_to(static_dir).as_posix()
+        data = src.read_bytes()
+        if src.suffix == ".css":
+            text = data.decode("utf-8")
+            text = _CSS_URL.sub(
+                lambda m: f'url("/static/{manifest.get(m.group(2), m.group(2))}")',
+                text,
+            )
+            data = text.encode("utf-8")
+        digest = _hash(data)
+        if digest in by_hash:
+            manifest[rel] = by_hash[digest]
+            report.append((rel, len(data), "duplicate of " + by_hash[digest]))
+            continue
+        out_rel = f"{DIST_DIR}/{Path(rel).parent.as_posix()}/{src.stem}.{digest}{src.suffix}"
+        out_rel = out_rel.replace("/./", "/")
+        out = static_dir / out_rel
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_bytes(data)
+        sizes = _compress(out, data) if src.suffix in COMPRESSIBLE else {}
+        manifest[rel] = out_rel
+        by_hash[digest] = out_rel
+        report.append((rel, len(data), " ".join(f"{k}={v}" for k, v in sizes.items())))
+
+    (dist / MANIFEST_NAME).write_text(
+        json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8"
+    )
+    for rel, size, note in report:
+        print(f"{rel:45} {size:>9}  {note}")
+    print(f"wrote {dist / MANIFEST_NAME} ({len(manifest)} entries)")
+    return manifest
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--clean", action="store_true", help="remove static/dist first")
+    args = ap.parse_args()
+    build(clean=args.clean)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Package the breathing cues into audio sprites and cut ambient loops.
+
+Run from fastapi_app/:  python -m tools.build_audio [--ffmpeg PATH] [--loop-seconds 20]
+
+Each cue set in CUE_SETS (e.g. `breath`: inhale + exhale) is decoded to
+48 kHz mono PCM and laid end to end with short silences into one sprite,
+so a session needs one download and one decode instead of one per cue.
+Every other file in static/audio/ is treated as an ambient track: the
+packager cuts a `--loop-seconds` segment and crossfades its tail into its
+head so it loops without a seam. Sprites and loops are encoded as Opus
+(WebM), AAC (M4A) and MP3 under static/dist/audio-sprites/, with a hash of
+the source and settings in the names. Cue offsets and durations (exact,
+from the PCM) and every variant go to static/dist/audio.json, which the
+app serves at /api/audio. Requires ffmpeg on PATH; encoders missing from
+the local build are skipped and reported.
+"""
+from __future__ import annotations
+
+import argparse
+import array
+import hashlib
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+from services.assets import AUDIO_MANIFEST_NAME, DIST_DIR
+from services.pcm import CROSSFADE_SECONDS, RATE, decode, loop_segment, write_wav
+from services.session_audio import BREATH_CUES
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STATIC_DIR = BASE_DIR / "static"
+SPRITES_DIR = "audio-sprites"
+
+# Silence before and between cues; encoder priming and decoder padding land here
+LEAD_SECONDS = 0.1
+GAP_SECONDS = 0.25
+
+# sprite name -> cue name -> source under static/
+CUE_SETS: Dict[str, Dict[str, str]] = {"breath": BREATH_CUES}
+
+# (format, mime type, extension, ffmpeg args, (cue kbps, ambient kbps)); smallest first
+FORMATS = [
+    ("opus", "audio/webm; codecs=opus", ".webm", ["-c:a", "libopus", "-vbr", "on"], (24, 48)),
+    ("aac", "audio/mp4; codecs=mp4a.40.2", ".m4a", ["-c:a", "aac", "-movflags", "+faststart"], (48, 80)),
+    ("mp3", "audio/mpeg", ".mp3", ["-c:a", "libmp3lame"], (48, 96)),
+]
+
+
+def _tag(parts: List[bytes], settings: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(hashlib.sha256(part).digest())
+    h.update(settings.encode())
+    return h.hexdigest()[:10]
+
+
+def encode(
+    ffmpeg: str, wav: Path, stem: str, tag_parts: List[bytes], ambient: bool,
+    static_dir: Path,
+) -> Dict[str, Any]:
+    out_dir = static_dir / DIST_DIR / SPRITES_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    variants: List[Dict[str, Any]] = []
+    skipped: Dict[str, str] = {}
+    for fmt, mime, ext, args, kbps in FORMATS:
+        args = [*args, "-b:a", f"{kbps[1 if ambient else 0]}k"]
+        out = out_dir / f"{stem}.{_tag(tag_parts, ' '.join(args))}{ext}"
+        if not out.exists():
+            cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", str(wav),
+                   *args, str(out)]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0 or not out.exists() or out.stat().st_size == 0:
+                out.unlink(missing_ok=True)
+                skipped[fmt] = (proc.stderr.strip().splitlines() or ["ffmpeg failed"])[-1]
+                continue
+        variants.append(
+            {
+                "format": fmt,
+                "type": mime,
+                "url": out.relative_to(static_dir).as_posix(),
+                "bytes": out.stat().st_size,
+            }
+        )
+    variants.sort(key=lambda v: v["bytes"])
+    return {"variants": variants, "skipped": skipped}
+
+
+def build_sprite(
+    ffmpeg: str, name: str, cues: Dict[str, str], tmp: Path, static_dir: Path = STATIC_DIR
+) -> Dict[str, Any]:
+    lead = array.array("h", bytes(int(LEAD_SECONDS * RATE) * 2))
+    gap = array.array("h", bytes(int(GAP_SECONDS * RATE) * 2))
+    pcm = array.array("h", lead)
+    offsets: Dict[str, Dict[str, float]] = {}
+    sources: List[bytes] = []
+    source_bytes = 0
+    for cue, rel in cues.items():
+        data = (static_dir / rel).read_bytes()
+        sources.append(data)
+        source_bytes += len(data)
+        samples = decode(ffmpeg, static_dir / rel, 1)
+        offsets[cue] = {"start": round(len(pcm) / RATE, 4), "duration": round(len(samples) / RATE, 4)}
+        pcm.extend(samples)
+        pcm.extend(gap)
+    wav = tmp / f"{name}.wav"
+    write_wav(wav, pcm, 1)
+    entry = encode(ffmpeg, wav, name, sources, False, static_dir)
+    entry.update(
+        cues=offsets,
+        sources=dict(cues),
+        source_bytes=source_bytes,
+        seconds=round(len(pcm) / RATE, 4),
+    )
+    return entry
+
+
+def build_loop(
+    ffmpeg: str, rel: str, seconds: float, tmp: Path, static_dir: Path = STATIC_DIR
+) -> Dict[str, Any]:
+    src = static_dir / rel
+    data = src.read_bytes()
+    entry: Dict[str, Any] = {"source_bytes": len(data)}
+    pcm = loop_segment(decode(ffmpeg, src, 2), 2, seconds)
+    if pcm is None:
+        entry.update(variants=[], skipped={"loop": f"shorter than {seconds + CROSSFADE_SECONDS}s"})
+        return entry
+    wav = tmp / f"{src.stem}.loop.wav"
+    write_wav(wav, pcm, 2)
+    tag_parts = [data, str(seconds).encode()]
+    entry.update(encode(ffmpeg, wav, f"{src.stem}.loop", tag_parts, True, static_dir))
+    entry["seconds"] = round(len(pcm) / 2 / RATE, 4)
+    return entry
+
+
+def report(manifest: Dict[str, Any]) -> None:
+    for name, e in manifest["sprites"].items():
+        cues = ", ".join(f"{c} @{o['start']}s+{o['duration']}s" for c, o in e["cues"].items())
+        print(f"sprite {name}: {cues}  (sources {e['source_bytes']:,} bytes)")
+        _report_variants(e)
+    for rel, e in manifest["ambient"].items():
+        print(f"ambient {rel}: {e.get('seconds', 0)}s loop  (source {e['source_bytes']:,} bytes)")
+        _report_variants(e)
+
+
+def _report_variants(e: Dict[str, Any]) -> None:
+    for v in e["variants"]:
+        print(f"  {v['format']:5} {v['bytes']:>10,}  -{1 - v['bytes'] / e['source_bytes']:6.1%}  {v['url']}")
+    for fmt, err in e["skipped"].items():
+        print(f"  {fmt:5} skipped: {err}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--ffmpeg", default=shutil.which("ffmpeg"), help="ffmpeg binary")
+    ap.add_argument("--loop-seconds", type=float, default=20.0, help="ambient loop length")
+    args = ap.parse_args()
+    if not args.ffmpeg:
+        sys.exit("ffmpeg not found on PATH; install it or pass --ffmpeg")
+
+    cue_sources = {rel for cues in CUE_SETS.values() for rel in cues.values()}
+    ambient = sorted(
+        p.relative_to(STATIC_DIR).as_posix()
+        for p in (STATIC_DIR / "audio").iterdir()
+        if p.is_file() and p.relative_to(STATIC_DIR).as_posix() not in cue_sources
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = {
+            "sprites": {
+                name: build_sprite(args.ffmpeg, name, cues, Path(tmp))
+                for name, cues in CUE_SETS.items()
+            },
+            "ambient": {
+                rel: build_loop(args.ffmpeg, rel, args.loop_seconds, Path(tmp)) for rel in ambient
+            },
+        }
+    manifest_path = STATIC_DIR / DIST_DIR / AUDIO_MANIFEST_NAME
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    report(manifest)
+    print(f"wrote {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Transcode the animated GIF backgrounds into smaller web formats.
+
+Run from fastapi_app/:  python -m tools.build_media [--ffmpeg PATH] [GIF ...]
+
+For each GIF (default: every static/img/*.gif) this writes, under
+static/dist/media/, an animated WebP and AVIF, a looping WebM (VP9) and
+MP4 (H.264), plus a small first-frame JPEG poster. Output names carry a
+hash of the source and encoder settings so they can be cached as
+immutable. Results go to static/dist/media.json, which base.html uses
+through `media_for()`. Encoders missing from the local ffmpeg build are
+skipped and reported. Requires ffmpeg on PATH.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from services.assets import DIST_DIR, MEDIA_MANIFEST_NAME
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STATIC_DIR = BASE_DIR / "static"
+MEDIA_DIR = "media"
+
+# yuv420p encoders need even dimensions
+_EVEN = "scale=trunc(iw/2)*2:trunc(ih/2)*2"
+
+# (format, mime type, extension, ffmpeg output args); smallest usually first
+FORMATS = [
+    (
+        "webm",
+        "video/webm",
+        ".webm",
+        ["-c:v", "libvpx-vp9", "-crf", "40", "-b:v", "0", "-row-mt", "1",
+         "-pix_fmt", "yuv420p", "-vf", _EVEN, "-an"],
+    ),
+    (
+        "mp4",
+        "video/mp4",
+        ".mp4",
+        ["-c:v", "libx264", "-crf", "28", "-preset", "slow", "-pix_fmt", "yuv420p",
+         "-vf", _EVEN, "-movflags", "+faststart", "-an"],
+    ),
+    (
+        "avif",
+        "image/avif",
+        ".avif",
+        ["-c:v", "libaom-av1", "-crf", "38", "-b:v", "0", "-cpu-used", "6",
+         "-pix_fmt", "yuv420p", "-vf", _EVEN, "-f", "avif"],
+    ),
+    (
+        "webp",
+        "image/webp",
+        ".webp",
+        ["-c:v", "libwebp_anim", "-lossless", "0", "-q:v", "70", "-loop", "0", "-an"],
+    ),
+]
+POSTER_ARGS = ["-frames:v", "1", "-vf", "scale='min(480,iw)':-2", "-q:v", "5"]
+
+
+def _tag(data: bytes, args: List[str]) -> str:
+    h = hashlib.sha256(data)
+    h.update(" ".join(args).encode())
+    return h.hexdigest()[:10]
+
+
+def _run(ffmpeg: str, src: Path, out: Path, args: List[str]) -> Optional[str]:
+    cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", str(src), *args, str(out)]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0 or not out.exists() or out.stat().st_size == 0:
+        out.unlink(missing_ok=True)
+        return (proc.stderr.strip().splitlines() or ["ffmpeg failed"])[-1]
+    return None
+
+
+def transcode(ffmpeg: str, src: Path, static_dir: Path = STATIC_DIR) -> Dict[str, Any]:
+    rel = src.relative_to(static_dir).as_posix()
+    data = src.read_bytes()
+    out_dir = static_dir / DIST_DIR / MEDIA_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    entry: Dict[str, Any] = {"source": rel, "bytes": len(data), "variants": [], "skipped": {}}
+    for fmt, mime, ext, args in FORMATS:
+        out = out_dir / f"{src.stem}.{_tag(data, args)}{ext}"
+        err = None if out.exists() else _run(ffmpeg, src, out, args)
+        if err:
+            entry["skipped"][fmt] = err
+            continue
+        entry["variants"].append(
+            {
+                "format": fmt,
+                "type": mime,
+                "url": out.relative_to(static_dir).as_posix(),
+                "bytes": out.stat().st_size,
+            }
+        )
+    poster = out_dir / f"{src.stem}.{_tag(data, POSTER_ARGS)}.poster.jpg"
+    err = None if poster.exists() else _run(ffmpeg, src, poster, POSTER_ARGS)
+    if err:
+        entry["skipped"]["poster"] = err
+    else:
+        entry["poster"] = {
+            "type": "image/jpeg",
+            "url": poster.relative_to(static_dir).as_posix(),
+            "bytes": poster.stat().st_size,
+        }
+    entry["variants"].sort(key=lambda v: v["bytes"])
+    return entry
+
+
+def report(entries: List[Dict[str, Any]]) -> None:
+    for e in entries:
+        print(f"{e['source']}  {e['bytes']:,} bytes")
+        for v in e["variants"]:
+            saved = 1 - v["bytes"] / e["bytes"]
+            print(f"  {v['format']:5} {v['bytes']:>10,}  -{saved:6.1%}  {v['url']}")
+        if "poster" in e:
+            print(f"  {'poster':5} {e['poster']['bytes']:>10,}")
+        for fmt, err in e["skipped"].items():
+            print(f"  {fmt:5} skipped: {err}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("gifs", nargs="*", type=Path, help="default: static/img/*.gif")
+    ap.add_argument("--ffmpeg", default=shutil.which("ffmpeg"), help="ffmpeg binary")
+    args = ap.parse_args()
+    if not args.ffmpeg:
+        sys.exit("ffmpeg not found on PATH; install it or pass --ffmpeg")
+
+    gifs = [p.resolve() for p in args.gifs] or sorted((STATIC_DIR / "img").glob("*.gif"))
+    manifest_path = STATIC_DIR / DIST_DIR / MEDIA_MANIFEST_NAME
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        manifest = {}
+    entries = [transcode(args.ffmpeg, gif) for gif in gifs]
+    for e in entries:
+        manifest[e["source"]] = e
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    report(entries)
+    print(f"wrote {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
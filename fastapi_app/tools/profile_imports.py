@@ -0,0 +1,85 @@
+"""Report per-module import cost of the app (or any module).
+
+Run from fastapi_app/:  python -m tools.profile_imports [module] [--top 25]
+
+Imports `module` (default `main`) in a fresh interpreter with
+`python -X importtime`, then prints the slowest modules by self time and
+the cumulative cost per top-level package. `--lazy` sets LAZY_STARTUP=1
+for the child; `--json` prints the raw rows instead of tables.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# (module, self_us, cumulative_us, depth)
+Row = Tuple[str, int, int, int]
+
+
+def profile(module: str, env: Dict[str, str]) -> List[Row]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed")
+    rows: List[Row] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative), depth))
+    return rows
+
+
+def by_package(rows: List[Row]) -> Dict[str, int]:
+    """Self time summed per top-level package (app modules keep their full name)."""
+    out: Dict[str, int] = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        top = name.split(".", 1)[0]
+        key = name if (BASE_DIR / top).is_dir() or (BASE_DIR / f"{top}.py").exists() else top
+        out[key] += self_us
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("module", nargs="?", default="main")
+    ap.add_argument("--top", type=int, default=25)
+    ap.add_argument("--lazy", action="store_true", help="set LAZY_STARTUP=1")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    env = dict(os.environ)
+    if args.lazy:
+        env["LAZY_STARTUP"] = "1"
+    rows = profile(args.module, env)
+    if args.json:
+        print(json.dumps([dict(zip(("module", "self_us", "cumulative_us", "depth"), r)) for r in rows]))
+        return
+
+    total = sum(r[1] for r in rows)
+    print(f"import {args.module}: {total / 1000:.1f} ms in {len(rows)} modules\n")
+    print(f"{'self ms':>8} {'cum ms':>8}  module")
+    for name, self_us, cumulative, _ in sorted(rows, key=lambda r: -r[1])[: args.top]:
+        print(f"{self_us / 1000:8.1f} {cumulative / 1000:8.1f}  {name}")
+    print(f"\n{'self ms':>8}  package")
+    packages = sorted(by_package(rows).items(), key=lambda kv: -kv[1])
+    for name, self_us in packages[: args.top]:
+        print(f"{self_us / 1000:8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()